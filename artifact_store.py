@@ -0,0 +1,263 @@
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Union
+
+# Document IDs are content hashes; anything else is rejected before touching disk
+DOC_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+ARTIFACT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+MEDIA_TYPES = {
+    ".xml": "application/xml",
+    ".pdf": "application/pdf",
+    ".md": "text/markdown",
+    ".json": "application/json"
+}
+
+
+def is_valid_doc_id(doc_id: str) -> bool:
+    return bool(DOC_ID_PATTERN.match(doc_id))
+
+
+class Artifact:
+    """A stored output, held either in memory (data) or in a local file (path)"""
+    __slots__ = ("name", "media_type", "data", "path", "size", "created")
+
+    def __init__(self, name: str, data: Optional[bytes] = None, path: Optional[str] = None,
+                 size: int = 0, created: float = 0.0):
+        extension = os.path.splitext(name)[1].lower()
+        self.name = name
+        self.media_type = MEDIA_TYPES.get(extension) or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.data = data
+        self.path = path
+        self.size = size
+        self.created = created
+
+    def read(self) -> bytes:
+        if self.data is not None:
+            return self.data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class ArtifactStore:
+    """
+    Generated artifacts keyed by document ID and artifact name.
+
+    Every artifact is written through to a shared directory, so any uvicorn
+    worker on the host can serve it. Artifacts up to spill_threshold bytes
+    are additionally kept in a small in-memory LRU; larger ones live only on
+    disk and are served as file responses. Entries expire ttl seconds after
+    they were last written or read (reads refresh the file's mtime at most
+    once per sweep_interval) and the directory is pruned least recently
+    used first to max_disk_bytes.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl: float = 3600.0,
+                 max_memory_bytes: int = 64 * 1024 * 1024, spill_threshold: int = 1024 * 1024,
+                 max_disk_bytes: int = 2 * 1024 * 1024 * 1024, sweep_interval: float = 60.0):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "alteryx-doc-artifacts")
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_threshold = spill_threshold
+        self.max_disk_bytes = max_disk_bytes
+        self.sweep_interval = sweep_interval
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "ArtifactStore":
+        """Build a store configured from ALTERYX_DOC_ARTIFACT_* environment variables"""
+        return cls(
+            directory=os.environ.get("ALTERYX_DOC_ARTIFACT_DIR") or None,
+            ttl=float(os.environ.get("ALTERYX_DOC_ARTIFACT_TTL", 3600)),
+            max_memory_bytes=int(os.environ.get("ALTERYX_DOC_ARTIFACT_MEMORY_BYTES", 64 * 1024 * 1024)),
+            spill_threshold=int(os.environ.get("ALTERYX_DOC_ARTIFACT_SPILL_BYTES", 1024 * 1024)),
+            max_disk_bytes=int(os.environ.get("ALTERYX_DOC_ARTIFACT_DISK_BYTES", 2 * 1024 * 1024 * 1024))
+        )
+
+    def _path(self, doc_id: str, name: str) -> str:
+        if not is_valid_doc_id(doc_id) or not ARTIFACT_NAME_PATTERN.match(name):
+            raise ValueError("Invalid document ID or artifact name")
+        return os.path.join(self.directory, doc_id, name)
+
+    def put(self, doc_id: str, name: str, content: Union[bytes, str]) -> Artifact:
+        """Store an artifact, replacing any previous version"""
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        path = self._path(doc_id, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._create(tmp_path) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        artifact = Artifact(name, path=path, size=len(data), created=now)
+        if len(data) <= self.spill_threshold:
+            artifact.data = data
+            with self._lock:
+                self._remember((doc_id, name), artifact)
+        self._maybe_sweep(now)
+        return artifact
+
+    def put_file(self, doc_id: str, name: str, source_path: str) -> Artifact:
+        """Store an artifact by moving an already written file into the store"""
+        path = self._path(doc_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            shutil.move(source_path, path)
+        except FileNotFoundError:
+            if not os.path.exists(source_path):
+                raise
+            # A concurrent sweep removed the directory while it was still empty
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.move(source_path, path)
+        now = time.time()
+        self._maybe_sweep(now)
+        return Artifact(name, path=path, size=os.path.getsize(path), created=now)
+
+    def get(self, doc_id: str, name: str) -> Optional[Artifact]:
+        """Look up an artifact in memory, then in the shared directory"""
+        try:
+            path = self._path(doc_id, name)
+        except ValueError:
+            return None
+        now = time.time()
+        key = (doc_id, name)
+        with self._lock:
+            artifact = self._memory.get(key)
+            if artifact is not None:
+                if now - artifact.created <= self.ttl and os.path.exists(path):
+                    self._memory.move_to_end(key)
+                    if now - artifact.created > self.sweep_interval:
+                        self._touch(path, now)
+                        artifact.created = now
+                    return artifact
+                self._forget(key)
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if now - stat.st_mtime > self.ttl:
+            self._remove_file(path)
+            return None
+        created = stat.st_mtime
+        if now - created > self.sweep_interval:
+            # In use: push back its expiry
+            self._touch(path, now)
+            created = now
+        return Artifact(name, path=path, size=stat.st_size, created=created)
+
+    def delete(self, doc_id: str) -> None:
+        """Drop every artifact stored for a document"""
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == doc_id]:
+                self._forget(key)
+        if is_valid_doc_id(doc_id):
+            shutil.rmtree(os.path.join(self.directory, doc_id), ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "directory": self.directory
+            }
+
+    def _remember(self, key, artifact: Artifact) -> None:
+        self._forget(key)
+        self._memory[key] = artifact
+        self._memory_bytes += artifact.size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.size
+
+    def _forget(self, key) -> None:
+        artifact = self._memory.pop(key, None)
+        if artifact is not None:
+            self._memory_bytes -= artifact.size
+
+    @staticmethod
+    def _create(path: str):
+        """Open path for writing, creating its document directory"""
+        try:
+            return open(path, "wb")
+        except FileNotFoundError:
+            # New document, or a concurrent sweep removed its empty directory
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return open(path, "wb")
+
+    @staticmethod
+    def _touch(path: str, now: float) -> None:
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        self.sweep(now)
+
+    def sweep(self, now: Optional[float] = None) -> None:
+        """
+        Delete expired artifacts and stale temporary files (e.g. exports
+        abandoned by a killed worker), then the least recently used
+        artifacts until under max_disk_bytes
+        """
+        now = now or time.time()
+        files = []
+        total = 0
+        for doc_id in os.listdir(self.directory):
+            doc_dir = os.path.join(self.directory, doc_id)
+            if not os.path.isdir(doc_dir):
+                if doc_id.endswith(".tmp"):
+                    try:
+                        if now - os.stat(doc_dir).st_mtime > self.ttl:
+                            self._remove_file(doc_dir)
+                    except OSError:
+                        pass
+                continue
+            try:
+                names = os.listdir(doc_dir)
+            except OSError:
+                # Removed by another worker's sweep
+                continue
+            for name in names:
+                path = os.path.join(doc_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.ttl:
+                    self._remove_file(path)
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            try:
+                os.rmdir(doc_dir)  # Only succeeds once the document is empty
+            except OSError:
+                pass
+
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            self._remove_file(path)
+            total -= size
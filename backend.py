@@ -1,19 +1,44 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 import xml.etree.ElementTree as ET
 import xmltodict
-import markdown
-from typing import Dict, List, Optional
-from pydantic import BaseModel
 import uvicorn
-from fastapi.responses import StreamingResponse
-from xml_to_pdf import generate_xml_pdf
-from io import BytesIO, StringIO
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse, Response, PlainTextResponse
 import fastapi
-from toolsmetadata import AlteryxDocGenerator  # Import AlteryxDocGenerator
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import List, Optional
+from toolsmetadata import AlteryxDocGenerator, IncrementalWorkflowParser, WorkflowTooLarge  # Import AlteryxDocGenerator
+from models import WorkflowTool, WorkflowAnalysis
+from result_cache import ResultCache, CachedResult
+from worker_pool import WorkerPool, PoolOverloaded, analyze_workflow, render_workflow, parse_macro
+from artifact_store import ArtifactStore, Artifact, is_valid_doc_id
+from fingerprints import diff_fingerprints
+from workflow_graph import WorkflowGraph
+from workflow_diagram import DETAIL_LEVELS, build_scene, render_svg, snap_zoom
+from search_index import SearchIndex, MIN_QUERY_CHARS
+from doc_html import safe_markdown, markdown_to_html, html_head, HTML_TAIL
+from catalog import WorkflowCatalog, MATCH_MODES
+from export_jobs import ExportQueue, ExportJob, EXPORT_FORMATS, DONE, FAILED
+from xml_lines import LineIndexCache, highlight_line
+from xml_json import ITEM_LEVELS, iter_source_items
+from tool_configs import ConfigurationDecoder, SOURCE_ARTIFACT
+from packages import WorkflowPackage, MacroCache, resolve_macros, WORKFLOW_EXTENSIONS, PACKAGE_EXTENSIONS
+from serialization import (FastJSONResponse, RawJSON, json_object, dumps_json, wants_msgpack, dumps_msgpack,
+                           negotiate_encoding, compress, ENCODING_SUFFIXES, MSGPACK_MEDIA_TYPE)
+from metrics import (MetricsMiddleware, Gauge, CounterFunction, registry, stage, current_timer,
+                     INPUT_BYTES, WORKFLOW_TOOLS, CACHE_LOOKUPS)
+
+logger = logging.getLogger("alteryx_doc")
 
 app = FastAPI(title="Alteryx Workflow Analyzer",
-             description="API for analyzing and documenting Alteryx workflows")
+             description="API for analyzing and documenting Alteryx workflows",
+             default_response_class=FastJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -27,29 +52,85 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
+)
+
+# Request latency histograms and the optional Server-Timing breakdown
+app.add_middleware(MetricsMiddleware)
+
+# Cache of parsed/rendered uploads, keyed by a hash of the uploaded bytes
+result_cache = ResultCache(
+    max_bytes=int(os.environ.get("ALTERYX_DOC_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+    cache_dir=os.environ.get("ALTERYX_DOC_CACHE_DIR") or None
 )
 
-class WorkflowTool(BaseModel):
-    """Model for Alteryx workflow tool information"""
-    tool_id: str
-    plugin: str
-    description: str
-    configuration: Dict
-    connections: List[str] = []
-    position: Dict[str, str] = {}  # Added to store x,y coordinates
-    custom_properties: Dict = {}   # Added to store additional tool properties
-
-class WorkflowAnalysis(BaseModel):
-    """Model for complete workflow analysis"""
-    name: str
-    creator: Optional[str] = None
-    created_date: Optional[str] = None
-    description: Optional[str] = None
-    tools: List[WorkflowTool]
-    data_flow: List[Dict[str, str]]
-    custom_tools: List[Dict] = []  # Added to store custom tool details
-    workflow_constants: Dict = {}  # Added to store workflow constants
-    yxmd_version: Optional[str] = None  # Added to store workflow version
+# Generated outputs per document, shared between workers through a local directory
+artifact_store = ArtifactStore.from_env()
+
+# Process pool for parsing/rendering so CPU-bound work stays off the event loop
+worker_pool = WorkerPool.from_env()
+
+registry.register(Gauge("alteryx_doc_pool_in_flight", "Jobs running in the worker pool",
+                        lambda: worker_pool.in_flight))
+registry.register(Gauge("alteryx_doc_pool_queue_depth", "Jobs waiting for a worker pool slot",
+                        lambda: worker_pool.waiting))
+registry.register(CounterFunction("alteryx_doc_pool_rejected_total",
+                                  "Jobs rejected by worker pool admission control", lambda: worker_pool.rejected))
+
+# /metrics is only served to loopback clients unless explicitly opened up
+METRICS_PUBLIC = os.environ.get("ALTERYX_DOC_METRICS_PUBLIC", "").lower() in ("1", "true", "yes")
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+# A local reverse proxy connects from loopback too; requests it forwards are not local
+FORWARDING_HEADERS = ("forwarded", "x-forwarded-for", "x-real-ip")
+
+# Maximum number of workflows from one batch upload processed concurrently
+BATCH_CONCURRENCY = int(os.environ.get("ALTERYX_DOC_BATCH_CONCURRENCY", 0)) or worker_pool.max_in_flight
+
+# Parsed macros shared across packages, keyed by macro content hash
+macro_cache = MacroCache(max_entries=int(os.environ.get("ALTERYX_DOC_MACRO_CACHE_ENTRIES", 512)))
+
+# Limits enforced while a streamed upload is still arriving
+MAX_UPLOAD_BYTES = int(os.environ.get("ALTERYX_DOC_MAX_UPLOAD_BYTES", 256 * 1024 * 1024))
+MAX_WORKFLOW_NODES = int(os.environ.get("ALTERYX_DOC_MAX_WORKFLOW_NODES", 100000))
+
+# Tool configurations decoded on demand from the uploaded bytes
+configuration_decoder = ConfigurationDecoder(max_entries=int(os.environ.get("ALTERYX_DOC_CONFIG_CACHE_ENTRIES", 256)))
+
+# Line offsets of stored sources, for the XML viewer and search results
+line_indexes = LineIndexCache(artifact_store, max_entries=int(os.environ.get("ALTERYX_DOC_LINE_INDEX_ENTRIES", 64)))
+MAX_LINES_PER_REQUEST = 2000
+# Documents are content-addressed, so anything derived from one never changes
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Fleet-wide catalog of tools, configuration values and constants, keyed by upload path (see catalog_path)
+catalog = WorkflowCatalog.from_env()
+
+# PDF, HTML and markdown exports rendered in the background, one job per document and format
+export_queue = ExportQueue.from_env(artifact_store)
+# Longest a status poll may be held open waiting for a job to change
+MAX_EXPORT_WAIT_SECONDS = 30
+
+INVALID_FILE_TYPE = "Invalid file type. Please upload an Alteryx workflow (.yxmd), macro (.yxmc) or package (.yxzp) file"
+
+def is_supported_upload(filename: str) -> bool:
+    return filename.lower().endswith(WORKFLOW_EXTENSIONS + PACKAGE_EXTENSIONS)
+
+def is_package(filename: str) -> bool:
+    return filename.lower().endswith(PACKAGE_EXTENSIONS)
+
+@app.on_event("shutdown")
+def shutdown_worker_pool():
+    worker_pool.shutdown()
+    export_queue.shutdown()
+    catalog.close()
+
+@app.exception_handler(PoolOverloaded)
+async def pool_overloaded_handler(request, exc: PoolOverloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 @app.get("/test")
 async def test_connection():
@@ -62,6 +143,8 @@ async def test_connection():
             "server_info": {
                 "fastapi_version": fastapi.__version__,
                 "cors_enabled": True,
+                "worker_pool": worker_pool.stats(),
+                "export_queue": export_queue.stats(),
                 "allowed_origins": [
                     "http://localhost:5507",
                     "http://127.0.0.1:5507",
@@ -77,58 +160,915 @@ async def test_connection():
             detail=str(e)
         )
 
+@app.get("/metrics")
+async def prometheus_metrics(request: Request):
+    """Prometheus text-format metrics for this worker process"""
+    local = (request.client is not None and request.client.host in LOOPBACK_HOSTS
+             and not any(header in request.headers for header in FORWARDING_HEADERS))
+    if not METRICS_PUBLIC and not local:
+        raise HTTPException(status_code=403, detail="Metrics are only available locally")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+async def run_in_pool(fn, *args, sizes: Optional[dict] = None) -> CachedResult:
+    """Run an analysis function in the worker pool and record its stage timings"""
+    timer = current_timer()
+    start = time.perf_counter()
+    cached, timings = await worker_pool.run(fn, *args)
+    elapsed = time.perf_counter() - start
+    sizes = {**(sizes or {}), "markdown": len(cached.markdown), "alteryx_xml": len(cached.alteryx_xml)}
+    for name, seconds in timings.items():
+        timer.record(name, seconds, sizes.get(name))
+    # Whatever the worker did not account for was spent queueing and pickling
+    timer.record("pool_overhead", max(elapsed - sum(timings.values()), 0.0))
+    return cached
+
+def store_artifacts(cache_key: str, cached: CachedResult) -> None:
+    """
+    Write whatever artifacts of a result are missing, including the
+    /documents/{doc_id} body, so the links handed out for it keep working
+    after it is evicted from the result cache
+    """
+    artifacts = (
+        ("workflow.xml", lambda: cached.alteryx_xml),
+        ("fingerprints.json", lambda: json.dumps(cached.fingerprints)),
+        ("document.json", lambda: document_json(cache_key, cached))
+    )
+    for name, build in artifacts:
+        if artifact_store.get(cache_key, name) is None:
+            artifact_store.put(cache_key, name, build())
+
+async def store_result(cache_key: str, cached: CachedResult, cache_hit: bool) -> None:
+    """Cache a fresh result and make sure its artifacts exist"""
+    CACHE_LOOKUPS.inc(result="hit" if cache_hit else "miss")
+    if not cache_hit:
+        with stage("cache_store"):
+            result_cache.put(cache_key, cached)
+            await asyncio.to_thread(result_cache.spill, cache_key, cached)
+    WORKFLOW_TOOLS.observe(len(cached.analysis.tools))
+    with stage("store_artifacts"):
+        await asyncio.to_thread(store_artifacts, cache_key, cached)
+    
+    cache_stats = result_cache.stats()
+    logger.info("upload %s cache %s (hits=%d misses=%d)", cache_key[:12],
+                "hit" if cache_hit else "miss", cache_stats["hits"], cache_stats["misses"])
+
+async def index_in_catalog(path: str, cache_key: str, cached: CachedResult) -> None:
+    """Re-index path in the catalog unless it already holds this content; never fails the upload"""
+    try:
+        with stage("catalog"):
+            await asyncio.to_thread(catalog.index, path, cache_key, cached.analysis)
+    except Exception:
+        logger.exception("catalog indexing failed for %s", path)
+
+def catalog_path(filename: str, doc_id: str, path: Optional[str] = None) -> str:
+    """
+    Catalog key of an upload: the full path the client sent, or else the
+    filename under the content hash, so unrelated uploads that share a
+    filename never replace each other
+    """
+    return path or f"{doc_id}/{filename}"
+
+def file_sha256(fileobj) -> str:
+    """Hash of a seekable upload, leaving it rewound"""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(1024 * 1024), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+async def process_workflow(content: bytes, filename: Optional[str] = None, path: Optional[str] = None):
+    """
+    Return (cache key, result, cache hit) for uploaded workflow bytes
+    With a filename or path the workflow is also indexed in the catalog, under catalog_path
+    """
+    INPUT_BYTES.observe(len(content))
+    with stage("cache_lookup", len(content)):
+        cache_key = ResultCache.key_for(content)
+        cached = await load_cached(cache_key)
+    cache_hit = cached is not None
+    if cached is None:
+        # Parse workflow and generate documentation in the worker pool
+        cached = await run_in_pool(analyze_workflow, content, sizes={"parse": len(content)})
+    if artifact_store.get(cache_key, SOURCE_ARTIFACT) is None:
+        # Kept so tool configurations can be decoded on demand
+        artifact_store.put(cache_key, SOURCE_ARTIFACT, content)
+    await store_result(cache_key, cached, cache_hit)
+    if filename or path:
+        await index_in_catalog(catalog_path(filename, cache_key, path), cache_key, cached)
+    return cache_key, cached, cache_hit
+
+def analysis_json(doc_id: str, cached: CachedResult) -> bytes:
+    """JSON encoding of a document's analysis, encoded once and kept as an artifact"""
+    artifact = artifact_store.get(doc_id, "analysis.json")
+    if artifact is not None:
+        return artifact.read()
+    data = cached.analysis.to_json()
+    artifact_store.put(doc_id, "analysis.json", data)
+    return data
+
+def document_fields(doc_id: str, cached: CachedResult) -> dict:
+    return {
+        "success": True,
+        "doc_id": doc_id,
+        "documentation": cached.markdown,
+        "alteryx_xml": cached.alteryx_xml
+    }
+
+def document_json(doc_id: str, cached: CachedResult) -> bytes:
+    """JSON body of /documents/{doc_id}"""
+    return json_object({**document_fields(doc_id, cached), "analysis": RawJSON(analysis_json(doc_id, cached))})
+
+def upload_response(request: Request, cache_key: str, cached: CachedResult, cache_hit: bool,
+                    package: Optional[dict] = None) -> Response:
+    """Response shared by the upload endpoints, as JSON or MessagePack per the Accept header"""
+    fields = {
+        "success": True,
+        "doc_id": cache_key,
+        "documentation": cached.markdown,
+        "alteryx_xml": cached.alteryx_xml,
+        "analysis": None,
+        "cache": {"hit": cache_hit, "key": cache_key, **result_cache.stats()}
+    }
+    if package is not None:
+        fields["package"] = package
+    with stage("serialize") as block:
+        if wants_msgpack(request.headers.get("accept")):
+            fields["analysis"] = cached.analysis.to_dict()
+            body, media_type = dumps_msgpack(fields), MSGPACK_MEDIA_TYPE
+        else:
+            # The analysis is spliced in already encoded
+            fields["analysis"] = RawJSON(analysis_json(cache_key, cached))
+            body, media_type = json_object(fields), "application/json"
+        block.size = len(body)
+    return Response(content=body, media_type=media_type, headers={"Vary": "Accept"})
+
+def encoded_artifact_response(request: Request, doc_id: str, name: str, media_type: str, build) -> Response:
+    """
+    Serve a deterministic per-document body, compressed per Accept-Encoding
+    The plain and compressed encodings are stored as artifacts next to each
+    other, so repeat downloads are neither rebuilt nor recompressed.
+    build() returns the plain bytes, or None when the document is unknown.
+    """
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    stored_name = name + ENCODING_SUFFIXES[encoding] if encoding else name
+    artifact = artifact_store.get(doc_id, stored_name) if is_valid_doc_id(doc_id) else None
+    if artifact is None:
+        plain = artifact_store.get(doc_id, name) if is_valid_doc_id(doc_id) else None
+        if plain is not None:
+            data = plain.read()
+        else:
+            data = build()
+            if data is None:
+                raise HTTPException(status_code=404, detail="Document not found, please upload the workflow again")
+            artifact = artifact_store.put(doc_id, name, data)
+        if encoding:
+            with stage("compress", len(data)):
+                artifact = artifact_store.put(doc_id, stored_name, compress(data, encoding))
+        elif artifact is None:
+            artifact = plain
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if artifact.data is not None:
+        return Response(content=artifact.data, media_type=media_type, headers=headers)
+    return FileResponse(artifact.path, media_type=media_type, headers=headers)
+
+def workflow_summary(cached: CachedResult) -> dict:
+    """Headline statistics for a processed workflow"""
+    analysis = cached.analysis
+    return {
+        "name": analysis.name,
+        "tools": len(analysis.tools),
+        "connections": len(analysis.data_flow),
+        "macros": len(analysis.custom_tools),
+        "constants": len(analysis.workflow_constants)
+    }
+
+async def parse_macro_in_pool(content: bytes):
+    return await worker_pool.run(parse_macro, content)
+
+async def process_package(fileobj, filename: str, slots: Optional[asyncio.Semaphore] = None,
+                          path: Optional[str] = None):
+    """
+    Document every workflow in a .yxzp package
+    Member and macro parses each hold one of slots (a batch's, when given) while they run;
+    members are cataloged under the package's catalog_path
+    Returns (primary workflow's key, result, cache hit) and a package summary
+    """
+    if not path:
+        path = catalog_path(filename, await asyncio.to_thread(file_sha256, fileobj))
+    package = WorkflowPackage(fileobj)
+    try:
+        members = package.workflows
+        if not members:
+            raise ValueError("Package does not contain any workflows (.yxmd)")
+        if slots is None:
+            slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+        
+        async def parse_macro_in_slot(content: bytes):
+            async with slots:
+                return await parse_macro_in_pool(content)
+        
+        async def process_member(member: str):
+            async with slots:
+                # Inflated off the event loop; members may be hundreds of megabytes
+                content = await asyncio.to_thread(package.read, member)
+                cache_key, cached, cache_hit = await process_workflow(content, path=f"{path}/{member}")
+            macros = await resolve_macros(package, cached.analysis, macro_cache, parse_macro_in_slot)
+            return cache_key, cached, cache_hit, {
+                "member": member,
+                "doc_id": cache_key,
+                "summary": workflow_summary(cached),
+                "macros": macros
+            }
+        
+        results = await asyncio.gather(*[process_member(member) for member in members])
+    finally:
+        package.close()
+    # Members dropped since the package was last uploaded
+    await asyncio.to_thread(catalog.remove, path, [f"{path}/{member}" for member in members])
+    
+    primary_key, primary, primary_hit, _ = results[0]
+    summary = {
+        "filename": filename,
+        "workflows": [result[3] for result in results],
+        "macro_cache": macro_cache.stats()
+    }
+    return (primary_key, primary, primary_hit), summary
+
 @app.post("/upload")
-async def upload_workflow(file: UploadFile = File(...)):
-    """Upload and analyze Alteryx workflow file"""
-    if not file.filename.endswith('.yxmd'):
+async def upload_workflow(request: Request, file: UploadFile = File(...), path: Optional[str] = Form(None)):
+    """
+    Upload and analyze Alteryx workflow file
+    path, the file's full path on the client, keys it in the catalog; see catalog_path
+    """
+    if not is_supported_upload(file.filename):
         raise HTTPException(
             status_code=400,
-            detail="Invalid file type. Please upload an Alteryx workflow (.yxmd) file"
+            detail=INVALID_FILE_TYPE
         )
     
     try:
-        # Read file content
-        content = await file.read()
-        
-        # Create instance of AlteryxDocGenerator from toolsmetadata
-        doc_generator = AlteryxDocGenerator()
-        
-        # Parse workflow
-        workflow_analysis = await doc_generator.parse_workflow_xml(content)
+        package = None
+        if is_package(file.filename):
+            # Members are read lazily from the spooled upload
+            (cache_key, cached, cache_hit), package = await process_package(file.file, file.filename, path=path)
+        else:
+            # Read file content
+            with stage("read") as block:
+                content = await file.read()
+                block.size = len(content)
+            cache_key, cached, cache_hit = await process_workflow(content, file.filename, path)
         
-        # Generate documentation
-        markdown_doc = doc_generator.generate_markdown_doc(workflow_analysis)
-        alteryx_xml = doc_generator.generate_alteryx_xml(workflow_analysis)
-        
-        # Store the generated XML
-        app.current_xml = alteryx_xml
-        
-        return {
-            "success": True,
-            "documentation": markdown_doc,
-            "alteryx_xml": alteryx_xml,
-            "analysis": workflow_analysis.dict()
-        }
+        # Encoding and compression run off the event loop
+        return await asyncio.to_thread(upload_response, request, cache_key, cached, cache_hit, package)
 
+    except PoolOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/download-xml-pdf")
-async def download_xml_pdf():
-    """Download the workflow XML as PDF"""
-    if not hasattr(app, 'current_xml'):
-        raise HTTPException(
-            status_code=400,
-            detail="No workflow has been uploaded yet"
-        )
+@app.post("/upload-stream")
+async def upload_workflow_stream(request: Request, filename: str = "workflow.yxmd", path: Optional[str] = None):
+    """
+    Upload a workflow (.yxmd) or macro (.yxmc) as the raw request body
+    The XML is parsed chunk by chunk while it arrives, so parsing overlaps the
+    network transfer and invalid or oversized uploads are rejected before the
+    rest of the body is read. Packages need random access and go to /upload.
+    path, the file's full path on the client, keys it in the catalog; see catalog_path
+    """
+    if not filename.lower().endswith(WORKFLOW_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Streamed uploads must be .yxmd or .yxmc files; upload packages to /upload")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Workflow exceeds the maximum upload size of {MAX_UPLOAD_BYTES} bytes")
     
-    pdf_content = generate_xml_pdf(app.current_xml)
+    parser = IncrementalWorkflowParser(max_nodes=MAX_WORKFLOW_NODES, max_bytes=MAX_UPLOAD_BYTES)
+    digest = hashlib.sha256()
+    timer = current_timer()
+    parse_seconds = 0.0
+    start = time.perf_counter()
+    # The original bytes are spooled alongside for on-demand configuration decoding
+    fd, source_path = tempfile.mkstemp(suffix=".source.tmp", dir=artifact_store.directory)
+    source_file = os.fdopen(fd, "wb")
     
-    return StreamingResponse(
-        BytesIO(pdf_content),
-        media_type="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=workflow-xml.pdf"}
-    )
+    def receive(chunk: bytes) -> None:
+        source_file.write(chunk)
+        parser.feed(chunk)
+    
+    try:
+        try:
+            async for chunk in request.stream():
+                if not chunk:
+                    continue
+                digest.update(chunk)
+                # Parsed off the event loop, one chunk at a time, in arrival order. Each chunk
+                # takes a pool slot, so stream parses share the pool's CPU budget, but no slot
+                # is held while waiting for the network
+                async with worker_pool.admit():
+                    chunk_start = time.perf_counter()
+                    await asyncio.to_thread(receive, chunk)
+                    parse_seconds += time.perf_counter() - chunk_start
+            async with worker_pool.admit():
+                chunk_start = time.perf_counter()
+                workflow = await asyncio.to_thread(parser.close)
+                parse_seconds += time.perf_counter() - chunk_start
+        finally:
+            source_file.close()
+        cache_key = digest.hexdigest()
+        if artifact_store.get(cache_key, SOURCE_ARTIFACT) is None:
+            artifact_store.put_file(cache_key, SOURCE_ARTIFACT, source_path)
+    except WorkflowTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (ValueError, ET.ParseError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid workflow: {e}")
+    finally:
+        if os.path.exists(source_path):
+            os.remove(source_path)
+    timer.record("receive", max(time.perf_counter() - start - parse_seconds, 0.0), parser.bytes_read)
+    timer.record("parse", parse_seconds, parser.bytes_read)
+    INPUT_BYTES.observe(parser.bytes_read)
+    
+    try:
+        with stage("cache_lookup"):
+            cached = await load_cached(cache_key)
+        cache_hit = cached is not None
+        if cached is None:
+            # Only rendering and indexing are left for the worker pool
+            source = artifact_store.get(cache_key, SOURCE_ARTIFACT)
+            cached = await run_in_pool(render_workflow, workflow, source.read() if source else None)
+        await store_result(cache_key, cached, cache_hit)
+        await index_in_catalog(catalog_path(filename, cache_key, path), cache_key, cached)
+        return await asyncio.to_thread(upload_response, request, cache_key, cached, cache_hit)
+    except PoolOverloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/upload-batch")
+async def upload_workflow_batch(files: List[UploadFile] = File(...), paths: Optional[List[str]] = Form(None)):
+    """
+    Upload many workflows at once
+    paths, when sent, holds each file's full client path (or "") in files order; see catalog_path
+    Streams one NDJSON line per workflow as soon as it has been processed;
+    full documentation is fetched afterwards from /documents/{doc_id}
+    """
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def process(index: int, file: UploadFile) -> dict:
+        line = {"index": index, "filename": file.filename}
+        path = paths[index] if paths and index < len(paths) else None
+        if not is_supported_upload(file.filename):
+            return {**line, "status": "error", "error": INVALID_FILE_TYPE}
+        package = None
+        try:
+            if is_package(file.filename):
+                # Members and macros share the batch's slots with plain workflows
+                (cache_key, cached, cache_hit), package = await process_package(file.file, file.filename, slots, path)
+            else:
+                async with slots:
+                    with stage("read") as block:
+                        content = await file.read()
+                        block.size = len(content)
+                    cache_key, cached, cache_hit = await process_workflow(content, file.filename, path)
+        except Exception as e:
+            return {**line, "status": "error", "error": str(e)}
+        if package is not None:
+            line["package"] = package
+        return {
+            **line,
+            "status": "success",
+            "doc_id": cache_key,
+            "cache_hit": cache_hit,
+            "summary": workflow_summary(cached),
+            "url": f"/documents/{cache_key}"
+        }
+    
+    async def stream_results():
+        tasks = [asyncio.ensure_future(process(i, f)) for i, f in enumerate(files)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.get("/documents/{doc_id}")
+async def get_document(request: Request, doc_id: str):
+    """Fetch the full documentation for a previously processed workflow"""
+    as_msgpack = wants_msgpack(request.headers.get("accept"))
+    
+    def build() -> Optional[bytes]:
+        cached = result_cache.get(doc_id) if is_valid_doc_id(doc_id) else None
+        if cached is None:
+            return None
+        if as_msgpack:
+            return dumps_msgpack({**document_fields(doc_id, cached), "analysis": cached.analysis.to_dict()})
+        # Normally stored when the result was produced
+        return document_json(doc_id, cached)
+    
+    if as_msgpack:
+        return await asyncio.to_thread(encoded_artifact_response, request, doc_id, "document.msgpack",
+                                       MSGPACK_MEDIA_TYPE, build)
+    return await asyncio.to_thread(encoded_artifact_response, request, doc_id, "document.json", "application/json",
+                                   build)
+
+# Streamed documentation is flushed once this much text has accumulated
+DOC_STREAM_CHUNK_CHARS = 64 * 1024
+
+def iter_documentation(analysis, sections: Optional[List[str]], as_html: bool):
+    """
+    Yield the documentation section by section, batching small sections
+    The first section is sent on its own so the response starts immediately
+    """
+    doc_generator = AlteryxDocGenerator()
+    if as_html:
+        converter = safe_markdown()
+        yield html_head(analysis.name)
+    buffer, size, first = [], 0, True
+    for _, text in doc_generator.iter_markdown_sections(analysis, sections):
+        if as_html:
+            text = markdown_to_html(text, converter) + "\n"
+        elif not first:
+            text = "\n" + text
+        buffer.append(text)
+        size += len(text)
+        if first or size >= DOC_STREAM_CHUNK_CHARS:
+            yield "".join(buffer)
+            buffer, size, first = [], 0, False
+    if buffer:
+        yield "".join(buffer)
+    if as_html:
+        yield HTML_TAIL
+
+@app.get("/documents/{doc_id}/markdown")
+async def stream_documentation(request: Request, doc_id: str, sections: Optional[List[str]] = Query(None), format: str = "markdown"):
+    """
+    Stream a processed workflow's documentation as text/markdown or chunked HTML
+    Repeat sections= to fetch only those parts: header, constants, categories,
+    category:<name>, tools, tool:<ToolID> and data_flow
+    """
+    if format not in ("markdown", "html"):
+        raise HTTPException(status_code=400, detail="format must be markdown or html")
+    cached = await load_cached(doc_id)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Document not found, please upload the workflow again")
+    if not sections and format == "markdown":
+        # The complete document is already rendered
+        return await asyncio.to_thread(encoded_artifact_response, request, doc_id, "documentation.md",
+                                       "text/markdown; charset=utf-8", lambda: cached.markdown.encode("utf-8"))
+    media_type = "text/html; charset=utf-8" if format == "html" else "text/markdown; charset=utf-8"
+    return StreamingResponse(iter_documentation(cached.analysis, sections, format == "html"), media_type=media_type)
+
+async def stream_alteryx_xml(doc_id: str, analysis):
+    """
+    Yield the Alteryx XML in ~DOC_STREAM_CHUNK_CHARS pieces as tools are
+    serialized, keeping a copy for the artifact store
+    """
+    pieces = AlteryxDocGenerator().iter_alteryx_xml(analysis)
+    fd, xml_path = tempfile.mkstemp(suffix=".xml.tmp", dir=artifact_store.directory)
+    
+    def next_chunk() -> bytes:
+        batch, size = [], 0
+        for piece in pieces:
+            batch.append(piece)
+            size += len(piece)
+            if size >= DOC_STREAM_CHUNK_CHARS:
+                break
+        chunk = "".join(batch).encode("utf-8")
+        xml_file.write(chunk)
+        return chunk
+    
+    try:
+        with os.fdopen(fd, "wb") as xml_file:
+            while True:
+                # Serialized off the event loop, a batch of tools at a time
+                chunk = await asyncio.to_thread(next_chunk)
+                if not chunk:
+                    break
+                yield chunk
+        artifact_store.put_file(doc_id, "workflow.xml", xml_path)
+    finally:
+        if os.path.exists(xml_path):
+            os.remove(xml_path)
+
+@app.get("/documents/{doc_id}/alteryx-xml")
+async def download_alteryx_xml(doc_id: str):
+    """Download the generated Alteryx XML, streamed tool by tool when it is not stored yet"""
+    artifact = artifact_store.get(doc_id, "workflow.xml") if is_valid_doc_id(doc_id) else None
+    headers = {"Content-Disposition": "attachment; filename=workflow.xml"}
+    if artifact is not None:
+        if artifact.data is not None:
+            return Response(content=artifact.data, media_type="application/xml", headers=headers)
+        return FileResponse(artifact.path, media_type="application/xml", headers=headers)
+    cached = await get_cached(doc_id)
+    return StreamingResponse(stream_alteryx_xml(doc_id, cached.analysis), media_type="application/xml",
+                             headers=headers)
+
+async def stream_json_items(items, as_array: bool):
+    """Encode records as NDJSON lines or JSON array elements, ~DOC_STREAM_CHUNK_CHARS at a time"""
+    first = True
+    
+    def next_chunk() -> bytes:
+        nonlocal first
+        batch, size = [], 0
+        for item in items:
+            data = dumps_json(item)
+            if as_array:
+                data = (b"[" if first else b",") + data
+            else:
+                data += b"\n"
+            first = False
+            batch.append(data)
+            size += len(data)
+            if size >= DOC_STREAM_CHUNK_CHARS:
+                break
+        return b"".join(batch)
+    
+    while True:
+        # Parsed and encoded off the event loop, a batch of items at a time
+        chunk = await asyncio.to_thread(next_chunk)
+        if not chunk:
+            break
+        yield chunk
+    if as_array:
+        yield b"[]" if first else b"]"
+
+@app.get("/documents/{doc_id}/json")
+async def workflow_json(doc_id: str, level: str = "node", format: str = "ndjson",
+                        tool_id: Optional[List[str]] = Query(None), select: Optional[List[str]] = Query(None)):
+    """
+    Stream the uploaded workflow XML as JSON, one item per Node, Connection
+    or Configuration child (level=node|connection|configuration), as NDJSON
+    or a JSON array. Items follow xmltodict's conventions. Repeat tool_id=
+    to keep only those tools, and select= to keep only matching paths of
+    each item, e.g. select=Node/Properties/Configuration or select=File.
+    """
+    if level not in ITEM_LEVELS:
+        raise HTTPException(status_code=400, detail=f"level must be one of {', '.join(ITEM_LEVELS)}")
+    if format not in ("ndjson", "json"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or json")
+    source = get_source(doc_id)
+    items = iter_source_items(source, level, tool_id, select)
+    media_type = "application/json" if format == "json" else "application/x-ndjson"
+    return StreamingResponse(stream_json_items(items, format == "json"), media_type=media_type)
+
+async def get_fingerprints(doc_id: str) -> dict:
+    """Per-tool fingerprints for a processed document"""
+    cached = await load_cached(doc_id)
+    if cached is not None and cached.fingerprints:
+        return cached.fingerprints
+    artifact = artifact_store.get(doc_id, "fingerprints.json")
+    if artifact is None:
+        raise HTTPException(status_code=404, detail=f"Document {doc_id} not found, please upload the workflow again")
+    return json.loads(artifact.read())
+
+@app.get("/diff/{base_id}/{head_id}")
+async def diff_documents(base_id: str, head_id: str):
+    """Tools added, removed and changed between two uploads, compared by fingerprint"""
+    base = await get_fingerprints(base_id)
+    head = await get_fingerprints(head_id)
+    return {"base": base_id, "head": head_id, **diff_fingerprints(base, head)}
+
+async def get_graph(doc_id: str, tool_id: Optional[str] = None) -> WorkflowGraph:
+    """Connection graph for a processed document, checking tool_id exists"""
+    cached = await load_cached(doc_id)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Document not found, please upload the workflow again")
+    if cached.graph is None:
+        cached.graph = WorkflowGraph.from_analysis(cached.analysis)
+    if tool_id is not None and tool_id not in cached.graph.index:
+        raise HTTPException(status_code=404, detail=f"Tool {tool_id} not found in workflow")
+    return cached.graph
+
+async def load_cached(doc_id: str) -> Optional[CachedResult]:
+    """Cached result for doc_id; entries spilled to disk are read and unpickled off the event loop"""
+    if not is_valid_doc_id(doc_id):
+        return None
+    cached = result_cache.get(doc_id, load=False)
+    if cached is None and result_cache.cache_dir:
+        cached = await asyncio.to_thread(result_cache.get, doc_id)
+    return cached
+
+async def get_cached(doc_id: str) -> CachedResult:
+    cached = await load_cached(doc_id)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Document not found, please upload the workflow again")
+    return cached
+
+SEARCH_SCOPES = ("all", "lines", "tools")
+
+def get_search_index(cached: CachedResult, doc_id: str) -> SearchIndex:
+    """Search index for a processed document, built from the stored source for entries cached without one"""
+    if cached.search_index is None:
+        source = artifact_store.get(doc_id, SOURCE_ARTIFACT)
+        cached.search_index = SearchIndex.from_source(source.read() if source else None, cached.analysis)
+    return cached.search_index
+
+@app.get("/search")
+async def search_workflow(doc_id: str, q: str, scope: str = "all",
+                          offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    """
+    Case-insensitive search over a workflow's XML lines and tool fields
+    Returns one page of line numbers and tool IDs with [start, end) highlight ranges
+    """
+    if scope not in SEARCH_SCOPES:
+        raise HTTPException(status_code=400, detail=f"scope must be one of {', '.join(SEARCH_SCOPES)}")
+    if len(q) < MIN_QUERY_CHARS:
+        raise HTTPException(status_code=400, detail=f"q must be at least {MIN_QUERY_CHARS} characters")
+    cached = await get_cached(doc_id)
+    with stage("search"):
+        index = await asyncio.to_thread(get_search_index, cached, doc_id)
+        results = await asyncio.to_thread(index.search, q, scope, offset, limit)
+    hits = results.get("lines", {}).get("hits")
+    source = artifact_store.get(doc_id, SOURCE_ARTIFACT) if hits else None
+    if source is not None:
+        # Text of the returned page only, so clients need not hold the whole document
+        lines = await asyncio.to_thread(read_numbered_lines, doc_id, source, [hit["line"] for hit in hits],
+                                        source_encoding(cached))
+        for hit, text in zip(hits, lines):
+            hit["text"] = text
+    return {"doc_id": doc_id, "offset": offset, "limit": limit, **results}
+
+@app.get("/catalog")
+async def catalog_stats():
+    """Row counts of the workflow catalog"""
+    return await asyncio.to_thread(catalog.stats)
+
+@app.get("/catalog/plugins")
+async def catalog_plugin(plugin: str, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """Workflows using a plugin, by plugin name or tool name, with the matching tool IDs"""
+    with stage("catalog_query"):
+        return await asyncio.to_thread(catalog.find_plugin, plugin, limit, offset)
+
+@app.get("/catalog/config-values")
+async def catalog_config_value(value: str, match: str = "exact", key: Optional[str] = None,
+                               offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """
+    Workflows whose tool configurations hold a value, e.g. the file or
+    database a tool reads; match is exact, prefix or contains
+    """
+    if match not in MATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"match must be one of {', '.join(MATCH_MODES)}")
+    with stage("catalog_query"):
+        return await asyncio.to_thread(catalog.find_config_value, value, match, key, limit, offset)
+
+@app.get("/catalog/constants")
+async def catalog_constant(name: str, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """Workflows defining a workflow constant, and workflows referencing it in a configuration"""
+    with stage("catalog_query"):
+        return await asyncio.to_thread(catalog.find_constant, name, limit, offset)
+
+def source_encoding(cached: Optional[CachedResult]) -> str:
+    return getattr(cached.analysis, "source_encoding", "utf-8") if cached is not None else "utf-8"
+
+def read_numbered_lines(doc_id: str, source: Artifact, numbers: List[int], encoding: str) -> List[str]:
+    return line_indexes.get(doc_id, source).read_numbered(source, numbers, encoding)
+
+def get_source(doc_id: str) -> Artifact:
+    source = artifact_store.get(doc_id, SOURCE_ARTIFACT) if is_valid_doc_id(doc_id) else None
+    if source is None:
+        raise HTTPException(status_code=404, detail="Document not found, please upload the workflow again")
+    return source
+
+@app.get("/xml/{doc_id}")
+async def workflow_source(doc_id: str):
+    """The workflow exactly as uploaded"""
+    source = get_source(doc_id)
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": f'"{doc_id}"'}
+    if source.data is not None:
+        return Response(content=source.data, media_type="application/xml", headers=headers)
+    return FileResponse(source.path, media_type="application/xml", headers=headers)
+
+@app.get("/xml/{doc_id}/lines")
+async def workflow_source_lines(request: Request, doc_id: str, start: int = Query(1, ge=1),
+                                count: int = Query(200, ge=1, le=MAX_LINES_PER_REQUEST)):
+    """
+    Lines start..start + count - 1 (1-based) of the uploaded workflow, escaped and syntax highlighted
+    Responses never change for a document, so browsers may cache them indefinitely
+    """
+    # Expired or unknown documents are a 404 even for clients holding an old ETag
+    source = get_source(doc_id)
+    etag = f'"{doc_id}-{start}-{count}"'
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    encoding = source_encoding(await load_cached(doc_id))
+    
+    def render() -> dict:
+        index = line_indexes.get(doc_id, source)
+        lines = index.read(source, start, count, encoding)
+        return {"total_lines": index.total, "lines": [highlight_line(line) for line in lines]}
+    
+    with stage("xml_lines"):
+        chunk = await asyncio.to_thread(render)
+    return FastJSONResponse({"doc_id": doc_id, "start": start, "count": len(chunk["lines"]), **chunk},
+                            headers=headers)
+
+@app.get("/workflow/{doc_id}/tools")
+async def workflow_tools(doc_id: str):
+    """Lightweight tool summaries and connections; configurations come from /workflow/{doc_id}/tool/{tool_id}"""
+    workflow = (await get_cached(doc_id)).analysis
+    return {
+        "doc_id": doc_id,
+        "name": workflow.name,
+        "tools": workflow.tool_summaries(),
+        "data_flow": list(workflow.data_flow)
+    }
+
+@app.get("/workflow/{doc_id}/tool/{tool_id}")
+async def workflow_tool(doc_id: str, tool_id: str):
+    """
+    One tool with its full configuration, decoded on demand from the uploaded bytes
+    configuration matches the analysis; configuration_tree keeps nested elements
+    """
+    workflow = (await get_cached(doc_id)).analysis
+    index = workflow.tool_index(tool_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Tool {tool_id} not found in workflow")
+    tool = workflow.tools[index]
+    details = {
+        "tool_id": tool.tool_id,
+        "plugin": tool.plugin,
+        "description": tool.description,
+        "connections": tool.connections,
+        "position": tool.position,
+        "custom_properties": tool.custom_properties
+    }
+    span = workflow.config_span(index)
+    source = artifact_store.get(doc_id, SOURCE_ARTIFACT) if span else None
+    if source is None:
+        # Source expired or never recorded: fall back to the parsed configuration
+        return {**details, "configuration": tool.configuration, "configuration_tree": None, "configuration_xml": None}
+    encoding = getattr(workflow, "source_encoding", "utf-8")
+    decoded = await asyncio.to_thread(configuration_decoder.decode, doc_id, tool_id, source, span, encoding)
+    return {**details, **decoded}
+
+@app.get("/workflow/{doc_id}/graph")
+async def workflow_graph(doc_id: str):
+    """Topological order, components, cycles, sources and sinks of a workflow"""
+    return (await get_graph(doc_id)).summary()
+
+DIAGRAM_MEDIA_TYPES = {"svg": "image/svg+xml", "json": "application/json"}
+
+@app.get("/workflow/{doc_id}/diagram")
+async def workflow_diagram(request: Request, doc_id: str, format: str = "svg", detail: str = "auto",
+                           zoom: float = Query(1.0, gt=0)):
+    """
+    Flow diagram laid out from the tools' canvas positions, as SVG or a JSON scene
+    detail merges linear chains, Tool Containers or whole categories into clusters; "auto"
+    picks by zoom and size. Zoom snaps to a power of two and each variant is stored once.
+    """
+    if format not in DIAGRAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(DIAGRAM_MEDIA_TYPES)}")
+    if detail not in DETAIL_LEVELS:
+        raise HTTPException(status_code=400, detail=f"detail must be one of {', '.join(DETAIL_LEVELS)}")
+    zoom = snap_zoom(zoom)
+    
+    def build() -> Optional[bytes]:
+        cached = result_cache.get(doc_id) if is_valid_doc_id(doc_id) else None
+        if cached is None:
+            return None
+        if cached.graph is None:
+            cached.graph = WorkflowGraph.from_analysis(cached.analysis)
+        with stage("diagram") as block:
+            scene = build_scene(cached.analysis, cached.graph, detail, zoom)
+            data = render_svg(scene).encode("utf-8") if format == "svg" else dumps_json(scene)
+            block.size = len(data)
+        return data
+    
+    name = f"diagram-{detail}-{zoom:g}.{format}"
+    return await asyncio.to_thread(encoded_artifact_response, request, doc_id, name, DIAGRAM_MEDIA_TYPES[format], build)
+
+@app.get("/workflow/{doc_id}/upstream/{tool_id}")
+async def workflow_upstream(doc_id: str, tool_id: str, max_depth: Optional[int] = None):
+    """Every tool feeding tool_id, nearest first"""
+    return {"tool_id": tool_id, "upstream": (await get_graph(doc_id, tool_id)).upstream(tool_id, max_depth)}
+
+@app.get("/workflow/{doc_id}/downstream/{tool_id}")
+async def workflow_downstream(doc_id: str, tool_id: str, max_depth: Optional[int] = None):
+    """Every tool fed by tool_id, nearest first"""
+    return {"tool_id": tool_id, "downstream": (await get_graph(doc_id, tool_id)).downstream(tool_id, max_depth)}
+
+@app.get("/workflow/{doc_id}/lineage/{tool_id}")
+async def workflow_lineage(doc_id: str, tool_id: str, max_depth: Optional[int] = None):
+    """Upstream and downstream tools of tool_id with the connections between them"""
+    return (await get_graph(doc_id, tool_id)).lineage(tool_id, max_depth)
+
+def get_xml_artifact(doc_id: str) -> Artifact:
+    """Stored workflow XML for a document, rebuilt from the result cache if it expired"""
+    if not is_valid_doc_id(doc_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    artifact = artifact_store.get(doc_id, "workflow.xml")
+    if artifact is None:
+        cached = result_cache.get(doc_id)
+        if cached is None:
+            raise HTTPException(status_code=404, detail="Document not found, please upload the workflow again")
+        artifact = artifact_store.put(doc_id, "workflow.xml", cached.alteryx_xml)
+    return artifact
+
+def export_input(doc_id: str, output_format: str):
+    """Stored input artifact and title for an export job; runs in a thread when the job starts"""
+    cached = result_cache.get(doc_id)
+    title = cached.analysis.name if cached is not None else "Alteryx Workflow"
+    input_name = EXPORT_FORMATS[output_format][0]
+    if input_name == "workflow.xml":
+        return get_xml_artifact(doc_id), title
+    artifact = artifact_store.get(doc_id, input_name)
+    if artifact is None:
+        if cached is None:
+            raise HTTPException(status_code=404, detail="Document not found, please upload the workflow again")
+        artifact = artifact_store.put(doc_id, input_name, cached.markdown)
+    return artifact, title
+
+async def submit_export(doc_id: str, output_format: str) -> ExportJob:
+    if output_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if not is_valid_doc_id(doc_id) or (await load_cached(doc_id) is None
+                                       and artifact_store.get(doc_id, EXPORT_FORMATS[output_format][1]) is None
+                                       and artifact_store.get(doc_id, EXPORT_FORMATS[output_format][0]) is None):
+        raise HTTPException(status_code=404, detail="Document not found, please upload the workflow again")
+    return export_queue.submit(doc_id, output_format, lambda: export_input(doc_id, output_format))
+
+def get_export_job(job_id: str) -> ExportJob:
+    job = export_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+def export_response(request: Request, job: ExportJob) -> Response:
+    """Serve a finished export, or 304 when the client already holds it"""
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=f"Export failed: {job.error}")
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}")
+    headers = {"ETag": job.etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == job.etag:
+        return Response(status_code=304, headers=headers)
+    artifact = export_queue.output(job)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Export has expired, please submit it again")
+    _, _, media_type, filename = EXPORT_FORMATS[job.format]
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+    if artifact.data is not None:
+        return Response(content=artifact.data, media_type=media_type, headers=headers)
+    return FileResponse(artifact.path, media_type=media_type, headers=headers)
+
+@app.post("/documents/{doc_id}/exports")
+async def create_export(doc_id: str, format: str = "pdf"):
+    """
+    Start exporting a document as pdf, html or markdown and return the job
+    Identical exports already in progress are joined rather than repeated
+    """
+    job = await submit_export(doc_id, format)
+    return JSONResponse(status_code=200 if job.status == DONE else 202, content=job.to_dict())
+
+@app.get("/exports/{job_id}")
+async def export_status(job_id: str, wait: float = Query(0, ge=0, le=MAX_EXPORT_WAIT_SECONDS)):
+    """Status of an export job; with wait=, held open until the job finishes or wait seconds pass"""
+    job = get_export_job(job_id)
+    if wait:
+        await job.wait(wait)
+    return job.to_dict()
+
+@app.get("/exports/{job_id}/events")
+async def export_events(job_id: str):
+    """Stream the job's status as NDJSON, one line per change, until it is done or failed"""
+    job = get_export_job(job_id)
+
+    async def stream_status():
+        while True:
+            yield json.dumps(job.to_dict()) + "\n"
+            if job.is_finished:
+                return
+            await job.wait_for_change()
+
+    return StreamingResponse(stream_status(), media_type="application/x-ndjson")
+
+@app.get("/exports/{job_id}/download")
+async def export_download(request: Request, job_id: str):
+    """Download a finished export"""
+    return export_response(request, get_export_job(job_id))
+
+@app.get("/download-xml-pdf/{doc_id}")
+async def download_xml_pdf(request: Request, doc_id: str):
+    """
+    Download the workflow XML as PDF
+    The request that starts the export streams the PDF as it renders; requests
+    that join it wait and get the stored, ETag-cached artifact
+    """
+    job = await submit_export(doc_id, "pdf")
+    if job.requests == 1 and request.headers.get("if-none-match") != job.etag:
+        partial = export_queue.follow(job)
+        if partial is not None:
+            filename = EXPORT_FORMATS["pdf"][3]
+            return StreamingResponse(partial, media_type="application/pdf",
+                                     headers={"Content-Disposition": f"attachment; filename={filename}"})
+    await job.wait()
+    return export_response(request, job)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=5507) 
\ No newline at end of file
@@ -0,0 +1,334 @@
+"""
+Document every Alteryx workflow under a directory tree
+
+Workflows (.yxmd), macros (.yxmc) and packages (.yxzp) are documented in a
+process pool and the outputs are mirrored under the output directory. A
+manifest of content hashes and output versions is kept there, so a re-run
+only touches files that were added or changed since the previous one:
+
+    python batch_document.py /mnt/shared/workflows /srv/docs --formats markdown xml pdf
+
+With --catalog every documented workflow is also indexed into a SQLite
+workflow catalog, the same one the server answers /catalog queries from.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from catalog import WorkflowCatalog
+from packages import WorkflowPackage, WORKFLOW_EXTENSIONS, PACKAGE_EXTENSIONS
+from compact import CompactWorkflow
+from toolsmetadata import AlteryxDocGenerator
+from xml_to_pdf import iter_xml_pdf
+
+# Bump whenever the generated documents change, so every workflow is re-rendered once
+OUTPUT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+FORMATS = {"markdown": ".md", "xml": ".xml", "pdf": ".pdf"}
+DEFAULT_FORMATS = ["markdown", "xml"]
+# Completed files between manifest checkpoints, so an interrupted run keeps its progress
+CHECKPOINT_EVERY = 100
+
+
+def iter_sources(root: str, output_dir: str) -> Iterator[str]:
+    """Workflow, macro and package paths under root, relative to it, in a stable order"""
+    output_dir = os.path.abspath(output_dir)
+    for directory, subdirectories, files in os.walk(root):
+        # Never document our own outputs when they live inside the source tree
+        subdirectories[:] = sorted(d for d in subdirectories
+                                   if os.path.abspath(os.path.join(directory, d)) != output_dir)
+        for name in sorted(files):
+            if name.lower().endswith(WORKFLOW_EXTENSIONS + PACKAGE_EXTENSIONS):
+                yield os.path.relpath(os.path.join(directory, name), root)
+
+
+def _is_inside(root: str, path: str) -> bool:
+    """True when path resolves to root or somewhere below it"""
+    root = os.path.realpath(root)
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+def _member_base(output_base: str, member: str) -> str:
+    """Output base for a package member; names that would escape the package's output directory are rejected"""
+    parts = member.replace("\\", "/").split("/")
+    if member.startswith(("/", "\\")) or re.match(r"^[A-Za-z]:", member) or ".." in parts:
+        raise ValueError(f"Unsafe package member name: {member}")
+    base = os.path.join(output_base, *[part for part in parts if part not in ("", ".")])
+    if not _is_inside(output_base, base):
+        raise ValueError(f"Unsafe package member name: {member}")
+    return base
+
+
+def _write_atomic(path: str, chunks: Iterable[bytes]) -> None:
+    """Write chunks to a temporary file and move it over path, so readers never see partial output"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _lines(pieces: Iterable[str]) -> Iterator[str]:
+    """Regroup generated text pieces into lines, for renderers that read line by line"""
+    partial = ""
+    for piece in pieces:
+        lines = (partial + piece).split("\n")
+        partial = lines.pop()
+        yield from lines
+    if partial:
+        yield partial
+
+
+def _render(content: bytes, base_path: str, formats: List[str]) -> Tuple[List[str], CompactWorkflow]:
+    """Write the requested outputs for one workflow next to base_path; returns (paths, parsed workflow)"""
+    generator = AlteryxDocGenerator()
+    workflow = generator.parse_workflow(content)
+    written = []
+    for output_format in formats:
+        path = base_path + FORMATS[output_format]
+        if output_format == "markdown":
+            _write_atomic(path, [generator.generate_markdown_doc(workflow).encode("utf-8")])
+        elif output_format == "xml":
+            # Written tool by tool as the XML is generated
+            _write_atomic(path, (piece.encode("utf-8") for piece in generator.iter_alteryx_xml(workflow)))
+        else:
+            # Written page by page as the PDF is rendered
+            _write_atomic(path, iter_xml_pdf(_lines(generator.iter_alteryx_xml(workflow))))
+        written.append(path)
+    return written, workflow
+
+
+def document_file(source_path: str, output_base: str, formats: List[str],
+                  known_sha256: Optional[str] = None, return_workflows: bool = False) -> dict:
+    """
+    Document one source file in a worker process
+    When its hash equals known_sha256 nothing is rendered and "unchanged" is set.
+    With return_workflows, "workflows" lists (package member or "", content
+    hash, parsed workflow) for the catalog.
+    """
+    start = time.perf_counter()
+    with open(source_path, "rb") as f:
+        content = f.read()
+    sha256 = hashlib.sha256(content).hexdigest()
+    result = {"sha256": sha256, "size": len(content)}
+    if sha256 == known_sha256:
+        return {**result, "unchanged": True}
+
+    outputs = []
+    workflows = []
+    if source_path.lower().endswith(PACKAGE_EXTENSIONS):
+        with open(source_path, "rb") as f:
+            package = WorkflowPackage(f)
+            try:
+                # Every name is checked before anything is written
+                bases = [(member, _member_base(output_base, member)) for member in package.workflows]
+                for member, member_base in bases:
+                    member_content = package.read(member)
+                    written, workflow = _render(member_content, member_base, formats)
+                    outputs += written
+                    workflows.append((member, hashlib.sha256(member_content).hexdigest(), workflow))
+            finally:
+                package.close()
+    else:
+        written, workflow = _render(content, output_base, formats)
+        outputs += written
+        workflows.append(("", sha256, workflow))
+    result.update(outputs=outputs, tools=sum(len(workflow.tools) for _, _, workflow in workflows),
+                  seconds=round(time.perf_counter() - start, 3))
+    if return_workflows:
+        result["workflows"] = workflows
+    return result
+
+
+class Manifest:
+    """Per-source record of what was documented, persisted as JSON in the output directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def is_current(self, relative_path: str, stat: os.stat_result, formats: List[str], output_dir: str) -> bool:
+        """True when the source is unchanged by size and mtime and its outputs are complete"""
+        entry = self.files.get(relative_path)
+        return (entry is not None and "error" not in entry
+                and entry["output_version"] == OUTPUT_VERSION
+                and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+                and set(formats) <= set(entry["formats"])
+                and all(os.path.exists(os.path.join(output_dir, path)) for path in entry["outputs"]))
+
+    def known_hash(self, relative_path: str, formats: List[str], output_dir: str) -> Optional[str]:
+        """Hash of a source whose outputs are complete, so a touched but unmodified file is not re-rendered"""
+        entry = self.files.get(relative_path)
+        if (entry is None or "error" in entry or entry["output_version"] != OUTPUT_VERSION
+                or not set(formats) <= set(entry["formats"])
+                or not all(os.path.exists(os.path.join(output_dir, path)) for path in entry["outputs"])):
+            return None
+        return entry["sha256"]
+
+    def save(self) -> None:
+        data = json.dumps({"output_version": OUTPUT_VERSION, "files": self.files}, indent=2, sort_keys=True)
+        _write_atomic(self.path, [data.encode("utf-8")])
+
+
+def _catalog_path(relative_path: str, member: str) -> str:
+    """Catalog key of a source, or of one workflow inside a package"""
+    relative_path = relative_path.replace(os.sep, "/")
+    return f"{relative_path}/{member}" if member else relative_path
+
+
+def _in_catalog(indexed: Dict[str, str], relative_path: str, sha256: Optional[str]) -> bool:
+    """True when the catalog already holds this version of a source"""
+    path = _catalog_path(relative_path, "")
+    if relative_path.lower().endswith(PACKAGE_EXTENSIONS):
+        return any(key.startswith(path + "/") for key in indexed)
+    return indexed.get(path) == sha256
+
+
+def run(source_dir: str, output_dir: str, formats: List[str], workers: Optional[int] = None,
+        force: bool = False, prune: bool = False, catalog: Optional[WorkflowCatalog] = None) -> dict:
+    """
+    Document every source under source_dir that changed since the last run; returns counts
+    Sources missing from the catalog, when one is given, are documented again to index them
+    """
+    manifest = Manifest(os.path.join(output_dir, MANIFEST_NAME))
+    indexed = catalog.indexed() if catalog is not None else {}
+    counts = {"documented": 0, "unchanged": 0, "failed": 0, "removed": 0}
+    seen = set()
+    pending = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for relative_path in iter_sources(source_dir, output_dir):
+            seen.add(relative_path)
+            source_path = os.path.join(source_dir, relative_path)
+            stat = os.stat(source_path)
+            cataloged = catalog is None or _in_catalog(
+                indexed, relative_path, manifest.files.get(relative_path, {}).get("sha256"))
+            if not force and cataloged and manifest.is_current(relative_path, stat, formats, output_dir):
+                counts["unchanged"] += 1
+                continue
+            known = None if force or not cataloged else manifest.known_hash(relative_path, formats, output_dir)
+            future = executor.submit(document_file, source_path, os.path.join(output_dir, relative_path),
+                                     formats, known, catalog is not None)
+            pending[future] = (relative_path, stat)
+
+        try:
+            for completed, future in enumerate(as_completed(pending), 1):
+                relative_path, stat = pending[future]
+                entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "output_version": OUTPUT_VERSION,
+                         "documented_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Earlier outputs stay listed so --prune can still remove them
+                    previous = manifest.files.get(relative_path, {}).get("outputs", [])
+                    manifest.files[relative_path] = {**entry, "formats": [], "outputs": previous, "sha256": None,
+                                                     "error": f"{type(e).__name__}: {e}"}
+                    counts["failed"] += 1
+                    print(f"FAILED {relative_path}: {e}", file=sys.stderr)
+                else:
+                    if result.get("unchanged"):
+                        # Touched but identical: keep the outputs, remember the new mtime
+                        manifest.files[relative_path].update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                        counts["unchanged"] += 1
+                    else:
+                        outputs = [os.path.relpath(path, output_dir) for path in result["outputs"]]
+                        previous = manifest.files.get(relative_path, {}).get("outputs", [])
+                        # e.g. members removed from a package since the last run
+                        _remove_outputs(output_dir, set(previous) - set(outputs))
+                        if catalog is not None:
+                            _index(catalog, relative_path, result["workflows"])
+                        manifest.files[relative_path] = {
+                            **entry,
+                            "sha256": result["sha256"],
+                            "formats": sorted(formats),
+                            "outputs": outputs,
+                            "tools": result["tools"],
+                            "seconds": result["seconds"]
+                        }
+                        counts["documented"] += 1
+                        print(f"documented {relative_path} ({result['tools']} tools, {result['seconds']} s)",
+                              file=sys.stderr)
+                if completed % CHECKPOINT_EVERY == 0:
+                    manifest.save()
+        finally:
+            if prune:
+                counts["removed"] = _prune(manifest, seen, output_dir, catalog)
+            manifest.save()
+    return counts
+
+
+def _index(catalog: WorkflowCatalog, relative_path: str, workflows: List[tuple]) -> None:
+    """Index a documented source's workflows, dropping package members that no longer exist"""
+    paths = []
+    for member, sha256, workflow in workflows:
+        paths.append(_catalog_path(relative_path, member))
+        catalog.index(paths[-1], sha256, workflow)
+    catalog.remove(_catalog_path(relative_path, ""), keep=paths)
+
+
+def _prune(manifest: Manifest, seen: set, output_dir: str, catalog: Optional[WorkflowCatalog] = None) -> int:
+    """Delete outputs of sources that no longer exist and drop them from the manifest and catalog"""
+    removed = 0
+    for relative_path in [path for path in manifest.files if path not in seen]:
+        _remove_outputs(output_dir, manifest.files.pop(relative_path)["outputs"])
+        if catalog is not None:
+            catalog.remove(_catalog_path(relative_path, ""))
+        removed += 1
+    return removed
+
+
+def _remove_outputs(output_dir: str, outputs: Iterable[str]) -> None:
+    for output in outputs:
+        path = os.path.join(output_dir, output)
+        if not _is_inside(output_dir, path):
+            # Manifests are plain JSON; never follow an entry out of the output directory
+            print(f"refusing to remove {path}: outside {output_dir}", file=sys.stderr)
+            continue
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source_dir", help="directory tree to search for workflows")
+    parser.add_argument("output_dir", help="where documentation and the manifest are written")
+    parser.add_argument("--formats", nargs="+", default=DEFAULT_FORMATS, choices=list(FORMATS))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="re-document every workflow, ignoring the manifest")
+    parser.add_argument("--prune", action="store_true", help="remove outputs of workflows that were deleted")
+    parser.add_argument("--catalog", metavar="PATH", help="also index every workflow into this SQLite catalog")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.source_dir):
+        parser.error(f"{args.source_dir} is not a directory")
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    catalog = WorkflowCatalog(args.catalog) if args.catalog else None
+    try:
+        counts = run(args.source_dir, args.output_dir, args.formats, args.workers, args.force, args.prune, catalog)
+    finally:
+        if catalog is not None:
+            catalog.close()
+    print(f"{counts['documented']} documented, {counts['unchanged']} unchanged, {counts['failed']} failed, "
+          f"{counts['removed']} removed in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    sys.exit(1 if counts["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Compare retained memory of the pydantic WorkflowAnalysis with CompactWorkflow
+
+    python -m benchmarks.bench_memory --tools 1000 5000 --variants 0 50
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.synthetic import generate_workflow
+
+
+def _measure(build, content: str) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(content)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {"seconds": round(elapsed, 3), "retained_mb": round(retained / (1024 * 1024), 2)}
+
+
+def main() -> None:
+    from toolsmetadata import AlteryxDocGenerator
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tools", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--variants", type=int, nargs="+", default=[0, 50],
+                        help="distinct configurations per workflow (0 = every tool unique)")
+    args = parser.parse_args()
+
+    doc_generator = AlteryxDocGenerator()
+    models = {
+        "pydantic": doc_generator.parse_workflow_xml,
+        "compact": doc_generator.parse_workflow
+    }
+    print(f"{'model':<10} {'tools':>7} {'variants':>9} {'seconds':>9} {'retained MB':>12}")
+    for tools in args.tools:
+        for variants in args.variants:
+            content = generate_workflow(tools=tools, config_variants=variants or None)
+            for model, build in models.items():
+                result = _measure(build, content)
+                print(f"{model:<10} {tools:>7} {variants or 'unique':>9} "
+                      f"{result['seconds']:>9} {result['retained_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare xml_to_pdf.generate_xml_pdf with the streaming iter_xml_pdf renderer
+
+Each measurement runs in a fresh process so peak RSS reflects one render only.
+
+    python -m benchmarks.bench_pdf --lines 1000 10000 100000
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+
+from benchmarks.synthetic import generate_workflow
+
+
+def _xml_with_lines(lines: int) -> str:
+    from toolsmetadata import AlteryxDocGenerator
+    doc_generator = AlteryxDocGenerator()
+    # Roughly 14 output lines per synthetic tool with 5 configuration fields
+    analysis = doc_generator.parse_workflow_xml(generate_workflow(tools=max(1, lines // 14)))
+    return doc_generator.generate_alteryx_xml(analysis)
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run(renderer: str, lines: int, results) -> None:
+    import xml_to_pdf
+    xml_content = _xml_with_lines(lines)
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if renderer == "reportlab":
+        size = len(xml_to_pdf.generate_xml_pdf(xml_content))
+    else:
+        size = sum(len(chunk) for chunk in xml_to_pdf.iter_xml_pdf(xml_content))
+    elapsed = time.perf_counter() - start
+    results.put({
+        "renderer": renderer,
+        "lines": xml_content.count("\n") + 1,
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "rss_growth_mb": round(_peak_rss_mb() - baseline, 1),
+        "pdf_bytes": size
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--renderers", nargs="+", default=["reportlab", "streaming"],
+                        choices=["reportlab", "streaming"])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'renderer':<10} {'lines':>8} {'seconds':>9} {'peak MB':>9} {'growth MB':>10} {'PDF bytes':>11}")
+    for lines in args.lines:
+        for renderer in args.renderers:
+            results = context.Queue()
+            process = context.Process(target=_run, args=(renderer, lines, results))
+            process.start()
+            row = results.get()
+            process.join()
+            print(f"{row['renderer']:<10} {row['lines']:>8} {row['seconds']:>9} {row['peak_rss_mb']:>9} "
+                  f"{row['rss_growth_mb']:>10} {row['pdf_bytes']:>11}")
+
+
+if __name__ == "__main__":
+    main()
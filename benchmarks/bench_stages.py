@@ -0,0 +1,183 @@
+"""
+Benchmark each documentation stage on synthetic workflows of increasing size
+
+Reports throughput, latency percentiles and peak traced memory per stage
+and writes the results as JSON so runs can be compared:
+
+    python -m benchmarks.bench_stages --output results.json
+    python -m benchmarks.bench_stages --sizes 10 1000 --compare results.json
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.synthetic import generate_workflow
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 50000]
+STAGES = ["functions_parse", "parse", "markdown", "alteryx_xml", "pdf", "pdf_streaming"]
+# ReportLab takes minutes on the largest documents; opt in with --stages
+DEFAULT_STAGES = ["functions_parse", "parse", "markdown", "alteryx_xml", "pdf_streaming"]
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * percent / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _stage_functions(content: str) -> Dict[str, Callable[[], object]]:
+    """Zero-argument callables for every stage, with their inputs prepared up front"""
+    import functions
+    import xml_to_pdf
+    from fingerprints import FragmentCache
+    from toolsmetadata import AlteryxDocGenerator
+
+    def generator() -> AlteryxDocGenerator:
+        # A fresh fragment cache per run so rendering is never served from a previous iteration
+        return AlteryxDocGenerator(fragment_cache=FragmentCache())
+
+    analysis = generator().parse_workflow(content)
+    alteryx_xml = generator().generate_alteryx_xml(analysis)
+    return {
+        "functions_parse": lambda: functions.parse_workflow_xml(content),
+        "parse": lambda: generator().parse_workflow(content),
+        "markdown": lambda: generator().generate_markdown_doc(analysis),
+        "alteryx_xml": lambda: generator().generate_alteryx_xml(analysis),
+        "pdf": lambda: xml_to_pdf.generate_xml_pdf(alteryx_xml),
+        "pdf_streaming": lambda: sum(len(chunk) for chunk in xml_to_pdf.iter_xml_pdf(alteryx_xml))
+    }
+
+
+def _repeats(tools: int, requested: int) -> int:
+    if requested:
+        return requested
+    # Enough samples for stable percentiles on small inputs without hour-long runs on large ones
+    return max(3, min(50, 20000 // max(tools, 1)))
+
+
+def run_stage(run: Callable[[], object], repeats: int) -> dict:
+    """Time repeats calls, then measure peak traced memory in one extra call"""
+    run()  # Warm up imports and lazy caches
+    samples = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "repeats": repeats,
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(_percentile(samples, 99) * 1000, 3),
+        "peak_memory_mb": round(peak / (1024 * 1024), 2)
+    }
+
+
+def run_benchmarks(sizes: List[int], stages: List[str], repeats: int = 0, **workflow_options) -> dict:
+    results = []
+    for tools in sizes:
+        content = generate_workflow(tools=tools, **workflow_options)
+        input_bytes = len(content.encode("utf-8"))
+        runners = _stage_functions(content)
+        for stage in stages:
+            result = run_stage(runners[stage], _repeats(tools, repeats))
+            seconds = result["mean_ms"] / 1000
+            result.update({
+                "stage": stage,
+                "tools": tools,
+                "input_bytes": input_bytes,
+                "tools_per_second": round(tools / seconds, 1) if seconds else None,
+                "mb_per_second": round(input_bytes / (1024 * 1024) / seconds, 2) if seconds else None
+            })
+            results.append(result)
+            print(f"{stage:<16} {tools:>7} {result['p50_ms']:>11} {result['p95_ms']:>11} "
+                  f"{result['p99_ms']:>11} {result['tools_per_second']:>13} {result['peak_memory_mb']:>9}",
+                  file=sys.stderr)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workflow_options": workflow_options,
+        "results": results
+    }
+
+
+def compare(baseline: dict, current: dict) -> List[dict]:
+    """p50 latency ratio (current / baseline) for every stage and size present in both runs"""
+    previous = {(r["stage"], r["tools"]): r for r in baseline["results"]}
+    ratios = []
+    for result in current["results"]:
+        before = previous.get((result["stage"], result["tools"]))
+        if before and before["p50_ms"]:
+            ratios.append({
+                "stage": result["stage"],
+                "tools": result["tools"],
+                "baseline_p50_ms": before["p50_ms"],
+                "p50_ms": result["p50_ms"],
+                "ratio": round(result["p50_ms"] / before["p50_ms"], 3)
+            })
+    return ratios
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--stages", nargs="+", default=DEFAULT_STAGES, choices=STAGES)
+    parser.add_argument("--repeats", type=int, default=0, help="runs per stage (default scales with size)")
+    parser.add_argument("--fan-out", type=int, default=1)
+    parser.add_argument("--config-fields", type=int, default=5)
+    parser.add_argument("--config-variants", type=int, default=None)
+    parser.add_argument("--macro-ratio", type=float, default=0.0)
+    parser.add_argument("--nesting-depth", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON from a previous run")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="exit non-zero when any p50 ratio against the baseline exceeds this")
+    args = parser.parse_args()
+
+    print(f"{'stage':<16} {'tools':>7} {'p50 ms':>11} {'p95 ms':>11} {'p99 ms':>11} "
+          f"{'tools/s':>13} {'peak MB':>9}", file=sys.stderr)
+    report = run_benchmarks(
+        args.sizes, args.stages, args.repeats,
+        fan_out=args.fan_out,
+        config_fields=args.config_fields,
+        config_variants=args.config_variants,
+        macro_ratio=args.macro_ratio,
+        nesting_depth=args.nesting_depth
+    )
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(json.load(f), report)
+        regressions = [r for r in report["comparison"] if r["ratio"] > args.threshold]
+        for r in regressions:
+            print(f"REGRESSION {r['stage']} at {r['tools']} tools: "
+                  f"{r['baseline_p50_ms']} ms -> {r['p50_ms']} ms ({r['ratio']}x)", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Synthetic Alteryx workflow documents for benchmarking"""
+from typing import List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+PLUGINS = [
+    "AlteryxBasePluginsGui.DbFileInput.DbFileInput",
+    "AlteryxBasePluginsGui.Filter.Filter",
+    "AlteryxBasePluginsGui.Formula.Formula",
+    "AlteryxBasePluginsGui.AlteryxSelect.AlteryxSelect",
+    "AlteryxBasePluginsGui.Join.Join",
+    "AlteryxBasePluginsGui.Summarize.Summarize",
+    "AlteryxBasePluginsGui.Sort.Sort",
+    "AlteryxBasePluginsGui.DbFileOutput.DbFileOutput"
+]
+
+CONTAINER_PLUGIN = "AlteryxGuiToolkit.ToolContainer.ToolContainer"
+MACROS = ["Cleanse.yxmc", "MultiRowFormula.yxmc", "Sample_Macro.yxmc"]
+
+
+def _position(tool_id: int) -> str:
+    return f'<Position x="{(tool_id % 50) * 96}" y="{(tool_id // 50) * 96}" />'
+
+
+def _node(tool_id: int, plugin: str, config_fields: int, variant: int, macro: Optional[str] = None,
+          indent: str = "    ") -> str:
+    fields = "".join(
+        f'<Field{i} name="field_{i}" type="V_String" size="254">value {variant}-{i}</Field{i}>'
+        for i in range(config_fields)
+    )
+    if macro:
+        gui = f'<GuiSettings>{_position(tool_id)}</GuiSettings>'
+        engine = f'\n{indent}  <EngineSettings Macro={quoteattr(macro)} />'
+    else:
+        gui = f'<GuiSettings Plugin={quoteattr(plugin)}>{_position(tool_id)}</GuiSettings>'
+        engine = ""
+    return (
+        f'{indent}<Node ToolID="{tool_id}">\n'
+        f'{indent}  {gui}\n'
+        f'{indent}  <Properties>\n'
+        f'{indent}    <Configuration>{fields}</Configuration>\n'
+        f'{indent}    <Annotation DisplayMode="0"><DefaultAnnotationText>{escape(f"Tool {tool_id}")}</DefaultAnnotationText></Annotation>\n'
+        f'{indent}  </Properties>{engine}\n'
+        f'{indent}</Node>\n'
+    )
+
+
+def _container_open(tool_id: int, indent: str) -> str:
+    return (
+        f'{indent}<Node ToolID="{tool_id}">\n'
+        f'{indent}  <GuiSettings Plugin="{CONTAINER_PLUGIN}">{_position(tool_id)}</GuiSettings>\n'
+        f'{indent}  <Properties><Configuration><Caption>Container {tool_id}</Caption></Configuration></Properties>\n'
+        f'{indent}  <ChildNodes>\n'
+    )
+
+
+def _container_close(indent: str) -> str:
+    return f'{indent}  </ChildNodes>\n{indent}</Node>\n'
+
+
+def generate_workflow(tools: int = 100, config_fields: int = 5, name: str = "Synthetic Workflow",
+                      config_variants: Optional[int] = None, fan_out: int = 1,
+                      macro_ratio: float = 0.0, nesting_depth: int = 0) -> str:
+    """
+    Build a .yxmd document with tools connected as a fan_out-ary tree
+    (fan_out=1 gives a linear chain)
+
+    Every tool gets a unique configuration unless config_variants limits how
+    many distinct ones exist. macro_ratio is the share of tools that are macro
+    references instead of built-in plugins. nesting_depth wraps tools in that
+    many levels of nested Tool Containers; container ToolIDs follow the tools.
+    """
+    macro_every = round(1 / macro_ratio) if macro_ratio > 0 else 0
+    parts = ['<?xml version="1.0"?>\n<AlteryxDocument yxmdVer="2023.1">\n  <Nodes>\n']
+
+    # Tools are split into nesting_depth + 1 equal groups; group k sits k containers deep
+    groups = nesting_depth + 1
+    per_group = -(-tools // groups)
+    next_container = tools + 1
+    open_containers: List[str] = []
+    for tool_id in range(1, tools + 1):
+        level = min((tool_id - 1) // per_group, nesting_depth)
+        while len(open_containers) < level:
+            indent = "    " + "    " * len(open_containers)
+            parts.append(_container_open(next_container, indent))
+            open_containers.append(indent)
+            next_container += 1
+        variant = tool_id % config_variants if config_variants else tool_id
+        macro = MACROS[tool_id % len(MACROS)] if macro_every and tool_id % macro_every == 0 else None
+        indent = "    " + "    " * len(open_containers)
+        parts.append(_node(tool_id, PLUGINS[tool_id % len(PLUGINS)], config_fields, variant, macro, indent))
+    while open_containers:
+        parts.append(_container_close(open_containers.pop()))
+
+    parts.append("  </Nodes>\n  <Connections>\n")
+    for tool_id in range(2, tools + 1):
+        origin = (tool_id - 2) // max(fan_out, 1) + 1
+        parts.append(
+            f'    <Connection><Origin ToolID="{origin}" Connection="Output" />'
+            f'<Destination ToolID="{tool_id}" Connection="Input" /></Connection>\n'
+        )
+    parts.append(
+        "  </Connections>\n  <Properties>\n"
+        f"    <MetaInfo><Name>{escape(name)}</Name></MetaInfo>\n"
+        "  </Properties>\n</AlteryxDocument>\n"
+    )
+    return "".join(parts)
@@ -0,0 +1,318 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from compact import CompactWorkflow
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workflows (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    doc_id TEXT NOT NULL,
+    name TEXT,
+    yxmd_version TEXT,
+    tools INTEGER NOT NULL,
+    connections INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS workflows_doc_id ON workflows (doc_id);
+
+CREATE TABLE IF NOT EXISTS tools (
+    workflow_id INTEGER NOT NULL,
+    tool_id TEXT NOT NULL,
+    plugin TEXT COLLATE NOCASE,
+    tool_name TEXT COLLATE NOCASE,
+    category TEXT COLLATE NOCASE,
+    annotation TEXT
+);
+CREATE INDEX IF NOT EXISTS tools_workflow ON tools (workflow_id);
+CREATE INDEX IF NOT EXISTS tools_plugin ON tools (plugin, workflow_id, tool_id);
+CREATE INDEX IF NOT EXISTS tools_tool_name ON tools (tool_name, workflow_id, tool_id);
+
+CREATE TABLE IF NOT EXISTS config_values (
+    id INTEGER PRIMARY KEY,
+    workflow_id INTEGER NOT NULL,
+    tool_id TEXT NOT NULL,
+    key TEXT NOT NULL COLLATE NOCASE,
+    value TEXT NOT NULL COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS config_values_workflow ON config_values (workflow_id);
+CREATE INDEX IF NOT EXISTS config_values_value ON config_values (value, key, workflow_id, tool_id);
+CREATE INDEX IF NOT EXISTS config_values_key ON config_values (key, value);
+
+CREATE TABLE IF NOT EXISTS connections (
+    workflow_id INTEGER NOT NULL,
+    origin_tool_id TEXT NOT NULL,
+    origin_connection TEXT,
+    destination_tool_id TEXT NOT NULL,
+    destination_connection TEXT
+);
+CREATE INDEX IF NOT EXISTS connections_workflow ON connections (workflow_id);
+
+CREATE TABLE IF NOT EXISTS constants (
+    workflow_id INTEGER NOT NULL,
+    name TEXT NOT NULL COLLATE NOCASE,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS constants_workflow ON constants (workflow_id);
+CREATE INDEX IF NOT EXISTS constants_name ON constants (name, workflow_id);
+"""
+
+# Substring search over configuration values; needs SQLite 3.34+ for the trigram tokenizer.
+# The index stores no copy of the values: its rowids are config_values ids, so a
+# workflow's entries are found, and deleted, through config_values_workflow.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS config_search USING fts5(
+    value, workflow_id UNINDEXED, tool_id UNINDEXED, key UNINDEXED,
+    content = 'config_values', content_rowid = 'id', tokenize = 'trigram'
+);
+"""
+
+# Stored in PRAGMA user_version; catalogs written before version 1 lack config_values.id
+SCHEMA_VERSION = 1
+
+CONFIG_COLUMNS = "workflow_id, tool_id, key, value"
+
+MATCH_MODES = ("exact", "prefix", "contains")
+
+CHILD_TABLES = ("tools", "config_values", "connections", "constants")
+
+
+def _config_rows(workflow: CompactWorkflow) -> Iterator[Tuple[str, str, str]]:
+    """(tool_id, key, value) for every configuration value; element attributes become key@attribute"""
+    for tool in workflow.tools:
+        for key, value in tool.configuration.items():
+            if isinstance(value, dict):
+                for attribute, item in value.items():
+                    yield tool.tool_id, f"{key}@{attribute}", str(item)
+            elif value is not None:
+                yield tool.tool_id, key, str(value)
+
+
+def _like_pattern(text: str, prefix: bool = False) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%" if prefix else "%" + escaped + "%"
+
+
+class WorkflowCatalog:
+    """
+    SQLite catalog of every indexed workflow's tools, configuration values,
+    connections and constants, for fleet-wide questions such as "which
+    workflows use this plugin" or "which workflows read this file".
+
+    Workflows are keyed by the path they were uploaded or found under.
+    Indexing a path again replaces its rows in one transaction, and is
+    skipped when the content hash (doc_id) is unchanged. Rows are written
+    with executemany, and every lookup column has an index, so queries
+    stay in the millisecond range across thousands of workflows.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.executescript(SCHEMA)
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            self._migrate_config_values()
+        try:
+            if version < 1:
+                self._db.execute("DROP TABLE IF EXISTS config_search")
+            self._db.executescript(FTS_SCHEMA)
+            if version < 1:
+                self._db.execute("INSERT INTO config_search (config_search) VALUES ('rebuild')")
+            self.fts = True
+        except sqlite3.OperationalError:
+            # Older SQLite: contains-queries fall back to LIKE scans
+            self.fts = False
+        self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @classmethod
+    def from_env(cls) -> "WorkflowCatalog":
+        """Catalog at ALTERYX_DOC_CATALOG_PATH, or in the temporary directory"""
+        path = os.environ.get("ALTERYX_DOC_CATALOG_PATH") or os.path.join(tempfile.gettempdir(), "alteryx-doc-catalog.db")
+        return cls(path)
+
+    def _migrate_config_values(self) -> None:
+        """Give configuration values of an older catalog the id the substring index is keyed by"""
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(config_values)")]
+        if "id" in columns:
+            return
+        self._db.executescript(f"""
+            BEGIN IMMEDIATE;
+            ALTER TABLE config_values RENAME TO config_values_old;
+            DROP INDEX config_values_workflow;
+            DROP INDEX config_values_value;
+            DROP INDEX config_values_key;
+            {SCHEMA}
+            INSERT INTO config_values ({CONFIG_COLUMNS}) SELECT {CONFIG_COLUMNS} FROM config_values_old;
+            DROP TABLE config_values_old;
+            COMMIT;
+        """)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _delete_rows(self, workflow_ids: List[int]) -> None:
+        for workflow_id in workflow_ids:
+            if self.fts:
+                # Index entries are removed by rowid, with the values they were built from
+                self._db.execute(
+                    f"INSERT INTO config_search (config_search, rowid, {CONFIG_COLUMNS}) "
+                    f"SELECT 'delete', id, {CONFIG_COLUMNS} FROM config_values WHERE workflow_id = ?",
+                    (workflow_id,))
+            for table in CHILD_TABLES:
+                self._db.execute(f"DELETE FROM {table} WHERE workflow_id = ?", (workflow_id,))
+
+    def index(self, path: str, doc_id: str, workflow: CompactWorkflow) -> bool:
+        """Index (or re-index) the workflow stored under path; False when it is already current"""
+        with self._lock:
+            row = self._db.execute("SELECT id, doc_id FROM workflows WHERE path = ?", (path,)).fetchone()
+            if row is not None and row[1] == doc_id:
+                return False
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                fields = (doc_id, workflow.name, workflow.yxmd_version, len(workflow.tool_ids),
+                          len(workflow.flow_origins), time.time())
+                if row is None:
+                    workflow_id = self._db.execute(
+                        "INSERT INTO workflows (doc_id, name, yxmd_version, tools, connections, indexed_at, path) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)", fields + (path,)).lastrowid
+                else:
+                    workflow_id = row[0]
+                    self._delete_rows([workflow_id])
+                    self._db.execute(
+                        "UPDATE workflows SET doc_id = ?, name = ?, yxmd_version = ?, tools = ?, connections = ?, "
+                        "indexed_at = ? WHERE id = ?", fields + (workflow_id,))
+                self._insert_rows(workflow_id, workflow)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return True
+
+    def _insert_rows(self, workflow_id: int, workflow: CompactWorkflow) -> None:
+        self._db.executemany(
+            "INSERT INTO tools VALUES (?, ?, ?, ?, ?, ?)",
+            ((workflow_id, tool.tool_id, tool.plugin, tool.custom_properties.get("tool_name"),
+              tool.custom_properties.get("category"), tool.custom_properties.get("annotation"))
+             for tool in workflow.tools))
+        self._db.executemany(
+            f"INSERT INTO config_values ({CONFIG_COLUMNS}) VALUES (?, ?, ?, ?)",
+            ((workflow_id, tool_id, key, value) for tool_id, key, value in _config_rows(workflow)))
+        if self.fts:
+            self._db.execute(
+                f"INSERT INTO config_search (rowid, {CONFIG_COLUMNS}) "
+                f"SELECT id, {CONFIG_COLUMNS} FROM config_values WHERE workflow_id = ?", (workflow_id,))
+        self._db.executemany(
+            "INSERT INTO connections VALUES (?, ?, ?, ?, ?)",
+            ((workflow_id, flow["origin_tool_id"], flow["origin_connection"],
+              flow["destination_tool_id"], flow["destination_connection"]) for flow in workflow.data_flow))
+        self._db.executemany(
+            "INSERT INTO constants VALUES (?, ?, ?)",
+            ((workflow_id, name, value) for name, value in workflow.workflow_constants.items()))
+
+    def remove(self, path: str, keep: Iterable[str] = ()) -> int:
+        """
+        Drop path, and for a package every member indexed under path/ that
+        is not in keep, returning the number of workflows removed
+        """
+        keep = set(keep)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [row[0] for row in self._db.execute(
+                    "SELECT id, path FROM workflows WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                    (path, _like_pattern(path + "/", prefix=True))) if row[1] not in keep]
+                self._delete_rows(ids)
+                self._db.executemany("DELETE FROM workflows WHERE id = ?", ((i,) for i in ids))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return len(ids)
+
+    def indexed(self) -> Dict[str, str]:
+        """Every indexed path with its doc_id"""
+        with self._lock:
+            return dict(self._db.execute("SELECT path, doc_id FROM workflows"))
+
+    def _workflows(self, matches_sql: str, params: tuple, limit: int, offset: int) -> dict:
+        """
+        Page of workflows from a query yielding (workflow_id, tool_id) rows,
+        each with the tools that matched, plus the total number of workflows
+        """
+        with self._lock:
+            matching = f"SELECT workflow_id FROM ({matches_sql})"
+            total = self._db.execute(
+                f"SELECT COUNT(*) FROM workflows WHERE id IN ({matching})", params).fetchone()[0]
+            page = self._db.execute(
+                f"SELECT id, path, doc_id, name FROM workflows WHERE id IN ({matching}) "
+                f"ORDER BY path LIMIT ? OFFSET ?", params + (limit, offset)).fetchall()
+            # Matching tools for this page only
+            tool_ids = {row[0]: [] for row in page}
+            if page:
+                placeholders = ", ".join("?" * len(page))
+                for workflow_id, tool_id in self._db.execute(
+                        f"SELECT DISTINCT workflow_id, tool_id FROM ({matches_sql}) "
+                        f"WHERE workflow_id IN ({placeholders})", params + tuple(tool_ids)):
+                    tool_ids[workflow_id].append(tool_id)
+        return {
+            "total": total,
+            "workflows": [
+                {"path": path, "doc_id": doc_id, "name": name, "tool_ids": [t for t in tool_ids[i] if t]}
+                for i, path, doc_id, name in page
+            ]
+        }
+
+    def find_plugin(self, plugin: str, limit: int = 100, offset: int = 0) -> dict:
+        """Workflows with a tool whose plugin or tool name is plugin (case-insensitive)"""
+        sql = ("SELECT workflow_id, tool_id FROM tools WHERE plugin = ? "
+               "UNION ALL SELECT workflow_id, tool_id FROM tools WHERE tool_name = ?")
+        return self._workflows(sql, (plugin, plugin), limit, offset)
+
+    def _value_matches(self, value: str, match: str, key: Optional[str]) -> Tuple[str, tuple]:
+        if match == "exact":
+            sql, params = "SELECT workflow_id, tool_id, key FROM config_values WHERE value = ?", (value,)
+        elif match == "prefix":
+            sql, params = ("SELECT workflow_id, tool_id, key FROM config_values WHERE value LIKE ? ESCAPE '\\'",
+                           (_like_pattern(value, prefix=True),))
+        elif self.fts and len(value) >= 3:
+            # Trigram index; the phrase is quoted so punctuation and paths match literally
+            sql, params = ("SELECT workflow_id, tool_id, key FROM config_search WHERE config_search MATCH ?",
+                           ('"' + value.replace('"', '""') + '"',))
+        else:
+            sql, params = ("SELECT workflow_id, tool_id, key FROM config_values WHERE value LIKE ? ESCAPE '\\'",
+                           (_like_pattern(value),))
+        if key is not None:
+            sql, params = f"SELECT * FROM ({sql}) WHERE key = ? COLLATE NOCASE", params + (key,)
+        return f"SELECT workflow_id, tool_id FROM ({sql})", params
+
+    def find_config_value(self, value: str, match: str = "exact", key: Optional[str] = None,
+                          limit: int = 100, offset: int = 0) -> dict:
+        """Workflows with a configuration value equal to, starting with or containing value, optionally under key"""
+        if match not in MATCH_MODES:
+            raise ValueError(f"match must be one of {', '.join(MATCH_MODES)}")
+        sql, params = self._value_matches(value, match, key)
+        return self._workflows(sql, params, limit, offset)
+
+    def find_constant(self, name: str, limit: int = 100, offset: int = 0) -> dict:
+        """Workflows defining constant name, and workflows referencing it as %<namespace>.name% in a configuration"""
+        defining = self._workflows(
+            "SELECT workflow_id, '' AS tool_id FROM constants WHERE name = ?", (name,), limit, offset)
+        for workflow in defining["workflows"]:
+            workflow.pop("tool_ids")
+        sql, params = self._value_matches(f".{name}%", "contains", None)
+        return {"defining": defining, "referencing": self._workflows(sql, params, limit, offset)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {table: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ("workflows",) + CHILD_TABLES}
+        return {"path": self.path, "substring_index": self.fts, **counts}
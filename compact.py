@@ -0,0 +1,438 @@
+import sys
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models import WorkflowTool, WorkflowAnalysis
+from serialization import RawJSON, dumps_json, json_object
+
+# Sentinel stored in the position columns for tools without a position
+NO_POSITION = -(2 ** 31)
+
+# Sentinel stored in the configuration span columns for tools without one
+NO_SPAN = -1
+
+# Container index of tools that are not inside a Tool Container
+NO_CONTAINER = -1
+
+
+def _freeze_key(mapping: Dict) -> tuple:
+    """
+    Hashable key for a configuration/properties dict whose values are str or
+    attribute dicts; insertion order is kept because it shows in rendered output
+    """
+    return tuple(
+        (key, tuple(value.items()) if isinstance(value, dict) else value)
+        for key, value in mapping.items()
+    )
+
+
+class _Table:
+    """Deduplicating value table: equal values share one stored object and an integer ID"""
+    __slots__ = ("values", "_ids")
+
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def add(self, value, key=None) -> int:
+        key = value if key is None else key
+        value_id = self._ids.get(key)
+        if value_id is None:
+            value_id = self._ids[key] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+
+class CompactTool:
+    """Read-only view of one tool, exposing the same attributes as WorkflowTool"""
+    __slots__ = ("_workflow", "_index")
+
+    def __init__(self, workflow: "CompactWorkflow", index: int):
+        self._workflow = workflow
+        self._index = index
+
+    @property
+    def tool_id(self) -> str:
+        return self._workflow.tool_ids[self._index]
+
+    @property
+    def plugin(self) -> str:
+        return self._workflow.strings[self._workflow.plugin_ids[self._index]]
+
+    @property
+    def description(self) -> str:
+        return self._workflow.strings[self._workflow.description_ids[self._index]]
+
+    @property
+    def configuration(self) -> Dict:
+        # Shared between tools with identical configuration: treat as read-only
+        return self._workflow.configs[self._workflow.config_ids[self._index]]
+
+    @property
+    def custom_properties(self) -> Dict:
+        return self._workflow.properties[self._workflow.property_ids[self._index]]
+
+    @property
+    def connections(self) -> List[str]:
+        workflow = self._workflow
+        return workflow.connection_targets[workflow.connection_offsets[self._index]:
+                                           workflow.connection_offsets[self._index + 1]]
+
+    @property
+    def position(self) -> Dict[str, str]:
+        workflow = self._workflow
+        raw = workflow.raw_positions.get(self._index)
+        if raw is not None:
+            return {"x": raw[0], "y": raw[1]}
+        x = workflow.position_x[self._index]
+        if x == NO_POSITION:
+            return {}
+        return {"x": str(x), "y": str(workflow.position_y[self._index])}
+
+
+class _ToolSequence(Sequence):
+    __slots__ = ("_workflow",)
+
+    def __init__(self, workflow: "CompactWorkflow"):
+        self._workflow = workflow
+
+    def __len__(self) -> int:
+        return len(self._workflow.tool_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [CompactTool(self._workflow, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("tool index out of range")
+        return CompactTool(self._workflow, index)
+
+
+class _FlowSequence(Sequence):
+    __slots__ = ("_workflow",)
+
+    def __init__(self, workflow: "CompactWorkflow"):
+        self._workflow = workflow
+
+    def __len__(self) -> int:
+        return len(self._workflow.flow_origins)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        workflow = self._workflow
+        return {
+            "origin_tool_id": workflow.flow_origins[index],
+            "origin_connection": workflow.strings[workflow.flow_origin_connections[index]],
+            "destination_tool_id": workflow.flow_destinations[index],
+            "destination_connection": workflow.strings[workflow.flow_destination_connections[index]]
+        }
+
+
+class CompactWorkflow:
+    """
+    Memory-compact internal representation of a parsed workflow.
+
+    Per-tool data is held in parallel columns: interned ToolID strings,
+    integer IDs into a shared string table for plugins, descriptions and
+    connection names, array-backed positions, and IDs into tables of
+    configuration/property dicts deduplicated by content. Tool and data flow
+    access goes through lightweight views with the same attribute names as
+    the pydantic models, so the documentation generators work on either;
+    to_analysis() builds the pydantic WorkflowAnalysis at the API boundary.
+    """
+    __slots__ = (
+        "name", "creator", "created_date", "description", "yxmd_version",
+        "custom_tools", "workflow_constants",
+        "strings", "tool_ids", "plugin_ids", "description_ids", "position_x", "position_y",
+        "raw_positions", "configs", "config_ids", "properties", "property_ids",
+        "connection_offsets", "connection_targets", "config_starts", "config_ends", "source_encoding", "container_ids",
+        "flow_origins", "flow_destinations", "flow_origin_connections", "flow_destination_connections"
+    )
+
+    @classmethod
+    def from_analysis(cls, analysis: WorkflowAnalysis) -> "CompactWorkflow":
+        """Compact an existing pydantic WorkflowAnalysis"""
+        builder = CompactWorkflowBuilder()
+        for flow in analysis.data_flow:
+            builder.add_connection(flow["origin_tool_id"], flow["origin_connection"],
+                                   flow["destination_tool_id"], flow["destination_connection"])
+        for tool in analysis.tools:
+            builder.add_tool(tool.tool_id, tool.plugin, tool.description, tool.configuration,
+                             tool.position, tool.custom_properties)
+        return builder.build(
+            name=analysis.name,
+            creator=analysis.creator,
+            created_date=analysis.created_date,
+            description=analysis.description,
+            yxmd_version=analysis.yxmd_version,
+            custom_tools=analysis.custom_tools,
+            workflow_constants=analysis.workflow_constants
+        )
+
+    @property
+    def tools(self) -> _ToolSequence:
+        return _ToolSequence(self)
+
+    @property
+    def data_flow(self) -> _FlowSequence:
+        return _FlowSequence(self)
+
+    def to_analysis(self) -> WorkflowAnalysis:
+        """Materialize the pydantic model returned by the API"""
+        return WorkflowAnalysis(
+            name=self.name,
+            creator=self.creator,
+            created_date=self.created_date,
+            description=self.description,
+            tools=[
+                WorkflowTool(
+                    tool_id=tool.tool_id,
+                    plugin=tool.plugin,
+                    description=tool.description,
+                    configuration=tool.configuration,
+                    connections=tool.connections,
+                    position=tool.position,
+                    custom_properties=tool.custom_properties
+                )
+                for tool in self.tools
+            ],
+            data_flow=list(self.data_flow),
+            custom_tools=self.custom_tools,
+            workflow_constants=self.workflow_constants,
+            yxmd_version=self.yxmd_version
+        )
+
+    def config_span(self, index: int) -> Optional[Tuple[int, int]]:
+        """
+        (start, end) offsets of tool index's <Configuration> in the source
+        document: start is the "<" of the start tag and end points at
+        "</Configuration" or, for a self-closing element, just past it
+        """
+        starts = getattr(self, "config_starts", None)
+        if starts is None or starts[index] == NO_SPAN:
+            return None
+        return starts[index], self.config_ends[index]
+
+    def container_index(self, index: int) -> int:
+        """Index of the Tool Container directly holding tool index, or NO_CONTAINER"""
+        containers = getattr(self, "container_ids", None)
+        return NO_CONTAINER if containers is None else containers[index]
+
+    def tool_index(self, tool_id: str) -> Optional[int]:
+        """Index of the first tool with this ToolID"""
+        try:
+            return self.tool_ids.index(tool_id)
+        except ValueError:
+            return None
+
+    def tool_summaries(self) -> List[dict]:
+        """Per-tool fields the UI lists up front; configurations are fetched per tool"""
+        summaries = []
+        for i, tool in enumerate(self.tools):
+            span = self.config_span(i)
+            summaries.append({
+                "tool_id": tool.tool_id,
+                "plugin": tool.plugin,
+                "description": tool.description,
+                "connections": tool.connections,
+                "position": tool.position,
+                "custom_properties": tool.custom_properties,
+                "configuration_keys": list(tool.configuration),
+                "configuration_bytes": span[1] - span[0] if span else 0
+            })
+        return summaries
+
+    def to_dict(self) -> dict:
+        """Same structure as to_analysis().dict(), built without model validation or copies"""
+        return {
+            "name": self.name,
+            "creator": self.creator,
+            "created_date": self.created_date,
+            "description": self.description,
+            "tools": [
+                {
+                    "tool_id": tool.tool_id,
+                    "plugin": tool.plugin,
+                    "description": tool.description,
+                    "configuration": tool.configuration,
+                    "connections": tool.connections,
+                    "position": tool.position,
+                    "custom_properties": tool.custom_properties
+                }
+                for tool in self.tools
+            ],
+            "data_flow": list(self.data_flow),
+            "custom_tools": self.custom_tools,
+            "workflow_constants": self.workflow_constants,
+            "yxmd_version": self.yxmd_version
+        }
+
+    def to_json(self) -> bytes:
+        """
+        JSON encoding of to_dict(), assembled from the columns
+        Every distinct string, configuration and properties dict is encoded once
+        """
+        strings = [dumps_json(value) for value in self.strings]
+        configs = [dumps_json(value) for value in self.configs]
+        properties = [dumps_json(value) for value in self.properties]
+        tools = []
+        for i, tool_id in enumerate(self.tool_ids):
+            tool = CompactTool(self, i)
+            tools.append(
+                b'{"tool_id":' + dumps_json(tool_id)
+                + b',"plugin":' + strings[self.plugin_ids[i]]
+                + b',"description":' + strings[self.description_ids[i]]
+                + b',"configuration":' + configs[self.config_ids[i]]
+                + b',"connections":' + dumps_json(tool.connections)
+                + b',"position":' + dumps_json(tool.position)
+                + b',"custom_properties":' + properties[self.property_ids[i]] + b"}"
+            )
+        flows = [
+            b'{"origin_tool_id":' + dumps_json(origin)
+            + b',"origin_connection":' + strings[origin_connection]
+            + b',"destination_tool_id":' + dumps_json(destination)
+            + b',"destination_connection":' + strings[destination_connection] + b"}"
+            for origin, destination, origin_connection, destination_connection in zip(
+                self.flow_origins, self.flow_destinations,
+                self.flow_origin_connections, self.flow_destination_connections)
+        ]
+        return json_object({
+            "name": self.name,
+            "creator": self.creator,
+            "created_date": self.created_date,
+            "description": self.description,
+            "tools": RawJSON(b"[" + b",".join(tools) + b"]"),
+            "data_flow": RawJSON(b"[" + b",".join(flows) + b"]"),
+            "custom_tools": self.custom_tools,
+            "workflow_constants": self.workflow_constants,
+            "yxmd_version": self.yxmd_version
+        })
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+
+class CompactWorkflowBuilder:
+    """Accumulates parsed tools and connections into a CompactWorkflow"""
+
+    def __init__(self):
+        self.workflow = CompactWorkflow()
+        self._strings = _Table()
+        self._configs = _Table()
+        self._properties = _Table()
+        self._tool_ids = []
+        self._plugin_ids = array("I")
+        self._description_ids = array("I")
+        self._position_x = array("i")
+        self._position_y = array("i")
+        self._raw_positions = {}
+        self._config_ids = array("I")
+        self._property_ids = array("I")
+        self._flow_origins = []
+        self._flow_destinations = []
+        self._flow_origin_connections = array("I")
+        self._flow_destination_connections = array("I")
+        self._config_starts = array("q")
+        self._config_ends = array("q")
+        self._container_ids = array("i")
+
+    def __len__(self) -> int:
+        return len(self._tool_ids)
+
+    def _string(self, value: str) -> int:
+        return self._strings.add(sys.intern(value))
+
+    @staticmethod
+    def _is_plain_int(value) -> bool:
+        try:
+            return isinstance(value, str) and str(int(value)) == value and NO_POSITION < int(value) < 2 ** 31
+        except ValueError:
+            return False
+
+    def add_connection(self, origin_tool_id: str, origin_connection: str,
+                       destination_tool_id: str, destination_connection: str) -> None:
+        self._flow_origins.append(sys.intern(origin_tool_id))
+        self._flow_destinations.append(sys.intern(destination_tool_id))
+        self._flow_origin_connections.append(self._string(origin_connection))
+        self._flow_destination_connections.append(self._string(destination_connection))
+
+    def add_tool(self, tool_id: str, plugin: str, description: str, configuration: Dict,
+                 position: Dict[str, str], custom_properties: Dict,
+                 config_span: Optional[Tuple[int, int]] = None, container: int = NO_CONTAINER) -> None:
+        index = len(self._tool_ids)
+        self._tool_ids.append(sys.intern(tool_id))
+        self._plugin_ids.append(self._string(plugin))
+        self._description_ids.append(self._string(description))
+
+        x, y = position.get("x"), position.get("y")
+        if not position:
+            self._position_x.append(NO_POSITION)
+            self._position_y.append(NO_POSITION)
+        elif self._is_plain_int(x) and self._is_plain_int(y):
+            self._position_x.append(int(x))
+            self._position_y.append(int(y))
+        else:
+            # Keep coordinates that would not round-trip through int exactly as written
+            self._position_x.append(0)
+            self._position_y.append(0)
+            self._raw_positions[index] = (x, y)
+
+        start, end = config_span or (NO_SPAN, NO_SPAN)
+        self._config_starts.append(start)
+        self._config_ends.append(end)
+        self._container_ids.append(container)
+
+        configuration = {sys.intern(key): value for key, value in configuration.items()}
+        self._config_ids.append(self._configs.add(configuration, _freeze_key(configuration)))
+        self._property_ids.append(self._properties.add(custom_properties, _freeze_key(custom_properties)))
+
+    def build(self, name: str, creator: Optional[str] = None, created_date: Optional[str] = None,
+              description: Optional[str] = None, yxmd_version: Optional[str] = None,
+              custom_tools: Optional[List[Dict]] = None,
+              workflow_constants: Optional[Dict] = None, source_encoding: str = "utf-8") -> CompactWorkflow:
+        workflow = self.workflow
+        workflow.name = name
+        workflow.creator = creator
+        workflow.created_date = created_date
+        workflow.description = description
+        workflow.yxmd_version = yxmd_version
+        workflow.custom_tools = custom_tools or []
+        workflow.workflow_constants = workflow_constants or {}
+        workflow.strings = self._strings.values
+        workflow.tool_ids = self._tool_ids
+        workflow.plugin_ids = self._plugin_ids
+        workflow.description_ids = self._description_ids
+        workflow.position_x = self._position_x
+        workflow.position_y = self._position_y
+        workflow.raw_positions = self._raw_positions
+        workflow.configs = self._configs.values
+        workflow.config_ids = self._config_ids
+        workflow.properties = self._properties.values
+        workflow.property_ids = self._property_ids
+        workflow.flow_origins = self._flow_origins
+        workflow.flow_destinations = self._flow_destinations
+        workflow.flow_origin_connections = self._flow_origin_connections
+        workflow.flow_destination_connections = self._flow_destination_connections
+        workflow.config_starts = self._config_starts
+        workflow.config_ends = self._config_ends
+        workflow.source_encoding = source_encoding
+        workflow.container_ids = self._container_ids
+
+        # Outgoing connections per tool, in data flow order, as one flat column
+        outgoing = {}
+        for origin, destination in zip(self._flow_origins, self._flow_destinations):
+            outgoing.setdefault(origin, []).append(destination)
+        offsets = array("I", [0])
+        targets = []
+        for tool_id in self._tool_ids:
+            targets.extend(outgoing.get(tool_id, ()))
+            offsets.append(len(targets))
+        workflow.connection_offsets = offsets
+        workflow.connection_targets = targets
+        return workflow
@@ -0,0 +1,33 @@
+import html
+
+import markdown
+
+# Inline patterns that would carry raw HTML or URLs from workflow content into the page;
+# the generated documentation itself uses neither
+UNSAFE_INLINE_PATTERNS = ("html", "link", "image_link", "image_reference", "reference",
+                          "short_reference", "short_image_ref", "autolink", "automail")
+
+HTML_TAIL = "</body></html>\n"
+
+
+def safe_markdown() -> markdown.Markdown:
+    """
+    Markdown converter for documentation built from uploaded workflows
+    Raw HTML and link syntax in the text are rendered as literal, escaped
+    text, so names, annotations and configuration values cannot inject markup
+    """
+    converter = markdown.Markdown(extensions=["tables"])
+    converter.preprocessors.deregister("html_block")
+    for name in UNSAFE_INLINE_PATTERNS:
+        converter.inlinePatterns.deregister(name)
+    return converter
+
+
+def markdown_to_html(text: str, converter: markdown.Markdown = None) -> str:
+    """Convert documentation markdown to HTML; pass a converter to reuse it across sections"""
+    return (converter or safe_markdown()).reset().convert(text)
+
+
+def html_head(title: str) -> str:
+    return ("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(title)}</title></head><body>\n")
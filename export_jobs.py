@@ -0,0 +1,286 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, BinaryIO, Callable, Dict, Optional, Tuple
+
+from artifact_store import ArtifactStore, Artifact
+from doc_html import markdown_to_html, html_head, HTML_TAIL
+from worker_pool import PoolOverloaded
+from xml_to_pdf import iter_xml_pdf
+
+# Format -> (input artifact, output artifact, media type, download filename)
+EXPORT_FORMATS = {
+    "pdf": ("workflow.xml", "workflow.pdf", "application/pdf", "workflow-xml.pdf"),
+    "html": ("documentation.md", "documentation.html", "text/html; charset=utf-8", "documentation.html"),
+    "markdown": ("documentation.md", "documentation.md", "text/markdown; charset=utf-8", "documentation.md")
+}
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def render_export(output_format: str, input_path: str, output_path: str, title: str) -> int:
+    """Render one export from its stored input in a worker process; returns the output size"""
+    if output_format == "pdf":
+        with open(input_path, encoding="utf-8") as xml_file, open(output_path, "wb") as pdf_file:
+            for chunk in iter_xml_pdf(xml_file):
+                pdf_file.write(chunk)
+    elif output_format == "html":
+        with open(input_path, encoding="utf-8") as f:
+            body = markdown_to_html(f.read())
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(html_head(title) + body + "\n" + HTML_TAIL)
+    else:
+        shutil.copyfile(input_path, output_path)
+    return os.path.getsize(output_path)
+
+
+class ExportJob:
+    """One export of a document to a format, shared by every request that asked for it while it ran"""
+    __slots__ = ("job_id", "doc_id", "format", "status", "requests", "created", "started", "finished",
+                 "size", "error", "partial_path", "_changed")
+
+    def __init__(self, doc_id: str, output_format: str):
+        self.job_id = uuid.uuid4().hex
+        self.doc_id = doc_id
+        self.format = output_format
+        self.status = QUEUED
+        self.requests = 1
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.size = None
+        self.error = None
+        self.partial_path = None  # Where the worker writes the export until it is stored
+        self._changed = asyncio.Event()
+
+    @property
+    def artifact_name(self) -> str:
+        return EXPORT_FORMATS[self.format][1]
+
+    @property
+    def etag(self) -> str:
+        # Documents are content-addressed, so the export of one never changes
+        return f'"{self.doc_id}-{self.format}"'
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def _set(self, status: str, **fields) -> None:
+        self.status = status
+        for name, value in fields.items():
+            setattr(self, name, value)
+        # Wake everyone waiting on this change, then arm a fresh event for the next one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the status changes; False on timeout"""
+        if self.is_finished:
+            return False
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def wait(self, timeout: Optional[float] = None) -> None:
+        """Wait until the job is done or failed, or the timeout passes"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.is_finished:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return
+            await self.wait_for_change(remaining)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "doc_id": self.doc_id,
+            "format": self.format,
+            "status": self.status,
+            "requests": self.requests,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "size": self.size,
+            "error": self.error,
+            "status_url": f"/exports/{self.job_id}",
+            "download_url": f"/exports/{self.job_id}/download" if self.status == DONE else None
+        }
+
+
+class ExportQueue:
+    """
+    Background export jobs on a bounded process pool.
+
+    Submitting returns a job at once. A document's finished export is kept
+    in the artifact store, so later submissions complete immediately, and a
+    submission for a (document, format) pair that is already queued or
+    running joins that job instead of rendering it again. At most workers
+    exports render at a time and at most max_queued wait; beyond that
+    submissions are rejected with PoolOverloaded. Finished jobs are
+    remembered, oldest dropped first, up to max_jobs.
+    """
+
+    def __init__(self, artifact_store: ArtifactStore, workers: int = 2, max_queued: int = 64,
+                 max_jobs: int = 1024):
+        self.artifact_store = artifact_store
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_jobs = max_jobs
+        self.coalesced = 0
+        self._jobs: "OrderedDict[str, ExportJob]" = OrderedDict()
+        self._active: Dict[Tuple[str, str], ExportJob] = {}
+        self._tasks = set()
+        self._slots = None
+        self._executor = None
+
+    @classmethod
+    def from_env(cls, artifact_store: ArtifactStore) -> "ExportQueue":
+        """Build a queue sized from ALTERYX_DOC_EXPORT_* environment variables"""
+        return cls(
+            artifact_store,
+            workers=int(os.environ.get("ALTERYX_DOC_EXPORT_WORKERS", 2)),
+            max_queued=int(os.environ.get("ALTERYX_DOC_EXPORT_MAX_QUEUE", 64)),
+            max_jobs=int(os.environ.get("ALTERYX_DOC_EXPORT_MAX_JOBS", 1024))
+        )
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # Created lazily so importing the backend does not fork workers
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        return self._jobs.get(job_id)
+
+    def output(self, job: ExportJob) -> Optional[Artifact]:
+        """The finished export of a job, or None if it is not done or has expired"""
+        if job.status != DONE:
+            return None
+        return self.artifact_store.get(job.doc_id, job.artifact_name)
+
+    def _remember(self, job: ExportJob) -> ExportJob:
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self.max_jobs:
+            # Never forget a job that is still running
+            oldest = next((key for key, old in self._jobs.items() if old.is_finished), None)
+            if oldest is None:
+                break
+            del self._jobs[oldest]
+        return job
+
+    def submit(self, doc_id: str, output_format: str,
+               prepare: Callable[[], Tuple[Artifact, str]]) -> ExportJob:
+        """
+        Export a document, or join the export already in progress
+        prepare() runs in a thread before rendering and returns the stored
+        input artifact and the document title.
+        """
+        key = (doc_id, output_format)
+        job = self._active.get(key)
+        if job is not None:
+            job.requests += 1
+            self.coalesced += 1
+            return job
+
+        job = ExportJob(doc_id, output_format)
+        stored = self.artifact_store.get(doc_id, job.artifact_name)
+        if stored is not None:
+            now = time.time()
+            job._set(DONE, started=now, finished=now, size=stored.size)
+            return self._remember(job)
+
+        queued = sum(1 for active in self._active.values() if active.status == QUEUED)
+        if queued >= self.max_queued:
+            raise PoolOverloaded("Server is busy, too many exports queued")
+        fd, job.partial_path = tempfile.mkstemp(suffix=f".{output_format}.tmp", dir=self.artifact_store.directory)
+        os.close(fd)
+        self._active[key] = job
+        task = asyncio.ensure_future(self._run(job, prepare))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return self._remember(job)
+
+    async def _run(self, job: ExportJob, prepare) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        output_path = job.partial_path
+        try:
+            async with self._slots:
+                job._set(RUNNING, started=time.time())
+                source, title = await asyncio.to_thread(prepare)
+                loop = asyncio.get_running_loop()
+                if source.name == job.artifact_name:
+                    # The export is the stored input itself (markdown)
+                    size = source.size
+                else:
+                    size = await loop.run_in_executor(self.executor, render_export, job.format, source.path,
+                                                      output_path, title)
+                    await asyncio.to_thread(self.artifact_store.put_file, job.doc_id, job.artifact_name,
+                                            output_path)
+            job._set(DONE, finished=time.time(), size=size)
+        except Exception as e:
+            job._set(FAILED, finished=time.time(), error=getattr(e, "detail", None) or str(e) or type(e).__name__)
+        finally:
+            self._active.pop((job.doc_id, job.format), None)
+            job.partial_path = None
+            if os.path.exists(output_path):
+                os.remove(output_path)
+
+    def follow(self, job: ExportJob, chunk_size: int = 64 * 1024) -> Optional[AsyncIterator[bytes]]:
+        """
+        Stream a rendered export while its worker writes it, or None if the job
+        has already finished or its output is not rendered (markdown)
+        """
+        source, output = EXPORT_FORMATS[job.format][:2]
+        path = job.partial_path
+        if path is None or job.is_finished or source == output:
+            return None
+        try:
+            partial = open(path, "rb")
+        except OSError:
+            return None
+        return self._tail(job, partial, chunk_size)
+
+    async def _tail(self, job: ExportJob, partial: BinaryIO, chunk_size: int) -> AsyncIterator[bytes]:
+        # The open file survives being moved into the store, so the last
+        # chunks are still read from it after the job has finished
+        try:
+            while True:
+                finished = job.is_finished
+                chunk = await asyncio.to_thread(partial.read, chunk_size)
+                if chunk:
+                    yield chunk
+                elif finished:
+                    break
+                else:
+                    await job.wait_for_change(0.05)
+        finally:
+            partial.close()
+        if job.status == FAILED:
+            # Headers are already sent; abort so the client sees a truncated download
+            raise RuntimeError(f"Export {job.job_id} failed: {job.error}")
+
+    def stats(self) -> dict:
+        statuses = [job.status for job in self._active.values()]
+        return {
+            "workers": self.workers,
+            "queued": statuses.count(QUEUED),
+            "running": statuses.count(RUNNING),
+            "max_queued": self.max_queued,
+            "jobs": len(self._jobs),
+            "coalesced": self.coalesced
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from models import WorkflowTool, WorkflowAnalysis
+
+
+def tool_fingerprint(tool: WorkflowTool) -> str:
+    """
+    Stable digest of everything that affects a tool's rendered output:
+    plugin, configuration, connections, position and derived properties
+    Keys are hashed in their original order, since fragments render them in that order
+    """
+    payload = json.dumps(
+        [tool.plugin, tool.description, tool.configuration, tool.connections,
+         tool.position, tool.custom_properties],
+        separators=(",", ":"), default=str
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def workflow_fingerprints(analysis: WorkflowAnalysis) -> Dict[str, str]:
+    """Fingerprint of every tool in a workflow, keyed by ToolID"""
+    return {tool.tool_id: tool_fingerprint(tool) for tool in analysis.tools}
+
+
+def diff_fingerprints(base: Dict[str, str], head: Dict[str, str]) -> dict:
+    """Added, removed and changed ToolIDs between two versions of a workflow"""
+    added = [tool_id for tool_id in head if tool_id not in base]
+    removed = [tool_id for tool_id in base if tool_id not in head]
+    changed = [tool_id for tool_id, fingerprint in head.items()
+               if tool_id in base and base[tool_id] != fingerprint]
+    return {
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "unchanged": len(head) - len(added) - len(changed)
+    }
+
+
+class FragmentCache:
+    """
+    LRU of rendered per-tool fragments keyed by (kind, ToolID, fingerprint)
+
+    Re-documenting a new version of a known workflow only renders the tools
+    whose fingerprint changed; everything else is reused from here. The
+    cache is bounded by the memory its fragments take, since a single large
+    configuration can make one fragment arbitrarily big; fragments larger
+    than the whole budget are not cached.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, tool_id: str, fingerprint: str) -> Optional[str]:
+        key = (kind, tool_id, fingerprint)
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return fragment
+
+    def put(self, kind: str, tool_id: str, fingerprint: str, fragment: str) -> None:
+        size = sys.getsizeof(fragment)
+        if size > self.max_bytes:
+            return
+        key = (kind, tool_id, fingerprint)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= sys.getsizeof(previous)
+            self._entries[key] = fragment
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= sys.getsizeof(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+
+# Per-process cache shared by every AlteryxDocGenerator
+fragment_cache = FragmentCache(max_bytes=int(os.environ.get("ALTERYX_DOC_FRAGMENT_CACHE_BYTES", 64 * 1024 * 1024)))
@@ -1,63 +1,140 @@
 from flask import Flask, request, jsonify
 import xml.etree.ElementTree as ET
+import io
+
+from toolsmetadata import IncrementalWorkflowParser
 
 app = Flask(__name__)
 
-def parse_workflow_xml(xml_content):
+# Size of the chunks fed to the pull parser when streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def _node_to_dict(node):
+    """Extract the tool summary for a single <Node> element."""
+    tool_id = node.get('ToolID', '')
+    
+    # Get tool type
+    gui_settings = node.find('GuiSettings')
+    tool_type = 'Unknown'
+    if gui_settings is not None:
+        plugin = gui_settings.get('Plugin', '')
+        if plugin:
+            tool_type = plugin.split('.')[-1]
+    
+    # Get position
+    position = None
+    pos_elem = node.find('.//Position')
+    if pos_elem is not None:
+        x = pos_elem.get('x')
+        y = pos_elem.get('y')
+        if x and y:
+            position = {'x': int(x), 'y': int(y)}
+    
+    # Get configuration
+    config = {}
+    config_elem = node.find('.//Configuration')
+    if config_elem is not None:
+        for child in config_elem:
+            config[child.tag] = child.text or child.attrib
+    
+    return {
+        'toolId': tool_id,
+        'toolType': tool_type,
+        'position': position,
+        'configuration': config
+    }
+
+def _connection_to_dict(conn):
+    """Extract origin/destination details for a <Connection> element, if complete."""
+    origin = conn.find('Origin')
+    destination = conn.find('Destination')
+    
+    if origin is None or destination is None:
+        return None
+    return {
+        'originToolId': origin.get('ToolID', ''),
+        'originConnection': origin.get('Connection', ''),
+        'destinationToolId': destination.get('ToolID', ''),
+        'destinationConnection': destination.get('Connection', '')
+    }
+
+class WorkflowPullParser(IncrementalWorkflowParser):
+    """
+    Incremental, single-pass parser for Alteryx workflow XML.
+    
+    Chunks are fed as they become available and nodes/connections are
+    collected as soon as their elements close. Document order of nested
+    container nodes and the release of finished subtrees come from
+    IncrementalWorkflowParser; only the records differ.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.nodes = []
+        self.connections = []
+    
+    def close(self):
+        """Finish parsing and return the result in parse_workflow_xml's shape."""
+        self._parse(b'', True)
+        return {
+            'success': True,
+            'nodes': self.nodes,
+            'connections': self.connections
+        }
+    
+    def _node_record(self, elem):
+        return _node_to_dict(elem)
+    
+    def _flush_nodes(self):
+        self.nodes.extend(self._pending)
+    
+    def _add_connection(self, elem):
+        connection = _connection_to_dict(elem)
+        if connection is not None:
+            self.connections.append(connection)
+
+def stream_workflow_xml(source, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Parse Alteryx workflow XML in a single streaming pass.
+    
+    Args:
+        source: XML as str/bytes, or a readable file-like object
+        chunk_size (int): Number of characters/bytes fed to the parser at a time
+    
+    Returns:
+        dict: Same shape as parse_workflow_xml's result
+    """
+    if isinstance(source, str):
+        source = io.StringIO(source)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    
+    parser = WorkflowPullParser()
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        parser.feed(chunk)
+    return parser.close()
+
+def parse_workflow_xml(xml_content, streaming=False):
     """Parse Alteryx workflow XML and extract nodes and connections."""
     try:
+        if streaming:
+            return stream_workflow_xml(xml_content)
+        
         # Parse XML string
         root = ET.fromstring(xml_content)
         
         # Extract nodes
-        nodes = []
-        for node in root.findall('.//Node'):
-            tool_id = node.get('ToolID', '')
-            
-            # Get tool type
-            gui_settings = node.find('GuiSettings')
-            tool_type = 'Unknown'
-            if gui_settings is not None:
-                plugin = gui_settings.get('Plugin', '')
-                if plugin:
-                    tool_type = plugin.split('.')[-1]
-            
-            # Get position
-            position = None
-            pos_elem = node.find('.//Position')
-            if pos_elem is not None:
-                x = pos_elem.get('x')
-                y = pos_elem.get('y')
-                if x and y:
-                    position = {'x': int(x), 'y': int(y)}
-            
-            # Get configuration
-            config = {}
-            config_elem = node.find('.//Configuration')
-            if config_elem is not None:
-                for child in config_elem:
-                    config[child.tag] = child.text or child.attrib
-            
-            nodes.append({
-                'toolId': tool_id,
-                'toolType': tool_type,
-                'position': position,
-                'configuration': config
-            })
+        nodes = [_node_to_dict(node) for node in root.findall('.//Node')]
         
         # Extract connections
         connections = []
         for conn in root.findall('.//Connection'):
-            origin = conn.find('Origin')
-            destination = conn.find('Destination')
-            
-            if origin is not None and destination is not None:
-                connections.append({
-                    'originToolId': origin.get('ToolID', ''),
-                    'originConnection': origin.get('Connection', ''),
-                    'destinationToolId': destination.get('ToolID', ''),
-                    'destinationConnection': destination.get('Connection', '')
-                })
+            connection = _connection_to_dict(conn)
+            if connection is not None:
+                connections.append(connection)
         
         return {
             'success': True,
@@ -81,7 +158,7 @@ def parse_workflow():
         if not xml_content:
             return jsonify({'success': False, 'error': 'No XML content provided'})
         
-        result = parse_workflow_xml(xml_content)
+        result = parse_workflow_xml(xml_content, streaming=True)
         return jsonify(result)
         
     except Exception as e:
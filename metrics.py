@@ -0,0 +1,245 @@
+import abc
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to multi-minute PDF builds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2, 1024 ** 3)
+TOOL_BUCKETS = (10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+# Request header that asks for the per-stage breakdown in a Server-Timing response header
+DEBUG_HEADER = b"x-debug-timings"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """Sample lines in the Prometheus text format"""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+                    for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """Gauge whose value is read from a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.read = read
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_number(self.read())}"]
+
+
+class CounterFunction(Gauge):
+    """Counter whose running total is kept elsewhere and read from a callback at scrape time"""
+    kind = "counter"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._series: Dict[Tuple, list] = {}  # label values -> [bucket counts, sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = 'le="' + _number(bound) + '"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    "alteryx_doc_request_duration_seconds", "HTTP request latency including streamed bodies",
+    labelnames=("method", "route", "status")))
+STAGE_SECONDS = registry.register(Histogram(
+    "alteryx_doc_stage_duration_seconds", "Latency of one processing stage", labelnames=("stage",)))
+STAGE_BYTES = registry.register(Counter(
+    "alteryx_doc_stage_bytes_total", "Bytes read or produced by a processing stage", ("stage",)))
+INPUT_BYTES = registry.register(Histogram(
+    "alteryx_doc_input_bytes", "Size of uploaded workflow documents", SIZE_BUCKETS))
+WORKFLOW_TOOLS = registry.register(Histogram(
+    "alteryx_doc_workflow_tools", "Number of tools in processed workflows", TOOL_BUCKETS))
+CACHE_LOOKUPS = registry.register(Counter(
+    "alteryx_doc_cache_lookups_total", "Result cache lookups by outcome", ("result",)))
+
+
+class StageTimer:
+    """Per-request record of stage durations and byte counts, also fed into the histograms"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.bytes: Dict[str, int] = {}
+
+    def record(self, stage: str, seconds: float, size: Optional[int] = None) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        if size is not None:
+            self.bytes[stage] = self.bytes.get(stage, 0) + size
+            STAGE_BYTES.inc(size, stage=stage)
+
+    def server_timing(self) -> str:
+        """Breakdown in the Server-Timing header format (durations in milliseconds)"""
+        return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items())
+
+
+_current_timer: contextvars.ContextVar[Optional[StageTimer]] = contextvars.ContextVar("stage_timer", default=None)
+
+
+def current_timer() -> StageTimer:
+    """Timer of the request being handled, or a detached one outside a request"""
+    return _current_timer.get() or StageTimer()
+
+
+class _StageBlock:
+    __slots__ = ("size",)
+
+    def __init__(self, size: Optional[int]):
+        self.size = size
+
+
+@contextmanager
+def stage(name: str, size: Optional[int] = None):
+    """Time a block as one stage of the current request; set .size on the yielded block to count bytes"""
+    timer = current_timer()
+    block = _StageBlock(size)
+    start = time.perf_counter()
+    try:
+        yield block
+    finally:
+        timer.record(name, time.perf_counter() - start, block.size)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by method, route template and status
+
+    When the request carries an X-Debug-Timings header the stages recorded
+    before the response starts are returned in a Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timer = StageTimer()
+        token = _current_timer.set(timer)
+        debug = any(name == DEBUG_HEADER for name, _ in scope.get("headers", ()))
+        status = [500]
+        start = time.perf_counter()
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if debug:
+                    headers = list(message.get("headers", ()))
+                    total = f"total;dur={(time.perf_counter() - start) * 1000:.2f}"
+                    breakdown = timer.server_timing()
+                    value = f"{breakdown}, {total}" if breakdown else total
+                    headers.append((b"server-timing", value.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _current_timer.reset(token)
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status[0]
+            )
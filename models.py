@@ -0,0 +1,24 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+class WorkflowTool(BaseModel):
+    """Model for Alteryx workflow tool information"""
+    tool_id: str
+    plugin: str
+    description: str
+    configuration: Dict
+    connections: List[str] = []
+    position: Dict[str, str] = {}  # Added to store x,y coordinates
+    custom_properties: Dict = {}   # Added to store additional tool properties
+
+class WorkflowAnalysis(BaseModel):
+    """Model for complete workflow analysis"""
+    name: str
+    creator: Optional[str] = None
+    created_date: Optional[str] = None
+    description: Optional[str] = None
+    tools: List[WorkflowTool]
+    data_flow: List[Dict[str, str]]
+    custom_tools: List[Dict] = []  # Added to store custom tool details
+    workflow_constants: Dict = {}  # Added to store workflow constants
+    yxmd_version: Optional[str] = None  # Added to store workflow version
@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import os
+import re
+import zipfile
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from models import WorkflowAnalysis
+
+# Upload types accepted by the backend
+WORKFLOW_EXTENSIONS = (".yxmd", ".yxmc")
+PACKAGE_EXTENSIONS = (".yxzp",)
+
+# Refuse to inflate archive members larger than this (zip bomb guard)
+MAX_MEMBER_BYTES = int(os.environ.get("ALTERYX_DOC_MAX_MEMBER_BYTES", 256 * 1024 * 1024))
+
+
+def _basename(path: str) -> str:
+    return re.split(r"[\\/]", path)[-1].lower()
+
+
+class WorkflowPackage:
+    """
+    Lazy view over an Alteryx package (.yxzp) archive.
+
+    Only the zip central directory is read up front; member contents are
+    inflated from the underlying file object on demand, so nothing is
+    extracted to disk and unreferenced members are never read.
+    """
+
+    def __init__(self, fileobj, max_member_bytes: int = MAX_MEMBER_BYTES):
+        try:
+            self._zip = zipfile.ZipFile(fileobj)
+        except zipfile.BadZipFile:
+            raise ValueError("Invalid Alteryx package: not a zip archive")
+        self.max_member_bytes = max_member_bytes
+        self.members = {info.filename: info for info in self._zip.infolist() if not info.is_dir()}
+        self._by_basename = {}
+        for name in self.members:
+            self._by_basename.setdefault(_basename(name), name)
+
+    @property
+    def workflows(self) -> List[str]:
+        """Workflow members, shallowest path first"""
+        names = [name for name in self.members if name.lower().endswith(".yxmd")]
+        return sorted(names, key=lambda name: (name.count("/"), name))
+
+    def read(self, name: str) -> bytes:
+        """Inflate a single member"""
+        info = self.members[name]
+        if info.file_size > self.max_member_bytes:
+            raise ValueError(f"Package member {name} is too large ({info.file_size} bytes)")
+        return self._zip.read(info)
+
+    def find_macro(self, macro_path: str) -> Optional[str]:
+        """Member name for a macro path referenced by a tool, if it is packaged"""
+        normalized = macro_path.replace("\\", "/")
+        if normalized in self.members:
+            return normalized
+        return self._by_basename.get(_basename(macro_path))
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+class MacroCache:
+    """
+    Parsed macros memoized by content hash.
+
+    A macro shared by many workflows (in one package or across uploads) is
+    parsed once; concurrent requests for the same macro wait on the parse
+    already in flight instead of starting their own.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    async def get(self, content: bytes, parse):
+        """
+        Return (content hash, analysis, cache hit) for macro bytes
+        parse is an async callable taking the bytes, used on a miss
+        """
+        key = hashlib.sha256(content).hexdigest()
+        analysis = self._entries.get(key)
+        if analysis is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return key, analysis, True
+
+        pending = self._pending.get(key)
+        while pending is not None:
+            try:
+                analysis = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The caller parsing it was cancelled; parse it here unless someone else already is
+                pending = self._pending.get(key)
+                continue
+            self.hits += 1
+            return key, analysis, True
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            analysis = await parse(content)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        except BaseException:
+            # Cancelled mid-parse: release the waiters rather than leave them hanging
+            future.cancel()
+            raise
+        finally:
+            del self._pending[key]
+        future.set_result(analysis)
+
+        self._entries[key] = analysis
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return key, analysis, False
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+async def resolve_macros(package: WorkflowPackage, analysis: WorkflowAnalysis,
+                         macro_cache: MacroCache, parse, _seen=None) -> List[dict]:
+    """
+    Resolve the macros a workflow references against the package contents
+    Nested macro references are followed; each member is visited once, and a
+    later path to an already visited member is listed with duplicate_of set
+    to the path it was first reached by
+    """
+    seen: Dict[str, str] = _seen if _seen is not None else {}
+    references: Dict[str, List[str]] = OrderedDict()
+    for custom_tool in analysis.custom_tools:
+        references.setdefault(custom_tool["macro"], []).append(custom_tool["tool_id"])
+
+    macros = []
+    for macro_path, tool_ids in references.items():
+        member = package.find_macro(macro_path)
+        if member is None:
+            macros.append({"macro": macro_path, "resolved": False, "referenced_by": tool_ids})
+            continue
+        if member in seen:
+            macros.append({"macro": macro_path, "resolved": True, "member": member,
+                           "duplicate_of": seen[member], "referenced_by": tool_ids})
+            continue
+        seen[member] = macro_path
+
+        content_hash, macro_analysis, cache_hit = await macro_cache.get(await asyncio.to_thread(package.read, member), parse)
+        macros.append({
+            "macro": macro_path,
+            "resolved": True,
+            "member": member,
+            "content_hash": content_hash,
+            "name": macro_analysis.name,
+            "tools": len(macro_analysis.tools),
+            "cache_hit": cache_hit,
+            "referenced_by": tool_ids,
+            "macros": await resolve_macros(package, macro_analysis, macro_cache, parse, seen)
+        })
+    return macros
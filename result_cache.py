@@ -0,0 +1,189 @@
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from compact import CompactWorkflow
+from models import WorkflowAnalysis
+
+
+class CachedResult:
+    """Parsed analysis plus the rendered outputs for one uploaded workflow"""
+    __slots__ = ("analysis", "markdown", "alteryx_xml", "fingerprints", "graph", "search_index", "size")
+
+    def __init__(self, analysis: CompactWorkflow, markdown: str, alteryx_xml: str,
+                 fingerprints: Optional[Dict[str, str]] = None, graph=None, search_index=None, size: int = 0):
+        self.analysis = analysis
+        self.markdown = markdown
+        self.alteryx_xml = alteryx_xml
+        self.fingerprints = fingerprints or {}  # Per-tool fingerprints keyed by ToolID
+        self.graph = graph                      # WorkflowGraph index of the connections
+        self.search_index = search_index        # SearchIndex over the source lines and tool fields
+        self.size = size
+
+    def estimate_size(self) -> int:
+        """
+        Approximate memory held by the result, from sizes already known
+        rather than by serializing it. The parsed analysis holds about what
+        the generated XML spells out, so it is counted at half the XML.
+        """
+        size = sys.getsizeof(self.markdown) + sys.getsizeof(self.alteryx_xml) * 3 // 2
+        if self.search_index is not None:
+            size += self.search_index.nbytes
+        return size
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != "size"}
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            # Entries persisted before state was keyed by attribute name
+            state = dict(zip(("analysis", "markdown", "alteryx_xml", "fingerprints"), state))
+        if isinstance(state.get("analysis"), WorkflowAnalysis):
+            # Entries persisted before the compact model was introduced
+            state["analysis"] = CompactWorkflow.from_analysis(state["analysis"])
+        self.__init__(**state)
+
+
+class ResultCache:
+    """
+    Content-addressed LRU cache of upload results.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes and evicted in
+    least-recently-used order once the in-memory byte budget, counted with
+    CachedResult.estimate_size, is exceeded. When cache_dir is set, entries
+    spilled there survive restarts and memory eviction; the directory is
+    pruned oldest-first to disk_max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, cache_dir: Optional[str] = None,
+                 disk_max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = disk_max_bytes if disk_max_bytes is not None else max_bytes * 4
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(content: bytes) -> str:
+        """Cache key for raw uploaded bytes"""
+        return hashlib.sha256(content).hexdigest()
+
+    def get(self, key: str, load: bool = True) -> Optional[CachedResult]:
+        """
+        Return the cached result for key, loading it from disk if needed
+        Loading reads and unpickles a file, so from the event loop pass
+        load=False and repeat the call in a thread when it returns None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        if not load and self.cache_dir:
+            # Counted by the call that loads it
+            return None
+
+        entry = self._load(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, entry)
+            return entry
+
+    def put(self, key: str, entry: CachedResult) -> None:
+        """Store a result in memory; persist it with spill()"""
+        entry.size = entry.estimate_size()
+        with self._lock:
+            self._insert(key, entry)
+
+    def spill(self, key: str, entry: CachedResult) -> None:
+        """Persist a result to cache_dir, if configured; blocking, so call it from a thread"""
+        if self.cache_dir:
+            self._store(key, pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current memory usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def _insert(self, key: str, entry: CachedResult) -> None:
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).size
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load(self, key: str) -> Optional[CachedResult]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+            os.utime(path)  # Keep disk pruning in LRU order
+        except OSError:
+            return None
+        try:
+            entry = pickle.loads(payload)
+        except Exception:
+            return None
+        entry.size = entry.estimate_size()
+        return entry
+
+    def _store(self, key: str, payload: bytes) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        files = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        files.sort()
+        for _, size, name in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
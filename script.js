@@ -1,8 +1,18 @@
+// Backend configuration
+const BACKEND_URL = 'http://localhost:5507';
+
 // Application State
 let currentWorkflow = null;
 let selectedNode = null;
 let uploadedFiles = [];
 let recentFiles = JSON.parse(localStorage.getItem('recentFiles') || '[]');
+// Workflows loaded in the same millisecond (a batch upload) must not share an id
+let lastWorkflowId = Math.max(0, ...recentFiles.map(file => file.id || 0));
+
+function nextWorkflowId() {
+    lastWorkflowId = Math.max(lastWorkflowId + 1, Date.now());
+    return lastWorkflowId;
+}
 
 // DOM Elements
 const fileInput = document.getElementById('fileInput');
@@ -98,14 +108,14 @@ function handleDrop(event) {
 }
 
 function processSelectedFiles(files) {
-    const validExtensions = ['.yxmd', '.yxmc', '.yxwz'];
+    const validExtensions = ['.yxmd', '.yxmc', '.yxwz', '.yxzp'];
     const validFiles = files.filter(file => {
         const extension = file.name.toLowerCase().substring(file.name.lastIndexOf('.'));
         return validExtensions.includes(extension);
     });
     
     if (validFiles.length !== files.length) {
-        showToast('Invalid file type', 'Only .yxmd, .yxmc, and .yxwz files are supported.', 'error');
+        showToast('Invalid file type', 'Only .yxmd, .yxmc, .yxwz and .yxzp files are supported.', 'error');
     }
     
     uploadedFiles = validFiles;
@@ -149,37 +159,147 @@ function updateUploadButton() {
 async function handleUpload() {
     if (uploadedFiles.length === 0) return;
     
+    const files = uploadedFiles;
     showProgress(true);
+    updateProgress(0);
     
     try {
-        for (let i = 0; i < uploadedFiles.length; i++) {
-            const file = uploadedFiles[i];
-            const progress = ((i + 1) / uploadedFiles.length) * 100;
-            
-            updateProgress(progress);
-            
-            const result = await processFile(file);
+        let response;
+        try {
+            const formData = new FormData();
+            files.forEach(file => {
+                formData.append('files', file);
+                // Folder picks carry a relative path that tells same-named workflows apart
+                formData.append('paths', file.webkitRelativePath || '');
+            });
+            response = await fetch(`${BACKEND_URL}/upload-batch`, {
+                method: 'POST',
+                body: formData
+            });
+        } catch (error) {
+            // Backend unreachable, fall back to parsing the files one by one
+            await uploadFilesIndividually(files);
+            return;
+        }
+        
+        if (!response.ok) {
+            throw new Error('Batch upload failed');
+        }
+        
+        // One NDJSON line arrives per workflow as soon as it is processed
+        const pending = [];
+        let completed = 0;
+        await readNdjsonStream(response, result => {
+            completed++;
+            updateProgress((completed / files.length) * 100);
             
-            if (result.success) {
-                addToRecentFiles(result.workflow);
-                showToast('Upload successful', `${file.name} has been processed successfully.`, 'success');
+            const file = files[result.index];
+            if (result.status === 'success') {
+                pending.push(loadBatchWorkflow(file, result).then(workflow => {
+                    addToRecentFiles(workflow);
+                    showToast('Upload successful', `${file.name} has been processed successfully.`, 'success');
+                }).catch(error => {
+                    showToast('Upload failed', `Failed to load ${file.name}: ${error.message}`, 'error');
+                }));
             } else {
-                showToast('Upload failed', `Failed to process ${file.name}: ${result.error}`, 'error');
+                showToast('Upload failed', `Failed to process ${result.filename}: ${result.error}`, 'error');
             }
-        }
+        });
+        await Promise.all(pending);
         
+    } catch (error) {
+        showToast('Upload failed', 'An error occurred during upload.', 'error');
+    } finally {
         uploadedFiles = [];
         updateSelectedFilesDisplay();
         updateUploadButton();
         loadRecentFiles();
-        
-    } catch (error) {
-        showToast('Upload failed', 'An error occurred during upload.', 'error');
-    } finally {
         showProgress(false);
     }
 }
 
+async function readNdjsonStream(response, onItem) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => onItem(JSON.parse(line)));
+    }
+    
+    if (buffer.trim()) {
+        onItem(JSON.parse(buffer));
+    }
+}
+
+async function loadBatchWorkflow(file, result) {
+    const summary = await fetchWorkflowTools(result.doc_id);
+    // The viewer reads lines from the backend; packages are zip archives, so only plain files are kept for copy/export
+    const xmlContent = result.package ? null : await readFileContent(file);
+    return workflowFromAnalysis(summary, file.name, xmlContent, result.doc_id);
+}
+
+async function fetchWorkflowTools(docId) {
+    // Tool summaries only; configurations are fetched when a tool is opened
+    const response = await fetch(`${BACKEND_URL}/workflow/${docId}/tools`);
+    if (!response.ok) {
+        throw new Error('Failed to fetch workflow tools');
+    }
+    return response.json();
+}
+
+function workflowFromAnalysis(analysis, filename, xmlContent, docId) {
+    const nodes = analysis.tools.map(tool => ({
+        toolId: tool.tool_id,
+        toolType: tool.plugin ? tool.plugin.split('.').pop() : 'Unknown',
+        position: tool.position && tool.position.x !== undefined ?
+            { x: parseInt(tool.position.x), y: parseInt(tool.position.y) } : null,
+        configuration: tool.configuration
+    }));
+    const connections = analysis.data_flow.map(flow => ({
+        originToolId: flow.origin_tool_id,
+        originConnection: flow.origin_connection,
+        destinationToolId: flow.destination_tool_id,
+        destinationConnection: flow.destination_connection
+    }));
+    
+    return {
+        id: nextWorkflowId(),
+        docId: docId,
+        filename: filename,
+        fileType: filename.toLowerCase().substring(filename.lastIndexOf('.')),
+        xmlContent: xmlContent,
+        uploadedAt: new Date().toISOString(),
+        nodes: nodes,
+        connections: connections,
+        statistics: calculateStatistics(nodes, connections)
+    };
+}
+
+async function uploadFilesIndividually(files) {
+    for (let i = 0; i < files.length; i++) {
+        const file = files[i];
+        const progress = ((i + 1) / files.length) * 100;
+        
+        updateProgress(progress);
+        
+        const result = await processFile(file);
+        
+        if (result.success) {
+            addToRecentFiles(result.workflow);
+            showToast('Upload successful', `${file.name} has been processed successfully.`, 'success');
+        } else {
+            showToast('Upload failed', `Failed to process ${file.name}: ${result.error}`, 'error');
+        }
+    }
+}
+
 async function processFile(file) {
     try {
         const xmlContent = await readFileContent(file);
@@ -233,7 +353,7 @@ async function parseWorkflow(xmlContent, filename) {
         const result = await response.json();
         
         return {
-            id: Date.now(),
+            id: nextWorkflowId(),
             filename: filename,
             fileType: filename.toLowerCase().substring(filename.lastIndexOf('.')),
             xmlContent: xmlContent,
@@ -323,7 +443,7 @@ function parseWorkflowClientSide(xmlContent, filename) {
         const statistics = calculateStatistics(nodes, connections);
         
         return {
-            id: Date.now(),
+            id: nextWorkflowId(),
             filename: filename,
             fileType: filename.toLowerCase().substring(filename.lastIndexOf('.')),
             xmlContent: xmlContent,
@@ -409,7 +529,19 @@ function addToRecentFiles(workflow) {
     recentFiles.unshift(workflow);
     recentFiles = recentFiles.slice(0, 10); // Keep only 10 recent files
     
-    localStorage.setItem('recentFiles', JSON.stringify(recentFiles));
+    saveRecentFiles();
+}
+
+function saveRecentFiles() {
+    // Only IDs are stored; tools and XML are fetched from the backend when a file is reopened
+    const stored = recentFiles.filter(file => file.docId).map(file => ({
+        id: file.id,
+        docId: file.docId,
+        filename: file.filename,
+        fileType: file.fileType,
+        uploadedAt: file.uploadedAt
+    }));
+    localStorage.setItem('recentFiles', JSON.stringify(stored));
 }
 
 function loadRecentFiles() {
@@ -441,12 +573,23 @@ function loadRecentFiles() {
     });
 }
 
-function selectWorkflow(workflow) {
+async function selectWorkflow(workflow) {
+    const fileItem = event.currentTarget;
+    if (!workflow.nodes && workflow.docId) {
+        try {
+            const summary = await fetchWorkflowTools(workflow.docId);
+            const loaded = workflowFromAnalysis(summary, workflow.filename, null, workflow.docId);
+            Object.assign(workflow, loaded, { id: workflow.id, uploadedAt: workflow.uploadedAt });
+        } catch (error) {
+            showToast('Workflow unavailable', `${workflow.filename} has expired, please upload it again.`, 'error');
+            return;
+        }
+    }
     currentWorkflow = workflow;
     
     // Update UI
     document.querySelectorAll('.recent-file').forEach(item => item.classList.remove('active'));
-    event.currentTarget.classList.add('active');
+    fileItem.classList.add('active');
     
     // Show workflow content
     showWorkflowContent();
@@ -502,10 +645,98 @@ function updateToolFilter() {
     });
 }
 
+// Lines per /xml/{doc_id}/lines request, and extra lines rendered above and below the viewport
+const XML_PAGE_LINES = 500;
+const XML_OVERSCAN_LINES = 50;
+let xmlViewer = null;
+
 function displayXMLContent() {
     const xmlContent = document.getElementById('xmlContent');
-    const formattedXML = formatXML(currentWorkflow.xmlContent);
-    xmlContent.innerHTML = formattedXML;
+    if (!currentWorkflow.docId) {
+        stopVirtualScrolling();
+        xmlContent.innerHTML = formatXML(currentWorkflow.xmlContent);
+        return;
+    }
+    
+    // Only the lines in view are in the DOM; pages are fetched pre-highlighted as they scroll in
+    xmlViewer = { docId: currentWorkflow.docId, totalLines: 0, lineHeight: 0, pages: new Map(), requests: new Map() };
+    xmlContent.innerHTML = '<div class="xml-spacer"><div class="xml-window"></div></div>';
+    xmlContent.scrollTop = 0;
+    xmlContent.onscroll = () => requestAnimationFrame(renderVisibleLines);
+    loadXMLPage(xmlViewer, 0);
+}
+
+function stopVirtualScrolling() {
+    xmlViewer = null;
+    document.getElementById('xmlContent').onscroll = null;
+}
+
+function loadXMLPage(viewer, page) {
+    if (!viewer.requests.has(page)) {
+        const params = new URLSearchParams({ start: page * XML_PAGE_LINES + 1, count: XML_PAGE_LINES });
+        viewer.requests.set(page, fetch(`${BACKEND_URL}/xml/${viewer.docId}/lines?${params}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Failed to load XML');
+                }
+                return response.json();
+            })
+            .then(chunk => {
+                viewer.totalLines = chunk.total_lines;
+                viewer.pages.set(page, chunk.lines);
+                if (viewer === xmlViewer) {
+                    renderVisibleLines();
+                }
+            })
+            .catch(error => {
+                viewer.requests.delete(page);
+                showToast('XML unavailable', error.message, 'error');
+            }));
+    }
+    return viewer.requests.get(page);
+}
+
+function renderVisibleLines() {
+    const viewer = xmlViewer;
+    const xmlContent = document.getElementById('xmlContent');
+    const spacer = xmlContent.querySelector('.xml-spacer');
+    if (!viewer || !viewer.totalLines || !spacer) return;
+    
+    const lineWindow = spacer.firstElementChild;
+    if (!viewer.lineHeight) {
+        lineWindow.innerHTML = '<span class="xml-line">&nbsp;</span>';
+        viewer.lineHeight = lineWindow.firstElementChild.offsetHeight || 21;
+    }
+    spacer.style.height = `${viewer.totalLines * viewer.lineHeight}px`;
+    
+    const first = Math.max(0, Math.floor(xmlContent.scrollTop / viewer.lineHeight) - XML_OVERSCAN_LINES);
+    const last = Math.min(viewer.totalLines,
+        Math.ceil((xmlContent.scrollTop + xmlContent.clientHeight) / viewer.lineHeight) + XML_OVERSCAN_LINES);
+    
+    const html = [];
+    for (let line = first; line < last; line++) {
+        const page = Math.floor(line / XML_PAGE_LINES);
+        const lines = viewer.pages.get(page);
+        if (!lines) {
+            loadXMLPage(viewer, page);
+            html.push('<span class="xml-line">&nbsp;</span>');
+        } else {
+            html.push(`<span class="xml-line">${lines[line % XML_PAGE_LINES]}</span>`);
+        }
+    }
+    lineWindow.style.transform = `translateY(${first * viewer.lineHeight}px)`;
+    lineWindow.innerHTML = html.join('');
+}
+
+async function getXMLText(workflow) {
+    if (typeof workflow.xmlContent === 'string') {
+        return workflow.xmlContent;
+    }
+    const response = await fetch(`${BACKEND_URL}/xml/${workflow.docId}`);
+    if (!response.ok) {
+        throw new Error('Failed to fetch XML');
+    }
+    return response.text();
 }
 
 function formatXML(xmlString) {
@@ -591,7 +822,7 @@ function displayWorkflowStructure() {
     structureTree.innerHTML = treeHTML;
 }
 
-function selectNode(toolId) {
+async function selectNode(toolId) {
     const node = currentWorkflow.nodes.find(n => n.toolId === toolId);
     if (node) {
         selectedNode = node;
@@ -600,11 +831,31 @@ function selectNode(toolId) {
         document.querySelectorAll('.tree-item').forEach(item => item.classList.remove('selected'));
         event.currentTarget.classList.add('selected');
         
+        // Configurations of backend-processed workflows are loaded on first open
+        if (node.configuration === undefined && currentWorkflow.docId) {
+            await loadToolConfiguration(currentWorkflow.docId, node);
+        }
+        
         // Show tool details
         displayToolDetails(node);
     }
 }
 
+async function loadToolConfiguration(docId, node) {
+    try {
+        const response = await fetch(`${BACKEND_URL}/workflow/${docId}/tool/${encodeURIComponent(node.toolId)}`);
+        if (!response.ok) {
+            throw new Error('Failed to fetch tool configuration');
+        }
+        const tool = await response.json();
+        node.configuration = tool.configuration;
+        node.configurationTree = tool.configuration_tree;
+    } catch (error) {
+        node.configuration = null;
+        showToast('Configuration unavailable', `Could not load configuration for tool ${node.toolId}.`, 'error');
+    }
+}
+
 function displayToolDetails(node) {
     const toolDetails = document.getElementById('toolDetails');
     const toolInfo = document.getElementById('toolInfo');
@@ -676,7 +927,7 @@ function displayToolDetails(node) {
         detailsHTML += `
             <div class="raw-config">
                 <h4>Raw Configuration</h4>
-                <pre>${JSON.stringify(node.configuration, null, 2)}</pre>
+                <pre>${escapeHtml(JSON.stringify(node.configurationTree || node.configuration, null, 2))}</pre>
             </div>
         `;
     }
@@ -722,14 +973,111 @@ function displayStatistics() {
 }
 
 // Search and Filter
+const SEARCH_PAGE_SIZE = 200;
+const SEARCH_DEBOUNCE_MS = 150;
+// Shorter queries match nearly every line; the server rejects them too
+const MIN_SEARCH_CHARS = 2;
+let searchTimer = null;
+let searchSequence = 0;
+let searchController = null;
+
 function handleSearch() {
-    const query = searchInput.value.toLowerCase();
-    if (!currentWorkflow || !query) {
+    clearTimeout(searchTimer);
+    const query = searchInput.value;
+    if (!currentWorkflow || query.length < MIN_SEARCH_CHARS) {
+        searchController?.abort();
+        searchSequence++;
         displayXMLContent();
         return;
     }
     
+    if (currentWorkflow.docId) {
+        // Indexed on the server; only the current page of hits is rendered
+        searchTimer = setTimeout(() => searchServer(query, 0), SEARCH_DEBOUNCE_MS);
+    } else {
+        searchClientSide(query.toLowerCase());
+    }
+}
+
+async function searchServer(query, offset) {
+    const sequence = ++searchSequence;
+    // Drop the request of a superseded query instead of waiting for it
+    searchController?.abort();
+    searchController = new AbortController();
+    const params = new URLSearchParams({
+        doc_id: currentWorkflow.docId,
+        q: query,
+        offset: offset,
+        limit: SEARCH_PAGE_SIZE
+    });
+    try {
+        const response = await fetch(`${BACKEND_URL}/search?${params}`, {signal: searchController.signal});
+        if (!response.ok) {
+            throw new Error('Search failed');
+        }
+        const results = await response.json();
+        // A newer query has been typed in the meantime
+        if (sequence !== searchSequence) return;
+        renderSearchResults(results, offset > 0);
+    } catch (error) {
+        if (sequence === searchSequence) {
+            searchClientSide(query.toLowerCase());
+        }
+    }
+}
+
+function highlightRanges(text, ranges) {
+    let html = '';
+    let position = 0;
+    ranges.forEach(([start, end]) => {
+        html += escapeHtml(text.slice(position, start));
+        html += `<span class="highlight">${escapeHtml(text.slice(start, end))}</span>`;
+        position = end;
+    });
+    return html + escapeHtml(text.slice(position));
+}
+
+function renderSearchResults(results, append) {
     const xmlContent = document.getElementById('xmlContent');
+    stopVirtualScrolling();
+    
+    const lineHTML = results.lines.hits.map(hit =>
+        `<span class="xml-line"><span class="line-number">${hit.line}</span> ${highlightRanges(hit.text || '', hit.ranges)}</span>`
+    ).join('\n');
+    
+    if (append) {
+        xmlContent.querySelector('.search-more')?.remove();
+        xmlContent.insertAdjacentHTML('beforeend', '\n' + lineHTML);
+    } else {
+        const toolIds = [...new Set(results.tools.hits.map(hit => hit.tool_id))];
+        const toolLinks = toolIds.map(toolId =>
+            `<a href="#" class="search-tool" data-tool-id="${escapeHtml(toolId)}">${escapeHtml(toolId)}</a>`
+        ).join(', ');
+        xmlContent.innerHTML = `<span class="search-summary">${results.lines.total} matching lines` +
+            (results.tools.total ? ` • tools: ${toolLinks}${results.tools.total > results.tools.hits.length ? ' …' : ''}` : '') +
+            `</span>\n${lineHTML}`;
+        xmlContent.querySelectorAll('.search-tool').forEach(link => {
+            link.addEventListener('click', (event) => {
+                event.preventDefault();
+                selectNode(link.dataset.toolId);
+            });
+        });
+    }
+    
+    const shown = results.offset + results.lines.hits.length;
+    if (shown < results.lines.total) {
+        const more = document.createElement('button');
+        more.className = 'btn btn-secondary search-more';
+        more.textContent = `Show more (${results.lines.total - shown} remaining)`;
+        more.addEventListener('click', () => searchServer(results.query, shown));
+        xmlContent.appendChild(more);
+    }
+}
+
+function searchClientSide(query) {
+    const xmlContent = document.getElementById('xmlContent');
+    if (typeof currentWorkflow.xmlContent !== 'string') return;
+    stopVirtualScrolling();
     const lines = currentWorkflow.xmlContent.split('\n');
     
     const filteredLines = lines.filter(line => 
@@ -767,10 +1115,17 @@ function handleToolFilter() {
 }
 
 // Control Actions
-function handleExport() {
+async function handleExport() {
     if (!currentWorkflow) return;
     
-    const blob = new Blob([currentWorkflow.xmlContent], { type: 'application/xml' });
+    let xmlText;
+    try {
+        xmlText = await getXMLText(currentWorkflow);
+    } catch (error) {
+        showToast('Export failed', error.message, 'error');
+        return;
+    }
+    const blob = new Blob([xmlText], { type: 'application/xml' });
     const url = URL.createObjectURL(blob);
     const a = document.createElement('a');
     a.href = url;
@@ -785,6 +1140,7 @@ function handleExport() {
 
 function handleClear() {
     currentWorkflow = null;
+    stopVirtualScrolling();
     selectedNode = null;
     
     // Hide content areas
@@ -811,7 +1167,7 @@ function handleClear() {
 function handleCopy() {
     if (!currentWorkflow) return;
     
-    navigator.clipboard.writeText(currentWorkflow.xmlContent).then(() => {
+    getXMLText(currentWorkflow).then(xmlText => navigator.clipboard.writeText(xmlText)).then(() => {
         showToast('Copied to clipboard', 'XML content has been copied to your clipboard.', 'success');
     }).catch(() => {
         showToast('Copy failed', 'Failed to copy content to clipboard.', 'error');
@@ -828,6 +1184,7 @@ function handleExpand() {
     } else {
         icon.className = 'fas fa-expand';
     }
+    renderVisibleLines();
 }
 
 // Progress Management
@@ -874,6 +1231,14 @@ function showToast(title, message, type = 'success') {
 function generateWorkflowVisualization() {
     const diagram = document.getElementById('workflowDiagram');
     
+    if (currentWorkflow.docId) {
+        // Laid out on the backend from the saved canvas positions, merged into clusters when zoomed out
+        loadServerDiagram();
+        return;
+    }
+    diagram.classList.add('mermaid');
+    diagramZoom = 1;
+    
     // Generate Mermaid diagram definition
     let definition = 'graph LR\n';
     definition += '    classDef default fill:#f0f9ff,stroke:#3b82f6,stroke-width:2px,rx:10px,ry:10px\n';
@@ -928,17 +1293,58 @@ function extractConfigSummary(config) {
 
 // Visualization Controls
 let currentZoom = 1;
+let diagramZoom = 1;
 const visualizationContainer = document.querySelector('.visualization-container');
 
+function snapZoom(zoom) {
+    // The backend renders powers of two between 1/16 and 4; CSS scales the remainder
+    return Math.min(Math.max(Math.pow(2, Math.round(Math.log2(zoom))), 1 / 16), 4);
+}
+
+async function loadServerDiagram() {
+    const diagram = document.getElementById('workflowDiagram');
+    const workflow = currentWorkflow;
+    const zoom = snapZoom(currentZoom);
+    try {
+        const response = await fetch(`${BACKEND_URL}/workflow/${workflow.docId}/diagram?zoom=${zoom}`);
+        if (!response.ok) {
+            throw new Error('Failed to load diagram');
+        }
+        const svg = await response.text();
+        if (workflow !== currentWorkflow) return;
+        diagram.classList.remove('mermaid');
+        diagram.innerHTML = svg;
+        diagramZoom = zoom;
+        diagram.style.transform = `scale(${currentZoom / diagramZoom})`;
+        diagram.onclick = (event) => {
+            const tool = event.target.closest('[data-tool-id]');
+            if (tool) {
+                selectNode(tool.dataset.toolId);
+            }
+        };
+    } catch (error) {
+        showToast('Diagram unavailable', error.message, 'error');
+    }
+}
+
 function zoomVisualization(factor) {
     currentZoom *= factor;
     const diagram = document.getElementById('workflowDiagram');
-    diagram.style.transform = `scale(${currentZoom})`;
+    if (currentWorkflow && currentWorkflow.docId && snapZoom(currentZoom) !== diagramZoom) {
+        loadServerDiagram();
+        return;
+    }
+    diagram.style.transform = `scale(${currentZoom / diagramZoom})`;
 }
 
 function resetVisualization() {
     currentZoom = 1;
     const diagram = document.getElementById('workflowDiagram');
+    if (currentWorkflow && currentWorkflow.docId && diagramZoom !== 1) {
+        loadServerDiagram();
+        return;
+    }
+    diagramZoom = 1;
     diagram.style.transform = 'scale(1)';
 }
 
@@ -0,0 +1,150 @@
+import sys
+from array import array
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+# Tool fields that are searched, in the order hits are reported
+TOOL_FIELDS = ("tool_id", "plugin", "tool_name", "category", "annotation", "configuration")
+# Shorter queries match nearly every line and are not worth a round trip
+MIN_QUERY_CHARS = 2
+
+
+def _lower(text: str) -> str:
+    """Lower-case text without changing its length, so offsets stay valid for the original"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters (e.g. U+0130) expand when lower-cased; leave those as they are
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+def _offsets(text: str) -> array:
+    """Start offset of every line in text, plus one past the end"""
+    offsets = array("q", [0])
+    start = text.find("\n")
+    while start != -1:
+        offsets.append(start + 1)
+        start = text.find("\n", start + 1)
+    offsets.append(len(text) + 1)
+    return offsets
+
+
+def _configuration_text(configuration: dict) -> str:
+    parts = []
+    for key, value in configuration.items():
+        if isinstance(value, dict):
+            value = " ".join(f"{name}={item}" for name, item in value.items())
+        parts.append(f"{key}: {value}")
+    return " | ".join(parts)
+
+
+class SearchIndex:
+    """
+    Case-insensitive substring index over a workflow's XML lines and tool fields.
+
+    Each corpus is one lower-cased string with a table of record start
+    offsets, so a query is a run of str.find calls over contiguous memory
+    and every match maps to its line or tool field with a binary search.
+    Hits carry [start, end) highlight ranges relative to their line or
+    field, so clients render only the hits they display.
+    """
+    __slots__ = ("lines", "line_offsets", "fields", "field_text", "field_offsets", "field_tools", "field_names",
+                 "tool_ids")
+
+    def __init__(self, source_text: Optional[str], workflow):
+        text = (source_text or "").replace("\r\n", "\n")
+        self.lines = _lower(text)
+        self.line_offsets = _offsets(text) if source_text else array("q", [0])
+
+        self.tool_ids = []
+        self.field_tools = array("I")
+        self.field_names = array("B")
+        records = []
+        for index, tool in enumerate(workflow.tools):
+            self.tool_ids.append(tool.tool_id)
+            properties = tool.custom_properties
+            values = (
+                tool.tool_id,
+                tool.plugin,
+                properties.get("tool_name", ""),
+                properties.get("category", ""),
+                properties.get("annotation", ""),
+                _configuration_text(tool.configuration)
+            )
+            for field, value in enumerate(values):
+                if value:
+                    # Fields never contain newlines, which separate records
+                    records.append(str(value).replace("\n", " "))
+                    self.field_tools.append(index)
+                    self.field_names.append(field)
+        self.field_text = "\n".join(records)
+        self.fields = _lower(self.field_text)
+        self.field_offsets = _offsets(self.field_text) if records else array("q", [0])
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the corpora and record tables"""
+        strings = (self.lines, self.fields, self.field_text)
+        tables = (self.line_offsets, self.field_offsets, self.field_tools, self.field_names)
+        return sum(map(sys.getsizeof, strings)) + sum(len(t) * t.itemsize for t in tables)
+
+    @classmethod
+    def from_source(cls, source: Optional[bytes], workflow) -> "SearchIndex":
+        """Index the uploaded bytes, decoded the way the browser shows them, and the workflow's tools"""
+        text = None
+        if source is not None:
+            encoding = getattr(workflow, "source_encoding", "utf-8")
+            # FileReader drops a UTF-8 byte order mark, so line 1 must not start with one
+            text = source.decode("utf-8-sig" if encoding.lower() == "utf-8" else encoding, errors="replace")
+        return cls(text, workflow)
+
+    @staticmethod
+    def _find(corpus: str, offsets: array, query: str, offset: int,
+              limit: int) -> Tuple[int, List[Tuple[int, List[List[int]]]]]:
+        """
+        Number of records containing query, and (record number, highlight
+        ranges) for the matching records offset..offset + limit - 1 only
+        """
+        total = 0
+        page = []
+        position = corpus.find(query)
+        while position != -1:
+            record = bisect_right(offsets, position) - 1
+            start, end = offsets[record], offsets[record + 1] - 1
+            if offset <= total < offset + limit:
+                ranges = []
+                while position != -1:
+                    ranges.append([position - start, position - start + len(query)])
+                    position = corpus.find(query, position + len(query), end)
+                page.append((record, ranges))
+            total += 1
+            # Records are counted, not occurrences: continue at the next record
+            position = corpus.find(query, end + 1)
+        return total, page
+
+    def search(self, query: str, scope: str = "all", offset: int = 0, limit: int = 50) -> dict:
+        """Paginated line and tool hits for a case-insensitive substring query"""
+        needle = _lower(query)
+        result = {"query": query}
+        if len(needle) < MIN_QUERY_CHARS or "\n" in needle:
+            return {**result, "lines": {"total": 0, "hits": []}, "tools": {"total": 0, "hits": []}}
+
+        if scope in ("all", "lines"):
+            total, hits = self._find(self.lines, self.line_offsets, needle, offset, limit)
+            result["lines"] = {
+                "total": total,
+                "hits": [{"line": line + 1, "ranges": ranges} for line, ranges in hits]
+            }
+        if scope in ("all", "tools"):
+            total, hits = self._find(self.fields, self.field_offsets, needle, offset, limit)
+            page = []
+            for record, ranges in hits:
+                start, end = self.field_offsets[record], self.field_offsets[record + 1] - 1
+                page.append({
+                    "tool_id": self.tool_ids[self.field_tools[record]],
+                    "field": TOOL_FIELDS[self.field_names[record]],
+                    "text": self.field_text[start:end],
+                    "ranges": ranges
+                })
+            result["tools"] = {"total": total, "hits": page}
+        return result
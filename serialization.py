@@ -0,0 +1,116 @@
+import gzip
+import json
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+
+# Optional accelerators; everything falls back to the standard library
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+# Suffix of the stored artifact for each content encoding
+ENCODING_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def dumps_json(obj) -> bytes:
+    """Compact UTF-8 JSON, matching FastAPI's JSONResponse output"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class RawJSON:
+    """Already encoded JSON, embedded verbatim by json_object"""
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def json_object(fields: dict) -> bytes:
+    """Encode a flat object whose values may be RawJSON, without re-encoding those"""
+    parts = [
+        dumps_json(key) + b":" + (value.data if isinstance(value, RawJSON) else dumps_json(value))
+        for key, value in fields.items()
+    ]
+    return b"{" + b",".join(parts) + b"}"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed"""
+
+    def render(self, content) -> bytes:
+        if isinstance(content, RawJSON):
+            return content.data
+        return dumps_json(content)
+
+
+def _accepted(header: str) -> dict:
+    """Media ranges or codings from an Accept/Accept-Encoding header with their q values"""
+    accepted = {}
+    for item in header.split(","):
+        value, _, params = item.strip().partition(";")
+        if not value:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, number = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        accepted[value.strip().lower()] = q
+    return accepted
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """True when the client prefers MessagePack over JSON and msgpack is installed"""
+    if msgpack is None or not accept:
+        return False
+    accepted = _accepted(accept)
+    msgpack_q = max(accepted.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    return msgpack_q > 0 and msgpack_q >= accepted.get(JSON_MEDIA_TYPE, 0.0)
+
+
+def dumps_msgpack(obj) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported content coding for an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    accepted = _accepted(accept_encoding)
+    candidates = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if encoding == "gzip":
+        # mtime=0 keeps the output deterministic for identical input
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
@@ -0,0 +1,74 @@
+import os
+import time
+
+from artifact_store import ArtifactStore
+
+DOC_ID = "cd" * 32
+
+
+def age(path: str, seconds: float) -> None:
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_reads_push_back_expiry(tmp_path):
+    store = ArtifactStore(str(tmp_path), ttl=100, spill_threshold=0, sweep_interval=10)
+    path = store.put(DOC_ID, "workflow.pdf", b"%PDF-").path
+    age(path, 90)
+
+    artifact = store.get(DOC_ID, "workflow.pdf")
+    assert artifact is not None and time.time() - artifact.created < 5
+    assert time.time() - os.stat(path).st_mtime < 5
+
+    # Read again within sweep_interval: the timestamp is left alone
+    age(path, 5)
+    store.get(DOC_ID, "workflow.pdf")
+    assert 4 < time.time() - os.stat(path).st_mtime < 10
+
+
+def test_memory_hits_refresh_the_file_too(tmp_path):
+    store = ArtifactStore(str(tmp_path), ttl=100, sweep_interval=10)
+    artifact = store.put(DOC_ID, "document.json", b"{}")
+    artifact.created -= 90
+    age(artifact.path, 90)
+
+    assert store.get(DOC_ID, "document.json") is artifact
+    # Another worker, without the memory entry, still sees it as fresh
+    assert ArtifactStore(str(tmp_path), ttl=100).get(DOC_ID, "document.json") is not None
+    assert time.time() - os.stat(artifact.path).st_mtime < 5
+
+
+def test_sweep_removes_expired_artifacts_and_stale_temporary_files(tmp_path):
+    store = ArtifactStore(str(tmp_path), ttl=100)
+    expired = store.put(DOC_ID, "old.xml", b"<a/>").path
+    age(expired, 200)
+    stale, fresh = tmp_path / "abc.pdf.tmp", tmp_path / "def.pdf.tmp"
+    stale.write_bytes(b"partial")
+    fresh.write_bytes(b"rendering")
+    age(str(stale), 200)
+    (tmp_path / "notes.txt").write_text("not ours")
+    age(str(tmp_path / "notes.txt"), 200)
+
+    store.sweep()
+    assert not os.path.exists(expired) and not (tmp_path / DOC_ID).exists()
+    assert not stale.exists() and fresh.exists()
+    assert (tmp_path / "notes.txt").exists()
+
+    # The document's directory is recreated on the next write
+    assert store.put(DOC_ID, "new.xml", b"<b/>").read() == b"<b/>"
+    source = tmp_path / "export.tmp"
+    source.write_bytes(b"done")
+    store.sweep()
+    assert store.put_file("ef" * 32, "workflow.pdf", str(source)).size == 4
+
+
+def test_sweep_prunes_least_recently_used_first(tmp_path):
+    store = ArtifactStore(str(tmp_path), ttl=1000, spill_threshold=0, max_disk_bytes=10, sweep_interval=10)
+    first = store.put(DOC_ID, "a.bin", b"x" * 6).path
+    second = store.put(DOC_ID, "b.bin", b"y" * 6).path
+    age(first, 100)
+    age(second, 50)
+    store.get(DOC_ID, "a.bin")
+
+    store.sweep()
+    assert os.path.exists(first) and not os.path.exists(second)
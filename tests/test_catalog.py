@@ -0,0 +1,143 @@
+import sqlite3
+from xml.sax.saxutils import escape
+
+import pytest
+
+from batch_document import _index
+from catalog import WorkflowCatalog
+from toolsmetadata import AlteryxDocGenerator
+
+FILTER = "AlteryxBasePluginsGui.Filter.Filter"
+INPUT = "AlteryxBasePluginsGui.DbFileInput.DbFileInput"
+
+
+def workflow(*tools, constants=None):
+    """Parse a small workflow from (plugin, {config element: text}) pairs, numbered from 1"""
+    nodes = "".join(
+        f'<Node ToolID="{tool_id}"><GuiSettings Plugin="{plugin}"><Position x="0" y="0" /></GuiSettings>'
+        f'<Properties><Configuration>'
+        + "".join(f"<{key}>{escape(value)}</{key}>" for key, value in config.items())
+        + "</Configuration></Properties></Node>"
+        for tool_id, (plugin, config) in enumerate(tools, 1))
+    constants = "".join(f"<Constant><Namespace>User</Namespace><Name>{name}</Name><Value>{value}</Value></Constant>"
+                        for name, value in (constants or {}).items())
+    content = (f'<?xml version="1.0"?><AlteryxDocument yxmdVer="2023.1"><Nodes>{nodes}</Nodes><Connections />'
+               f"<Properties><Constants>{constants}</Constants></Properties></AlteryxDocument>")
+    return AlteryxDocGenerator().parse_workflow(content.encode("utf-8"))
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = WorkflowCatalog(str(tmp_path / "catalog.db"))
+    yield catalog
+    catalog.close()
+
+
+def paths(result):
+    return [entry["path"] for entry in result["workflows"]]
+
+
+def test_reindexing_a_changed_workflow_leaves_no_stale_rows(catalog):
+    catalog.index("a.yxmd", "v1", workflow((INPUT, {"File": r"C:\data\old_sales.csv"})))
+    assert not catalog.index("a.yxmd", "v1", workflow((INPUT, {"File": "ignored"})))
+    assert catalog.index("a.yxmd", "v2", workflow((INPUT, {"File": r"C:\data\new_sales.csv"})))
+
+    assert paths(catalog.find_config_value("old_sales", match="contains")) == []
+    assert paths(catalog.find_config_value("new_sales", match="contains")) == ["a.yxmd"]
+    assert catalog.stats()["config_values"] == 1
+    if catalog.fts:
+        # Raises if the external-content index disagrees with config_values
+        catalog._db.execute("INSERT INTO config_search (config_search) VALUES ('integrity-check')")
+
+
+def test_remove_keeps_listed_package_members(catalog):
+    for path in ("pkg.yxzp/a.yxmd", "pkg.yxzp/b.yxmd", "pkg.yxzp/c.yxmd", "pkg.yxzp.yxmd"):
+        catalog.index(path, path, workflow((FILTER, {"Expression": "[x] > 1"})))
+
+    assert catalog.remove("pkg.yxzp", keep=["pkg.yxzp/a.yxmd"]) == 2
+    # A sibling that merely shares the prefix is not a member
+    assert sorted(catalog.indexed()) == ["pkg.yxzp.yxmd", "pkg.yxzp/a.yxmd"]
+    assert catalog.stats()["tools"] == 2
+
+
+def test_batch_index_drops_members_no_longer_in_the_package(catalog):
+    members = [("a.yxmd", "1", workflow((FILTER, {}))), ("b.yxmd", "2", workflow((FILTER, {})))]
+    _index(catalog, "pkg.yxzp", members)
+    _index(catalog, "pkg.yxzp", members[:1])
+    assert catalog.indexed() == {"pkg.yxzp/a.yxmd": "1"}
+
+
+def test_migrates_a_version_0_catalog(tmp_path):
+    path = str(tmp_path / "old.db")
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE workflows (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, doc_id TEXT NOT NULL,
+            name TEXT, yxmd_version TEXT, tools INTEGER NOT NULL, connections INTEGER NOT NULL,
+            indexed_at REAL NOT NULL);
+        CREATE TABLE config_values (workflow_id INTEGER NOT NULL, tool_id TEXT NOT NULL,
+            key TEXT NOT NULL COLLATE NOCASE, value TEXT NOT NULL COLLATE NOCASE);
+        CREATE INDEX config_values_workflow ON config_values (workflow_id);
+        CREATE INDEX config_values_value ON config_values (value, key, workflow_id, tool_id);
+        CREATE INDEX config_values_key ON config_values (key, value);
+        INSERT INTO workflows VALUES (1, 'old.yxmd', 'v0', 'Old', '2020.1', 1, 0, 0);
+        INSERT INTO config_values VALUES (1, '1', 'File', 'C:\\data\\legacy_orders.csv');
+    """)
+    db.close()
+
+    catalog = WorkflowCatalog(path)
+    try:
+        assert catalog._db.execute("PRAGMA user_version").fetchone()[0] == 1
+        assert paths(catalog.find_config_value("legacy_orders", match="contains")) == ["old.yxmd"]
+        # Migrated rows can be replaced like any others
+        catalog.index("old.yxmd", "v1", workflow((INPUT, {"File": "new.csv"})))
+        assert paths(catalog.find_config_value("legacy_orders", match="contains")) == []
+    finally:
+        catalog.close()
+
+    # Reopening a migrated catalog leaves it alone
+    reopened = WorkflowCatalog(path)
+    assert reopened.indexed() == {"old.yxmd": "v1"}
+    reopened.close()
+
+
+def test_find_plugin_matches_plugin_or_tool_name_case_insensitively(catalog):
+    catalog.index("a.yxmd", "1", workflow((INPUT, {}), (FILTER, {})))
+    catalog.index("b.yxmd", "2", workflow((FILTER, {})))
+
+    assert paths(catalog.find_plugin(FILTER.upper())) == ["a.yxmd", "b.yxmd"]
+    result = catalog.find_plugin("input data")
+    assert paths(result) == ["a.yxmd"] and result["workflows"][0]["tool_ids"] == ["1"]
+    page = catalog.find_plugin("Filter", limit=1, offset=1)
+    assert page["total"] == 2 and paths(page) == ["b.yxmd"]
+
+
+@pytest.mark.parametrize("match, value, expected", [
+    ("exact", r"c:\DATA\sales.csv", ["a.yxmd"]),
+    ("exact", "sales.csv", []),
+    ("prefix", r"C:\data\S", ["a.yxmd"]),
+    ("contains", "SALES", ["a.yxmd", "b.yxmd"]),
+    ("contains", "al", ["a.yxmd", "b.yxmd"]),  # Too short for the trigram index
+    ("prefix", r"C:\data\sales_", []),  # LIKE wildcards are matched literally
+])
+def test_find_config_value(catalog, match, value, expected):
+    catalog.index("a.yxmd", "1", workflow((INPUT, {"File": r"C:\data\sales.csv"})))
+    catalog.index("b.yxmd", "2", workflow((FILTER, {"Expression": "[Region] = 'Sales West'"})))
+    assert paths(catalog.find_config_value(value, match=match)) == expected
+
+
+def test_find_config_value_under_a_key(catalog):
+    catalog.index("a.yxmd", "1", workflow((INPUT, {"File": "sales.csv"}), (FILTER, {"Expression": "sales"})))
+    result = catalog.find_config_value("sales", match="contains", key="expression")
+    assert result["workflows"][0]["tool_ids"] == ["2"]
+    with pytest.raises(ValueError):
+        catalog.find_config_value("sales", match="fuzzy")
+
+
+def test_find_constant_defining_and_referencing(catalog):
+    catalog.index("defines.yxmd", "1", workflow((FILTER, {}), constants={"Threshold": "10"}))
+    catalog.index("uses.yxmd", "2", workflow((FILTER, {"Expression": "[Amount] > %User.Threshold%"})))
+    catalog.index("other.yxmd", "3", workflow((FILTER, {"Expression": "[Threshold] > 1"})))
+
+    result = catalog.find_constant("threshold")
+    assert paths(result["defining"]) == ["defines.yxmd"]
+    assert paths(result["referencing"]) == ["uses.yxmd"]
@@ -0,0 +1,120 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from artifact_store import Artifact
+from tool_configs import ConfigurationDecoder, read_configuration
+from toolsmetadata import AlteryxDocGenerator, IncrementalWorkflowParser
+
+WORKFLOW = """<?xml version="1.0" encoding="{encoding}"?>
+<AlteryxDocument yxmdVer="2023.1">
+  <Nodes>
+    <Node ToolID="1">
+      <GuiSettings Plugin="AlteryxBasePluginsGui.DbFileInput.DbFileInput"><Position x="0" y="0" /></GuiSettings>
+      <Properties>
+        <Configuration><File OutputFileName="" FileFormat="0">C:\\données\\ventes_été.csv</File></Configuration>
+        <Annotation DisplayMode="0"><DefaultAnnotationText>Café</DefaultAnnotationText></Annotation>
+      </Properties>
+    </Node>
+    <Node ToolID="2">
+      <GuiSettings Plugin="AlteryxBasePluginsGui.BrowseV2.BrowseV2"><Position x="1" y="0" /></GuiSettings>
+      <Properties><Configuration/></Properties>
+    </Node>
+    <Node ToolID="3">
+      <GuiSettings Plugin="AlteryxGuiToolkit.ToolContainer.ToolContainer"><Position x="2" y="0" /></GuiSettings>
+      <Properties><Configuration><Caption>Zürich — naïve</Caption></Configuration></Properties>
+      <ChildNodes>
+        <Node ToolID="4">
+          <GuiSettings Plugin="AlteryxBasePluginsGui.Filter.Filter"><Position x="3" y="0" /></GuiSettings>
+          <Properties>
+            <Configuration Note="größer"><Expression>[Größe] &gt; 10 &amp;&amp; [Name] = "Ünïcödé"</Expression><Mode>Custom</Mode><Configuration>inner</Configuration></Configuration>
+          </Properties>
+        </Node>
+        <Node ToolID="5">
+          <GuiSettings Plugin="AlteryxBasePluginsGui.BrowseV2.BrowseV2"><Position x="4" y="0" /></GuiSettings>
+          <Properties><Configuration   /></Properties>
+        </Node>
+      </ChildNodes>
+    </Node>
+    <Node ToolID="6">
+      <GuiSettings Plugin="AlteryxBasePluginsGui.Formula.Formula"><Position x="5" y="0" /></GuiSettings>
+      <Properties><Configuration><![CDATA[a < b]]><Value name="x">{wide}</Value></Configuration></Properties>
+    </Node>
+  </Nodes>
+  <Connections />
+</AlteryxDocument>
+"""
+
+CHUNK_SIZES = [1, 2, 3, 5, 7, 64, 4096]
+
+
+def expected_configurations(source: bytes) -> dict:
+    """ToolID -> canonical <Configuration> from parsing the whole document with ElementTree"""
+    root = ET.fromstring(source)
+    return {node.get("ToolID"): ET.canonicalize(ET.tostring(node.find("Properties/Configuration")).strip())
+            for node in root.iter("Node")}
+
+
+def parse_in_chunks(data, size: int):
+    parser = IncrementalWorkflowParser()
+    for i in range(0, len(data), size):
+        parser.feed(data[i:i + size])
+    return parser.close()
+
+
+def decoded_configurations(workflow, source: bytes) -> dict:
+    artifact = Artifact("source.xml", data=source)
+    decoded = {}
+    for i, tool in enumerate(workflow.tools):
+        raw = read_configuration(artifact, workflow.config_span(i))
+        if workflow.source_encoding != "utf-8":
+            raw = f'<?xml version="1.0" encoding="{workflow.source_encoding}"?>'.encode("ascii") + raw
+        decoded[tool.tool_id] = ET.canonicalize(ET.tostring(ET.fromstring(raw)).strip())
+    return decoded
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+def test_spans_decode_to_the_eager_configuration_utf8(size):
+    source = WORKFLOW.format(encoding="utf-8", wide="日本語 🚀").encode("utf-8")
+    workflow = parse_in_chunks(source, size)
+    assert decoded_configurations(workflow, source) == expected_configurations(source)
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+def test_spans_decode_to_the_eager_configuration_latin1(size):
+    source = WORKFLOW.format(encoding="ISO-8859-1", wide="ÿ").replace("—", "-").encode("latin-1")
+    workflow = parse_in_chunks(source, size)
+    assert workflow.source_encoding == "iso-8859-1"
+    assert decoded_configurations(workflow, source) == expected_configurations(source)
+
+
+@pytest.mark.parametrize("size", [1, 3, 4096])
+def test_text_input_spans_refer_to_utf8_bytes(size):
+    text = WORKFLOW.format(encoding="utf-8", wide="日本語 🚀")
+    workflow = parse_in_chunks(text, size)
+    source = text.encode("utf-8")
+    assert decoded_configurations(workflow, source) == expected_configurations(source)
+
+
+def test_self_closing_spans_cover_the_whole_tag():
+    source = WORKFLOW.format(encoding="utf-8", wide="x").encode("utf-8")
+    workflow = parse_in_chunks(source, 3)
+    artifact = Artifact("source.xml", data=source)
+    raw = {tool.tool_id: read_configuration(artifact, workflow.config_span(i))
+           for i, tool in enumerate(workflow.tools)}
+    assert raw["2"] == b"<Configuration/>"
+    assert raw["5"] == b"<Configuration   />"
+    # The nested <Configuration> belongs to its parent's span, not a tool of its own
+    assert raw["4"].endswith(b"<Configuration>inner</Configuration></Configuration>")
+
+
+@pytest.mark.parametrize("size", [1, 7])
+def test_decoder_matches_the_eager_parse(size):
+    source = WORKFLOW.format(encoding="utf-8", wide="日本語 🚀").encode("utf-8")
+    eager = AlteryxDocGenerator().parse_workflow(source)
+    workflow = parse_in_chunks(source, size)
+    decoder = ConfigurationDecoder()
+    artifact = Artifact("source.xml", data=source)
+    for i, tool in enumerate(workflow.tools):
+        decoded = decoder.decode("doc", tool.tool_id, artifact, workflow.config_span(i))
+        assert decoded["configuration"] == eager.tools[i].configuration
@@ -0,0 +1,101 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from artifact_store import ArtifactStore
+from export_jobs import ExportQueue, DONE, FAILED
+
+DOC_ID = "ab" * 32
+SAMPLE_XML = (Path(__file__).parent / "data" / "golden" / "sample.xml").read_text(encoding="utf-8")
+
+
+def export_queue(tmp_path) -> ExportQueue:
+    queue = ExportQueue(ArtifactStore(str(tmp_path / "artifacts")), workers=1)
+    # Render in threads; the job flow is the same as with worker processes
+    queue._executor = ThreadPoolExecutor(max_workers=1)
+    return queue
+
+
+def stored_input(queue: ExportQueue, calls: list):
+    def prepare():
+        calls.append(1)
+        return queue.artifact_store.put(DOC_ID, "workflow.xml", SAMPLE_XML), "Sample"
+    return prepare
+
+
+def test_concurrent_requests_share_one_job(tmp_path):
+    async def scenario():
+        queue, calls = export_queue(tmp_path), []
+        first = queue.submit(DOC_ID, "pdf", stored_input(queue, calls))
+        second = queue.submit(DOC_ID, "pdf", stored_input(queue, calls))
+        assert second is first and first.requests == 2 and queue.coalesced == 1
+        await first.wait(10)
+        assert first.status == DONE and calls == [1]
+        assert queue.output(first).read().startswith(b"%PDF-")
+
+        # Later requests are served from the stored export without rendering it again
+        later = queue.submit(DOC_ID, "pdf", stored_input(queue, calls))
+        assert later is not first and later.status == DONE and calls == [1]
+        assert later.etag == first.etag
+        queue.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_failed_job_reports_its_error_and_can_be_retried(tmp_path):
+    async def scenario():
+        queue, calls = export_queue(tmp_path), []
+
+        def broken():
+            raise ValueError("no workflow.xml")
+
+        failed = queue.submit(DOC_ID, "pdf", broken)
+        await failed.wait(10)
+        assert failed.status == FAILED and failed.error == "no workflow.xml"
+        assert queue.output(failed) is None
+        assert failed.to_dict()["download_url"] is None
+
+        retried = queue.submit(DOC_ID, "pdf", stored_input(queue, calls))
+        assert retried is not failed
+        await retried.wait(10)
+        assert retried.status == DONE and calls == [1]
+        queue.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_follow_streams_the_export_as_it_renders(tmp_path):
+    async def scenario():
+        queue = export_queue(tmp_path)
+        job = queue.submit(DOC_ID, "pdf", stored_input(queue, []))
+        partial = queue.follow(job, chunk_size=256)
+        assert partial is not None
+        streamed = b"".join([chunk async for chunk in partial])
+        assert job.status == DONE
+        assert streamed == queue.output(job).read()
+        # Finished jobs are downloaded from the store instead
+        assert queue.follow(job) is None
+        queue.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_matching_if_none_match_gets_304(tmp_path, monkeypatch):
+    # The backend configures its stores from the environment when first imported
+    monkeypatch.setenv("ALTERYX_DOC_ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    monkeypatch.setenv("ALTERYX_DOC_CATALOG_PATH", str(tmp_path / "catalog.db"))
+    from fastapi.testclient import TestClient
+    import backend
+
+    with TestClient(backend.app) as client:
+        content = (Path(__file__).parent / "data" / "golden" / "sample.yxmd").read_bytes()
+        doc_id = client.post("/upload", files={"file": ("sample.yxmd", content)}).json()["doc_id"]
+
+        first = client.get(f"/download-xml-pdf/{doc_id}")
+        assert first.status_code == 200 and first.content.startswith(b"%PDF-")
+        stored = client.get(f"/download-xml-pdf/{doc_id}")
+        assert stored.status_code == 200 and stored.content == first.content
+        cached = client.get(f"/download-xml-pdf/{doc_id}", headers={"If-None-Match": stored.headers["ETag"]})
+        assert cached.status_code == 304 and cached.headers["ETag"] == stored.headers["ETag"]
+        assert client.get(f"/download-xml-pdf/{'0' * 64}", headers={"If-None-Match": stored.headers["ETag"]}
+                          ).status_code == 404
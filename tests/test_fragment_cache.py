@@ -0,0 +1,59 @@
+import sys
+
+from fingerprints import FragmentCache
+from toolsmetadata import AlteryxDocGenerator
+
+WORKFLOW = """<?xml version="1.0"?>
+<AlteryxDocument yxmdVer="2023.1">
+  <Nodes>
+    <Node ToolID="1">
+      <GuiSettings Plugin="AlteryxBasePluginsGui.Formula.Formula"><Position x="0" y="0" /></GuiSettings>
+      <Properties><Configuration>{fields}</Configuration></Properties>
+    </Node>
+  </Nodes>
+  <Properties><MetaInfo><Name>Order</Name></MetaInfo></Properties>
+</AlteryxDocument>"""
+
+
+def render(content: str, cache: FragmentCache):
+    generator = AlteryxDocGenerator(fragment_cache=cache)
+    workflow = generator.parse_workflow(content)
+    return generator.generate_alteryx_xml(workflow), generator.generate_markdown_doc(workflow)
+
+
+def test_reordered_configuration_is_not_served_from_cache():
+    cache = FragmentCache()
+    render(WORKFLOW.format(fields="<A>1</A><B>2</B>"), cache)
+    reordered = WORKFLOW.format(fields="<B>2</B><A>1</A>")
+
+    assert render(reordered, cache) == render(reordered, FragmentCache())
+
+
+def test_unchanged_tools_are_served_from_cache():
+    cache = FragmentCache()
+    content = WORKFLOW.format(fields="<A>1</A><B>2</B>")
+    first = render(content, cache)
+    hits = cache.hits
+
+    assert render(content, cache) == first
+    assert cache.hits > hits
+
+
+def test_cache_is_bounded_by_bytes():
+    fragment = "x" * 1000
+    cache = FragmentCache(max_bytes=sys.getsizeof(fragment) * 3)
+    for tool_id in range(10):
+        cache.put("xml", str(tool_id), "fp", fragment)
+
+    assert cache.stats()["entries"] == 3
+    assert cache.bytes <= cache.max_bytes
+    assert cache.get("xml", "0", "fp") is None
+    assert cache.get("xml", "9", "fp") == fragment
+
+
+def test_fragment_larger_than_budget_is_not_cached():
+    cache = FragmentCache(max_bytes=100)
+    cache.put("xml", "1", "fp", "x" * 1000)
+
+    assert cache.get("xml", "1", "fp") is None
+    assert cache.bytes == 0
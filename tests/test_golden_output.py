@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pytest
+
+from fingerprints import FragmentCache
+from toolsmetadata import AlteryxDocGenerator
+
+# <name>.yxmd inputs with the Alteryx XML (<name>.xml) and markdown (<name>.md)
+# rendered for them before fragment caching was introduced (unknown.* before the
+# tool catalog was indexed, to pin the fallback names for uncatalogued tools)
+GOLDEN = Path(__file__).parent / "data" / "golden"
+CASES = sorted(path.stem for path in GOLDEN.glob("*.yxmd"))
+
+
+def expected(name: str):
+    read = lambda suffix: (GOLDEN / f"{name}{suffix}").read_text(encoding="utf-8")
+    return read(".xml"), read(".md")
+
+
+def render(name: str, cache: FragmentCache):
+    generator = AlteryxDocGenerator(fragment_cache=cache)
+    workflow = generator.parse_workflow((GOLDEN / f"{name}.yxmd").read_bytes())
+    return generator.generate_alteryx_xml(workflow), generator.generate_markdown_doc(workflow)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_output_matches_golden(name):
+    assert render(name, FragmentCache()) == expected(name)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_cached_fragments_match_golden(name):
+    cache = FragmentCache()
+    render(name, cache)
+    misses, hits = cache.misses, cache.hits
+
+    assert render(name, cache) == expected(name)
+    # Every fragment rendered the first time is reused the second
+    assert cache.misses == misses
+    assert cache.hits - hits >= misses
@@ -0,0 +1,64 @@
+import asyncio
+
+from packages import MacroCache
+
+
+def test_waiter_parses_itself_when_first_caller_is_cancelled():
+    async def scenario():
+        cache = MacroCache()
+        started = asyncio.Event()
+        calls = []
+
+        async def slow_parse(content):
+            calls.append("slow")
+            started.set()
+            await asyncio.sleep(60)
+
+        async def parse(content):
+            calls.append("parse")
+            return "analysis"
+
+        first = asyncio.ensure_future(cache.get(b"<macro/>", slow_parse))
+        await started.wait()
+        second = asyncio.ensure_future(cache.get(b"<macro/>", parse))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        _, analysis, cache_hit = await asyncio.wait_for(second, timeout=5)
+        assert first.cancelled()
+        assert (analysis, cache_hit) == ("analysis", False)
+        assert calls == ["slow", "parse"]
+        assert not cache._pending
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_callers_share_one_parse():
+    async def scenario():
+        cache = MacroCache()
+        calls = []
+
+        async def parse(content):
+            calls.append(content)
+            await asyncio.sleep(0.01)
+            return "analysis"
+
+        results = await asyncio.gather(*[cache.get(b"<macro/>", parse) for _ in range(3)])
+        assert calls == [b"<macro/>"]
+        assert [hit for _, _, hit in results] == [False, True, True]
+
+    asyncio.run(scenario())
+
+
+def test_failed_parse_is_raised_to_waiters():
+    async def scenario():
+        cache = MacroCache()
+
+        async def parse(content):
+            await asyncio.sleep(0.01)
+            raise ValueError("bad macro")
+
+        results = await asyncio.gather(cache.get(b"x", parse), cache.get(b"x", parse), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+
+    asyncio.run(scenario())
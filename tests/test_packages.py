@@ -0,0 +1,92 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+from packages import MacroCache, WorkflowPackage, resolve_macros
+from toolsmetadata import AlteryxDocGenerator
+
+
+def workflow(name: str, *macros: str) -> bytes:
+    """A workflow (or macro) whose tools 1..n each reference one macro path"""
+    nodes = "".join(
+        f'<Node ToolID="{tool_id}"><GuiSettings><Position x="0" y="0" /></GuiSettings>'
+        f'<Properties><Configuration /></Properties><EngineSettings Macro="{macro}" /></Node>'
+        for tool_id, macro in enumerate(macros, 1))
+    return (f'<?xml version="1.0"?><AlteryxDocument yxmdVer="2023.1"><Nodes>{nodes}</Nodes><Connections />'
+            f"<Properties><MetaInfo><Name>{name}</Name></MetaInfo></Properties></AlteryxDocument>").encode("utf-8")
+
+
+def package(members: dict, **kwargs) -> WorkflowPackage:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return WorkflowPackage(buffer, **kwargs)
+
+
+async def parse(content: bytes):
+    return AlteryxDocGenerator().parse_workflow(content)
+
+
+def test_members_and_workflows():
+    pkg = package({"sub/deep.yxmd": workflow("Deep"), "main.yxmd": workflow("Main"),
+                   "Macros/Clean.yxmc": workflow("Clean"), "data/input.csv": b"a,b\n"})
+    assert set(pkg.members) == {"sub/deep.yxmd", "main.yxmd", "Macros/Clean.yxmc", "data/input.csv"}
+    assert pkg.workflows == ["main.yxmd", "sub/deep.yxmd"]
+    assert pkg.read("data/input.csv") == b"a,b\n"
+    assert pkg.find_macro("Macros\\Clean.yxmc") == "Macros/Clean.yxmc"
+    assert pkg.find_macro("C:\\Shared\\CLEAN.yxmc") == "Macros/Clean.yxmc"
+    assert pkg.find_macro("Other.yxmc") is None
+    pkg.close()
+
+
+def test_size_guard_refuses_large_members():
+    pkg = package({"main.yxmd": workflow("Main"), "big.csv": b"x" * 1000}, max_member_bytes=500)
+    assert pkg.read("main.yxmd").startswith(b"<?xml")
+    with pytest.raises(ValueError, match="too large"):
+        pkg.read("big.csv")
+
+
+def test_not_a_zip_is_rejected():
+    with pytest.raises(ValueError, match="not a zip archive"):
+        WorkflowPackage(io.BytesIO(b"<AlteryxDocument />"))
+
+
+def test_nested_macros_are_resolved_and_duplicates_reported():
+    pkg = package({
+        "main.yxmd": workflow("Main", "Macros\\Outer.yxmc", "Missing.yxmc", "C:\\elsewhere\\outer.yxmc"),
+        "Macros/Outer.yxmc": workflow("Outer", "Inner.yxmc"),
+        # Refers back to Outer, which is already being resolved
+        "Macros/Inner.yxmc": workflow("Inner", "Outer.yxmc"),
+    })
+
+    async def scenario():
+        main = await parse(pkg.read("main.yxmd"))
+        return await resolve_macros(pkg, main, MacroCache(), parse)
+
+    outer, missing, duplicate = asyncio.run(scenario())
+    assert (outer["member"], outer["name"], outer["referenced_by"]) == ("Macros/Outer.yxmc", "Outer", ["1"])
+    [inner] = outer["macros"]
+    assert (inner["member"], inner["name"]) == ("Macros/Inner.yxmc", "Inner")
+    assert inner["macros"] == [{"macro": "Outer.yxmc", "resolved": True, "member": "Macros/Outer.yxmc",
+                                "duplicate_of": "Macros\\Outer.yxmc", "referenced_by": ["1"]}]
+    assert missing == {"macro": "Missing.yxmc", "resolved": False, "referenced_by": ["2"]}
+    assert duplicate == {"macro": "C:\\elsewhere\\outer.yxmc", "resolved": True, "member": "Macros/Outer.yxmc",
+                         "duplicate_of": "Macros\\Outer.yxmc", "referenced_by": ["3"]}
+
+
+def test_identical_macros_in_different_members_are_parsed_once():
+    macro = workflow("Shared")
+    pkg = package({"main.yxmd": workflow("Main", "A.yxmc", "B.yxmc"), "A.yxmc": macro, "B.yxmc": macro})
+    cache = MacroCache()
+
+    async def scenario():
+        return await resolve_macros(pkg, await parse(pkg.read("main.yxmd")), cache, parse)
+
+    first, second = asyncio.run(scenario())
+    assert first["content_hash"] == second["content_hash"]
+    assert (first["cache_hit"], second["cache_hit"]) == (False, True)
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
@@ -0,0 +1,67 @@
+import pickle
+
+import result_cache
+from result_cache import CachedResult, ResultCache
+from worker_pool import analyze_workflow
+
+WORKFLOW = b"""<?xml version="1.0"?>
+<AlteryxDocument yxmdVer="2023.1">
+  <Nodes>
+    <Node ToolID="1">
+      <GuiSettings Plugin="AlteryxBasePluginsGui.Filter.Filter"><Position x="0" y="0" /></GuiSettings>
+      <Properties><Configuration><Expression>[A] = 1</Expression></Configuration></Properties>
+    </Node>
+  </Nodes>
+  <Properties><MetaInfo><Name>Cached</Name></MetaInfo></Properties>
+</AlteryxDocument>"""
+
+
+def result() -> CachedResult:
+    return analyze_workflow(WORKFLOW)[0]
+
+
+def test_put_sizes_entries_without_pickling(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("put must not serialize the entry")
+
+    monkeypatch.setattr(result_cache.pickle, "dumps", fail)
+    cache = ResultCache()
+    entry = result()
+    cache.put("a", entry)
+
+    assert cache.get("a") is entry
+    assert cache.stats()["bytes"] == entry.size > len(entry.markdown) + len(entry.alteryx_xml)
+
+
+def test_memory_budget_evicts_least_recently_used():
+    entry = result()
+    cache = ResultCache(max_bytes=entry.estimate_size() * 2)
+    cache.put("a", entry)
+    cache.put("b", result())
+    cache.get("a")
+    cache.put("c", result())
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_spilled_entries_load_only_when_asked(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    cache.put("a", result())
+    cache.spill("a", cache.get("a"))
+
+    restarted = ResultCache(cache_dir=str(tmp_path))
+    assert restarted.get("a", load=False) is None
+    assert restarted.stats()["misses"] == 0
+    loaded = restarted.get("a")
+    assert loaded.markdown == result().markdown
+    assert restarted.get("a", load=False) is loaded
+
+
+def test_spill_writes_loadable_pickle(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    entry = result()
+    cache.spill("a", entry)
+
+    with open(tmp_path / "a.pkl", "rb") as f:
+        assert pickle.load(f).alteryx_xml == entry.alteryx_xml
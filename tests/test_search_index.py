@@ -0,0 +1,65 @@
+from pathlib import Path
+
+from search_index import SearchIndex, MIN_QUERY_CHARS
+from toolsmetadata import AlteryxDocGenerator
+
+SAMPLE = (Path(__file__).parent / "data" / "golden" / "sample.yxmd").read_bytes()
+WORKFLOW = AlteryxDocGenerator().parse_workflow(SAMPLE)
+
+
+def index(text: str) -> SearchIndex:
+    return SearchIndex(text, WORKFLOW)
+
+
+def test_lines_are_counted_once_with_every_occurrence_highlighted():
+    result = index("Sales sales\nno match\nSALES\n").search("sales", scope="lines")
+    assert result["lines"] == {
+        "total": 2,
+        "hits": [{"line": 1, "ranges": [[0, 5], [6, 11]]}, {"line": 3, "ranges": [[0, 5]]}]
+    }
+    assert "tools" not in result
+
+
+def test_overlapping_occurrences_are_not_double_counted():
+    result = index("aaaa\n").search("aa", scope="lines")
+    assert result["lines"] == {"total": 1, "hits": [{"line": 1, "ranges": [[0, 2], [2, 4]]}]}
+
+
+def test_short_or_multiline_queries_return_nothing():
+    search = index("a\nab\n").search
+    assert len("a") < MIN_QUERY_CHARS
+    assert search("a")["lines"]["total"] == 0 and search("a")["tools"]["total"] == 0
+    assert search("a\nab")["lines"]["total"] == 0
+    assert search("ab")["lines"]["total"] == 1
+
+
+def test_matches_never_straddle_a_line_boundary():
+    search = index("abc\ndef\r\nghi").search
+    assert search("cd", scope="lines")["lines"]["total"] == 0
+    assert search("fg", scope="lines")["lines"]["total"] == 0
+    # The last line has no trailing newline
+    assert search("hi", scope="lines")["lines"]["hits"] == [{"line": 3, "ranges": [[1, 3]]}]
+
+
+def test_pagination_keeps_the_total():
+    text = "\n".join(f"row {i} match" for i in range(10))
+    search = index(text).search
+    page = search("match", scope="lines", offset=3, limit=4)["lines"]
+    assert page["total"] == 10
+    assert [hit["line"] for hit in page["hits"]] == [4, 5, 6, 7]
+    assert search("match", scope="lines", offset=8, limit=4)["lines"]["hits"][-1]["line"] == 10
+    assert search("match", scope="lines", offset=20)["lines"] == {"total": 10, "hits": []}
+
+
+def test_tool_fields_report_the_field_and_its_text():
+    tools = index(None).search("data", scope="tools")["tools"]
+    fields = [(hit["tool_id"], hit["field"]) for hit in tools["hits"]]
+    assert ("1", "tool_name") in fields and ("1", "configuration") in fields
+    hit = next(hit for hit in tools["hits"] if hit["field"] == "tool_name" and hit["tool_id"] == "1")
+    assert hit["text"] == "Input Data" and hit["ranges"] == [[6, 10]]
+    assert tools["total"] == len(tools["hits"])
+
+
+def test_from_source_drops_the_byte_order_mark():
+    search_index = SearchIndex.from_source(b"\xef\xbb\xbf<a>\r\n<b/>", WORKFLOW)
+    assert search_index.search("<a", scope="lines")["lines"]["hits"] == [{"line": 1, "ranges": [[0, 2]]}]
@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+
+from toolsmetadata import AlteryxDocGenerator
+from workflow_graph import WorkflowGraph
+
+SAMPLE = Path(__file__).parent / "data" / "golden" / "sample.yxmd"
+
+# 1 -> 2 -> 4, 1 -> 3 -> 4 -> 5, plus 6 on its own
+DIAMOND = (["1", "2", "3", "4", "5", "6"], [("1", "2"), ("1", "3"), ("2", "4"), ("3", "4"), ("4", "5")])
+
+
+def test_upstream_and_downstream_nearest_first():
+    graph = WorkflowGraph.from_connections(*DIAMOND)
+    assert graph.upstream("5") == ["4", "2", "3", "1"]
+    assert graph.downstream("1") == ["2", "3", "4", "5"]
+    assert graph.downstream("1", max_depth=1) == ["2", "3"]
+    assert graph.upstream("1") == [] and graph.downstream("6") == []
+
+
+def test_lineage_includes_connections_among_its_tools():
+    lineage = WorkflowGraph.from_connections(*DIAMOND).lineage("2")
+    assert lineage["upstream"] == ["1"]
+    assert lineage["downstream"] == ["4", "5"]
+    assert lineage["connections"] == [["1", "2"], ["2", "4"], ["4", "5"]]
+
+
+def test_summary_of_an_acyclic_workflow_with_a_disconnected_tool():
+    summary = WorkflowGraph.from_connections(*DIAMOND).summary()
+    assert summary["components"] == 2
+    assert not summary["has_cycles"] and summary["cycles"] == []
+    assert summary["sources"] == ["1", "6"]
+    assert summary["sinks"] == ["5", "6"]
+    order = summary["topological_order"]
+    assert sorted(order) == DIAMOND[0]
+    for origin, destination in DIAMOND[1]:
+        assert order.index(origin) < order.index(destination)
+
+
+def test_cycles_and_self_loops_are_detected():
+    graph = WorkflowGraph.from_connections(
+        ["1", "2", "3", "4", "5"], [("1", "2"), ("2", "3"), ("3", "1"), ("3", "4"), ("5", "5")])
+    summary = graph.summary()
+    assert summary["has_cycles"]
+    assert sorted(sorted(cycle) for cycle in summary["cycles"]) == [["1", "2", "3"], ["5"]]
+    # Tools in or behind a cycle never reach in-degree zero
+    assert summary["topological_order"] == []
+    # Walks terminate on cycles and never list the starting tool
+    assert graph.downstream("1") == ["2", "3", "4"]
+    assert graph.upstream("5") == []
+
+
+def test_connections_to_missing_tools_add_them_to_the_graph():
+    graph = WorkflowGraph.from_connections(["1", "2"], [("1", "2"), ("2", "99"), ("98", "1")])
+    assert graph.tool_ids == ["1", "2", "99", "98"]
+    assert graph.downstream("2") == ["99"]
+    assert graph.upstream("1") == ["98"]
+    assert graph.summary()["components"] == 1
+    with pytest.raises(KeyError):
+        graph.upstream("100")
+
+
+def test_from_analysis():
+    analysis = AlteryxDocGenerator().parse_workflow(SAMPLE.read_bytes())
+    graph = WorkflowGraph.from_analysis(analysis)
+    assert len(graph) == 5 and graph.edge_count == 3
+    assert graph.upstream("4") == ["3", "2", "1"]
+    # The tool container has no connections of its own
+    assert graph.summary()["components"] == 2
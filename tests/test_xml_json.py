@@ -0,0 +1,80 @@
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+import xmltodict
+
+from xml_json import element_to_dict, iter_items
+
+SAMPLE = (Path(__file__).parent / "data" / "golden" / "sample.yxmd").read_bytes()
+
+
+def chunked(data: bytes, size: int = 7):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+@pytest.mark.parametrize("fragment", [
+    "<a/>",
+    "<a>text</a>",
+    '<a x="1">text</a>',
+    '<a x="1"><b>one</b><b>two</b><c y="2"/></a>',
+    "<a>  head <b>inner</b> tail  </a>",
+    "<a><b><c>deep</c></b><b/></a>",
+])
+def test_element_to_dict_matches_xmltodict(fragment):
+    assert element_to_dict(ET.fromstring(fragment)) == xmltodict.parse(fragment)["a"]
+
+
+def test_node_items_match_xmltodict():
+    document = xmltodict.parse(SAMPLE)["AlteryxDocument"]
+    top = as_list(document["Nodes"]["Node"])
+    container = next(node for node in top if node["@ToolID"] == "5")
+    children = as_list(container["ChildNodes"]["Node"])
+
+    items = list(iter_items(chunked(SAMPLE), "node"))
+    assert [(item["tool_id"], item["container_tool_id"]) for item in items] == [
+        ("1", None), ("2", "5"), ("3", "5"), ("5", None), ("4", None)]
+    values = {item["tool_id"]: item["value"] for item in items}
+    assert values["1"] == top[0]
+    assert values["2"] == children[0]
+    # The container's children were released once they were yielded
+    assert values["5"]["ChildNodes"] is None
+    assert {key: value for key, value in values["5"].items() if key != "ChildNodes"} == \
+        {key: value for key, value in container.items() if key != "ChildNodes"}
+    assert items[1]["path"] == "AlteryxDocument/Nodes/Node/ChildNodes/Node"
+
+
+def test_connection_items_match_xmltodict():
+    expected = xmltodict.parse(SAMPLE)["AlteryxDocument"]["Connections"]["Connection"]
+    items = list(iter_items(chunked(SAMPLE), "connection"))
+    assert [item["value"] for item in items] == expected
+    assert [item["value"] for item in iter_items([SAMPLE], "connection", tool_ids=["3"])] == expected[1:]
+
+
+def test_configuration_items_and_selection():
+    items = list(iter_items(chunked(SAMPLE), "configuration", tool_ids=["1"]))
+    configuration = xmltodict.parse(SAMPLE)["AlteryxDocument"]["Nodes"]["Node"][0]["Properties"]["Configuration"]
+    assert {item["key"]: item["value"] for item in items} == configuration
+    assert {item["tool_id"] for item in items} == {"1"}
+
+    selected = list(iter_items([SAMPLE], "node", tool_ids=["2"], select=["Node/Properties/Configuration/Mode"]))
+    assert selected[0]["value"] == {"@ToolID": "2", "Properties": {"Configuration": {"Mode": "Custom"}}}
+
+
+def test_truncated_xml_yields_complete_items_then_raises_parse_error():
+    cut = SAMPLE.index(b"</Connections>")
+    items = iter_items(chunked(SAMPLE[:cut]), "connection")
+    assert len([next(items) for _ in range(3)]) == 3
+    with pytest.raises(ET.ParseError) as error:
+        next(items)
+    line, column = error.value.position
+    assert line == SAMPLE[:cut].count(b"\n") + 1 and column >= 0
+
+
+def test_unknown_level_is_rejected():
+    with pytest.raises(ValueError, match="level must be one of"):
+        list(iter_items([SAMPLE], "tool"))
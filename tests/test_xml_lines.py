@@ -0,0 +1,27 @@
+from pathlib import Path
+
+SAMPLE = (Path(__file__).parent / "data" / "golden" / "sample.yxmd").read_bytes()
+
+
+def test_lines_are_cached_by_etag_only_while_the_document_exists(tmp_path, monkeypatch):
+    # The backend configures its stores from the environment when first imported
+    monkeypatch.setenv("ALTERYX_DOC_ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    monkeypatch.setenv("ALTERYX_DOC_CATALOG_PATH", str(tmp_path / "catalog.db"))
+    from fastapi.testclient import TestClient
+    import backend
+
+    with TestClient(backend.app) as client:
+        doc_id = client.post("/upload", files={"file": ("sample.yxmd", SAMPLE)}).json()["doc_id"]
+
+        lines = client.get(f"/xml/{doc_id}/lines", params={"start": 2, "count": 3})
+        assert lines.status_code == 200
+        body = lines.json()
+        assert (body["start"], body["count"], body["total_lines"]) == (2, 3, SAMPLE.count(b"\n") + 1)
+
+        etag = lines.headers["ETag"]
+        cached = client.get(f"/xml/{doc_id}/lines", params={"start": 2, "count": 3}, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+
+        backend.artifact_store.delete(doc_id)
+        expired = client.get(f"/xml/{doc_id}/lines", params={"start": 2, "count": 3}, headers={"If-None-Match": etag})
+        assert expired.status_code == 404
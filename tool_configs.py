@@ -0,0 +1,81 @@
+import mmap
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import xmltodict
+
+from artifact_store import Artifact
+
+# Name of the artifact holding the uploaded workflow bytes
+SOURCE_ARTIFACT = "source.xml"
+
+END_TAG = b"</Configuration"
+
+
+def _read_span(data, start: int, end: int) -> bytes:
+    """Bytes of a <Configuration> element given the offsets recorded while parsing"""
+    if data[end:end + len(END_TAG)] == END_TAG:
+        end = data.find(b">", end) + 1
+    return bytes(data[start:end])
+
+
+def read_configuration(source: Artifact, span: Tuple[int, int]) -> bytes:
+    """Slice one <Configuration> out of the stored source, memory-mapping it when on disk"""
+    start, end = span
+    if source.data is not None:
+        return _read_span(source.data, start, end)
+    with open(source.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return _read_span(data, start, end)
+
+
+class ConfigurationDecoder:
+    """
+    Decodes single tool configurations from a workflow's original bytes
+
+    Only the requested element is parsed, so a tool's full configuration
+    costs nothing until the UI asks for it. Decoded results are kept in a
+    small LRU keyed by (doc_id, tool_id).
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def decode(self, doc_id: str, tool_id: str, source: Artifact, span: Tuple[int, int],
+               encoding: str = "utf-8") -> dict:
+        """Flattened configuration (as in the analysis), full element tree and raw XML of one tool"""
+        key = (doc_id, tool_id)
+        with self._lock:
+            decoded = self._entries.get(key)
+            if decoded is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return decoded
+            self.misses += 1
+
+        raw = read_configuration(source, span)
+        fragment = raw
+        if encoding != "utf-8":
+            # The fragment has lost the document's declaration
+            fragment = f'<?xml version="1.0" encoding="{encoding}"?>'.encode("ascii") + raw
+        element = ET.fromstring(fragment)
+        decoded = {
+            "configuration": {child.tag: child.text or child.attrib for child in element},
+            "configuration_tree": xmltodict.parse(fragment).get("Configuration"),
+            "configuration_xml": raw.decode(encoding, errors="replace")
+        }
+
+        with self._lock:
+            self._entries[key] = decoded
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return decoded
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -1,380 +1,831 @@
+import re
 import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from functools import lru_cache
+from types import MappingProxyType
+from typing import IO, Dict, Iterable, Iterator, Mapping, Optional, Tuple
+from models import WorkflowTool, WorkflowAnalysis
+from compact import CompactWorkflow, CompactWorkflowBuilder, NO_CONTAINER
+from fingerprints import FragmentCache, fragment_cache as shared_fragment_cache, tool_fingerprint
+
+# Pin: Comprehensive tool descriptions based on Alteryx Designer documentation
+
+_TOOL_DESCRIPTIONS = {
+    # In/Out Tools
+    "Input Data": {
+        "category": "In/Out",
+        "xml_name": "AlteryxBasePluginsGui.DbFileInput.DbFileInput",
+        "description": "Reads data from various sources like files, databases, or cloud storage",
+        "user_role": "Basic, Full",
+        "common_uses": ["Reading data files", "Database connections", "Cloud storage access"]
+    },
+    "Output Data": {
+        "category": "In/Out",
+        "xml_name": "AlteryxBasePluginsGui.DbFileOutput.DbFileOutput",
+        "description": "Writes data to files, databases, or other destinations",
+        "user_role": "Basic, Full",
+        "common_uses": ["Writing to databases", "Creating data files", "Data export"]
+    },
+    "Browse": {
+        "category": "In/Out",
+        "xml_name": "AlteryxBasePluginsGui.BrowseV2.BrowseV2",
+        "description": "Views data at any point in the workflow",
+        "user_role": "Basic, Full",
+        "common_uses": ["Data inspection", "Debugging", "Result verification"]
+    },
+
+    # Preparation Tools
+    "Auto Field": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.AutoField.AutoField",
+        "description": "Automatically detects and sets optimal field types and sizes",
+        "user_role": "Basic, Full",
+        "common_uses": ["Data type optimization", "Field size adjustment", "Schema cleanup"],
+        "input_output": {
+            "inputs": ["Any data type"],
+            "outputs": ["Optimized data types"]
+        }
+    },
+    "Create Samples": {
+        "category": "Preparation",
+        "xml_name": "Predictive Tools\\Create_Samples.yxmc",
+        "description": "Creates training and testing datasets for predictive analytics",
+        "user_role": "Full",
+        "common_uses": ["Model validation", "Cross-validation", "Holdout samples"],
+        "input_output": {
+            "inputs": ["Raw dataset"],
+            "outputs": ["Training data", "Testing data"]
+        }
+    },
+    "Data Cleanse Pro": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.DataCleansePro.DataCleansePro",
+        "description": "Advanced data cleaning with standardization and validation",
+        "user_role": "Basic, Full",
+        "common_uses": ["Data standardization", "Value correction", "Format consistency"],
+        "input_output": {
+            "inputs": ["Raw data"],
+            "outputs": ["Cleansed data"]
+        }
+    },
+    "Data Cleansing": {
+        "category": "Preparation",
+        "xml_name": "Cleanse.yxmc",
+        "description": "Basic data cleaning operations",
+        "user_role": "Full",
+        "common_uses": ["Remove special characters", "Standardize case", "Basic cleaning"],
+        "input_output": {
+            "inputs": ["Text data"],
+            "outputs": ["Cleaned text"]
+        }
+    },
+    "Filter": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.Filter.Filter",
+        "description": "Splits data stream based on conditions",
+        "user_role": "Basic, Full",
+        "common_uses": ["Data filtering", "Record selection", "Stream splitting"],
+        "input_output": {
+            "inputs": ["Single input"],
+            "outputs": ["True output", "False output"]
+        }
+    },
+    "Formula": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.Formula.Formula",
+        "description": "Creates or modifies fields using expressions",
+        "user_role": "Basic, Full",
+        "common_uses": ["Calculations", "Field creation", "Data transformation"],
+        "input_output": {
+            "inputs": ["Any data type"],
+            "outputs": ["Calculated fields"]
+        }
+    },
+    "Generate Rows": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.GenerateRows.GenerateRows",
+        "description": "Creates new records based on specified patterns",
+        "user_role": "Basic, Full",
+        "common_uses": ["Sequence generation", "Test data creation", "Date series"],
+        "input_output": {
+            "inputs": ["Optional input"],
+            "outputs": ["Generated rows"]
+        }
+    },
+    "Imputation": {
+        "category": "Preparation",
+        "xml_name": "Imputation_v3.yxmc",
+        "description": "Fills missing values using various methods",
+        "user_role": "Full",
+        "common_uses": ["Missing value handling", "Data completion", "Statistical imputation"],
+        "input_output": {
+            "inputs": ["Data with missing values"],
+            "outputs": ["Completed data"]
+        }
+    },
+    "Multi-Field Binning": {
+        "category": "Preparation",
+        "xml_name": "MultiFieldBinning_v2.yxmc",
+        "description": "Groups numeric values into bins across multiple fields",
+        "user_role": "Full",
+        "common_uses": ["Data categorization", "Range grouping", "Multiple field binning"],
+        "input_output": {
+            "inputs": ["Numeric fields"],
+            "outputs": ["Binned categories"]
+        }
+    },
+    "Multi-Field Formula": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.MultiFieldFormula.MultiFieldFormula",
+        "description": "Applies formula to multiple fields simultaneously",
+        "user_role": "Basic, Full",
+        "common_uses": ["Batch calculations", "Mass updates", "Field standardization"],
+        "input_output": {
+            "inputs": ["Multiple fields"],
+            "outputs": ["Transformed fields"]
+        }
+    },
+    "Multi-Row Formula": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.MultiRowFormula.MultiRowFormula",
+        "description": "Creates calculations using values from multiple rows",
+        "user_role": "Basic, Full",
+        "common_uses": ["Running totals", "Moving averages", "Row comparisons"],
+        "input_output": {
+            "inputs": ["Sorted data"],
+            "outputs": ["Calculated fields"]
+        }
+    },
+    "Oversample Field": {
+        "category": "Preparation",
+        "xml_name": "Predictive Tools\\Oversample_Field.yxmc",
+        "description": "Balances dataset by oversampling minority classes",
+        "user_role": "Full",
+        "common_uses": ["Class balancing", "Minority class handling", "Sample weighting"],
+        "input_output": {
+            "inputs": ["Imbalanced data"],
+            "outputs": ["Balanced data"]
+        }
+    },
+    "Random % Sample": {
+        "category": "Preparation",
+        "xml_name": "RandomRecords.yxmc",
+        "description": "Randomly samples a percentage of records",
+        "user_role": "Full",
+        "common_uses": ["Data sampling", "Record selection", "Dataset reduction"],
+        "input_output": {
+            "inputs": ["Full dataset"],
+            "outputs": ["Sampled data", "Remaining data"]
+        }
+    },
+    "Rank": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.Ranking.Ranking",
+        "description": "Assigns ranks to records based on field values",
+        "user_role": "Full",
+        "common_uses": ["Record ranking", "Position assignment", "Order statistics"],
+        "input_output": {
+            "inputs": ["Sorted data"],
+            "outputs": ["Ranked data"]
+        }
+    },
+    "Record ID": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.RecordID.RecordID",
+        "description": "Adds unique identifier to each record",
+        "user_role": "Basic, Full",
+        "common_uses": ["Row numbering", "Unique ID generation", "Record tracking"],
+        "input_output": {
+            "inputs": ["Any data"],
+            "outputs": ["Data with IDs"]
+        }
+    },
+    "Sample": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.Sample.Sample",
+        "description": "Selects records using various sampling methods",
+        "user_role": "Basic, Full",
+        "common_uses": ["First N records", "Every Nth record", "Random sampling"],
+        "input_output": {
+            "inputs": ["Input data"],
+            "outputs": ["Sampled records"]
+        }
+    },
+    "Select": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.AlteryxSelect.AlteryxSelect",
+        "description": "Selects, renames, and reorders fields",
+        "user_role": "Basic, Full",
+        "common_uses": ["Field selection", "Field renaming", "Type conversion"],
+        "input_output": {
+            "inputs": ["Any data"],
+            "outputs": ["Selected fields"]
+        }
+    },
+    "Select Records": {
+        "category": "Preparation",
+        "xml_name": "SelectRecords.yxmc",
+        "description": "Selects records based on position or condition",
+        "user_role": "Full",
+        "common_uses": ["Record filtering", "Data subsetting", "Position-based selection"],
+        "input_output": {
+            "inputs": ["Input data"],
+            "outputs": ["Selected records"]
+        }
+    },
+    "Sort": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.Sort.Sort",
+        "description": "Sorts records based on field values",
+        "user_role": "Basic, Full",
+        "common_uses": ["Data ordering", "Multi-field sort", "Custom sorting"],
+        "input_output": {
+            "inputs": ["Unsorted data"],
+            "outputs": ["Sorted data"]
+        }
+    },
+    "Tile": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.Tile.Tile",
+        "description": "Assigns tile numbers to grouped records",
+        "user_role": "Full",
+        "common_uses": ["Group numbering", "Data partitioning", "Equal-sized groups"],
+        "input_output": {
+            "inputs": ["Grouped data"],
+            "outputs": ["Tiled data"]
+        }
+    },
+    "Unique": {
+        "category": "Preparation",
+        "xml_name": "AlteryxBasePluginsGui.Unique.Unique",
+        "description": "Removes duplicate records",
+        "user_role": "Basic, Full",
+        "common_uses": ["Deduplication", "Distinct values", "Unique records"],
+        "input_output": {
+            "inputs": ["Data with duplicates"],
+            "outputs": ["Unique records", "Duplicate records"]
+        }
+    },
+
+    # Join Tools
+    "Join": {
+        "category": "Join",
+        "xml_name": "AlteryxBasePluginsGui.Join.Join",
+        "description": "Combines records from two data streams based on common fields",
+        "user_role": "Basic, Full",
+        "common_uses": ["Data merging", "Lookup operations", "Relationship building"]
+    },
+    "Union": {
+        "category": "Join",
+        "xml_name": "AlteryxBasePluginsGui.Union.Union",
+        "description": "Combines records from multiple data streams",
+        "user_role": "Basic, Full",
+        "common_uses": ["Data combination", "Multiple source integration", "Vertical stacking"]
+    },
+
+    # Parse Tools
+    "Text To Columns": {
+        "category": "Parse",
+        "xml_name": "AlteryxBasePluginsGui.TextToColumns.TextToColumns",
+        "description": "Splits text fields into multiple columns",
+        "user_role": "Basic, Full",
+        "common_uses": ["Text parsing", "Delimiter-based splitting", "Data extraction"]
+    },
+
+    # Transform Tools
+    "Summarize": {
+        "category": "Transform",
+        "xml_name": "AlteryxBasePluginsGui.Summarize.Summarize",
+        "description": "Groups and aggregates data",
+        "user_role": "Basic, Full",
+        "common_uses": ["Data aggregation", "Statistical analysis", "Group operations"]
+    },
+    "Sort": {
+        "category": "Transform",
+        "xml_name": "AlteryxBasePluginsGui.Sort.Sort",
+        "description": "Sorts records based on field values",
+        "user_role": "Basic, Full",
+        "common_uses": ["Data ordering", "Sequence creation", "Priority sorting"]
+    },
+
+    # Predictive Tools
+    "Logistic Regression": {
+        "category": "Predictive",
+        "xml_name": "AlteryxPredictive.Logistic_Regression",
+        "description": "Builds logistic regression models for classification",
+        "user_role": "Full",
+        "common_uses": ["Binary classification", "Probability prediction", "Category prediction"]
+    }
+}
+
+
+def _freeze(value):
+    """Recursively convert dicts/lists into read-only mappings/tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _macro_basename(path: str) -> str:
+    """Lower-cased file name of a macro path, e.g. 'Predictive Tools\\X.yxmc' -> 'x.yxmc'"""
+    return re.split(r"[\\/]", path)[-1].lower()
+
+# Shared, immutable tool catalog built once per process
+TOOL_CATALOG: Mapping[str, Mapping] = _freeze(_TOOL_DESCRIPTIONS)
+
+# Reverse indexes over the catalog
+TOOLS_BY_XML_NAME: Mapping[str, str] = MappingProxyType({
+    info["xml_name"]: name for name, info in TOOL_CATALOG.items()
+})
+TOOLS_BY_MACRO: Mapping[str, str] = MappingProxyType({
+    _macro_basename(info["xml_name"]): name
+    for name, info in TOOL_CATALOG.items()
+    if info["xml_name"].lower().endswith((".yxmc", ".yxmd"))
+})
+TOOLS_BY_CATEGORY: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    category: tuple(name for name, info in TOOL_CATALOG.items() if info["category"] == category)
+    for category in dict.fromkeys(info["category"] for info in TOOL_CATALOG.values())
+})
+
+@lru_cache(maxsize=4096)
+def resolve_tool(plugin: str) -> Tuple[str, Optional[Mapping]]:
+    """
+    Resolve a node's plugin string or macro path to (tool name, catalog entry)
+    Matches an exact xml_name or a path ending in one, as the generator always has;
+    unknown plugins fall back to the last dotted part of the plugin and no entry.
+    Both outcomes are cached, so each distinct plugin is resolved once
+    """
+    if not plugin:
+        return "Unknown", None
+    name = TOOLS_BY_XML_NAME.get(plugin)
+    path = plugin.replace("/", "\\")
+    if name is None and plugin.lower().endswith((".yxmc", ".yxmd")):
+        name = TOOLS_BY_MACRO.get(_macro_basename(plugin))
+        if name is not None and not path.endswith(TOOL_CATALOG[name]["xml_name"]):
+            name = None
+    if name is None:
+        # Rare: suffix matches the indexes can't express, e.g. 'MyCleanse.yxmc'
+        name = next((key for key, info in TOOL_CATALOG.items() if path.endswith(info["xml_name"])), None)
+    if name is None:
+        return plugin.split(".")[-1] or "Unknown", None
+    return name, TOOL_CATALOG[name]
+
+
+class WorkflowTooLarge(ValueError):
+    """Raised when an upload exceeds the configured size or node limits"""
+
+
+def _node_fields(node: ET.Element):
+    """(tool_id, plugin, description, configuration, position, custom_properties, macro) of a <Node>"""
+    tool_id = node.get("ToolID", "")
+    gui = node.find("GuiSettings")
+    engine = node.find("EngineSettings")
+    plugin = gui.get("Plugin", "") if gui is not None else ""
+    macro = engine.get("Macro", "") if engine is not None else ""
+    custom_macro = None
+    if not plugin and macro:
+        plugin = custom_macro = macro
+    
+    position = {}
+    pos = gui.find("Position") if gui is not None else None
+    if pos is not None:
+        position = {"x": pos.get("x", "0"), "y": pos.get("y", "0")}
+    
+    configuration = {}
+    config = node.find("Properties/Configuration")
+    if config is not None:
+        for child in config:
+            configuration[child.tag] = child.text or child.attrib
+    
+    custom_properties = {}
+    annotation = node.findtext("Properties/Annotation/DefaultAnnotationText")
+    if annotation:
+        custom_properties["annotation"] = annotation
+    
+    tool_name, info = resolve_tool(plugin)
+    if info is not None:
+        custom_properties["tool_name"] = tool_name
+        custom_properties["category"] = info["category"]
+        description = info["description"]
+    else:
+        description = annotation or "No description available"
+    return tool_id, plugin, description, configuration, position, custom_properties, custom_macro
+
+
+class IncrementalWorkflowParser:
+    """
+    Single-pass parser that builds a CompactWorkflow from chunks as they arrive.
+    
+    The root element is checked as soon as it opens, and the node and byte
+    limits are enforced while feeding, so invalid or oversized uploads fail
+    before the rest of the body is read. Finished top-level <Node> and
+    <Connection> subtrees are detached from the tree, keeping memory
+    proportional to the largest single tool. The byte offsets of every
+    tool's <Configuration> element are recorded so it can be decoded again
+    later from the original bytes.
+    """
+    
+    def __init__(self, max_nodes: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.max_nodes = max_nodes
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.node_count = 0
+        self.encoding = "utf-8"
+        self._parser = expat.ParserCreate()
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._data
+        self._parser.XmlDeclHandler = self._declaration
+        self._tree = ET.TreeBuilder()
+        self._builder = CompactWorkflowBuilder()
+        self._stack = []           # Open elements, innermost last
+        self._open_nodes = []      # Indexes in self._pending reserved for open <Node>s
+        self._pending = []         # Tools in document order, flushed once no <Node> is open
+        self._spans = {}           # Pending index -> (start, end) of the tool's <Configuration>
+        self._containers = {}      # Pending index -> pending index of the enclosing container <Node>
+        self._config_start = None  # (offset, pending index, depth) of an open tool <Configuration>
+        self._custom_tools = []
+        self._root = None
+        self._properties = None
+        self._text_input = False
+    
+    def feed(self, data) -> None:
+        """Feed a chunk of XML (str or bytes)"""
+        self.bytes_read += len(data)
+        if self.max_bytes is not None and self.bytes_read > self.max_bytes:
+            raise WorkflowTooLarge(f"Workflow exceeds the maximum upload size of {self.max_bytes} bytes")
+        if isinstance(data, str):
+            # Offsets then refer to the UTF-8 encoding of the text
+            self._text_input = True
+        self._parse(data, False)
+    
+    def close(self) -> CompactWorkflow:
+        """Finish parsing and return the workflow"""
+        self._parse(b"", True)
+        
+        # Workflow metadata
+        meta = self._properties.find("MetaInfo") if self._properties is not None else None
+        name = "Untitled Workflow"
+        creator = description = None
+        if meta is not None:
+            name = meta.findtext("Name") or name
+            creator = meta.findtext("Author") or None
+            description = meta.findtext("Description") or None
+        
+        # Workflow constants
+        constants = {}
+        if self._properties is not None:
+            for constant in self._properties.iterfind("Constants/Constant"):
+                constant_name = constant.findtext("Name")
+                if constant_name:
+                    constants[constant_name] = constant.findtext("Value") or ""
+        
+        return self._builder.build(
+            name=name,
+            creator=creator,
+            description=description,
+            yxmd_version=self._root.get("yxmdVer"),
+            custom_tools=self._custom_tools,
+            workflow_constants=constants,
+            source_encoding="utf-8" if self._text_input else self.encoding
+        )
+    
+    def _parse(self, data, final: bool) -> None:
+        try:
+            self._parser.Parse(data, final)
+        except expat.ExpatError as e:
+            # Same exception ElementTree raises for malformed XML
+            error = ET.ParseError(expat.ErrorString(e.code) + f": line {e.lineno}, column {e.offset}")
+            error.code, error.position = e.code, (e.lineno, e.offset)
+            raise error from None
+    
+    def _declaration(self, version, encoding, standalone) -> None:
+        if encoding:
+            self.encoding = encoding.lower()
+    
+    def _data(self, text: str) -> None:
+        self._tree.data(text)
+    
+    def _start(self, tag: str, attrib: dict) -> None:
+        elem = self._tree.start(tag, attrib)
+        if self._root is None:
+            if tag != "AlteryxDocument":
+                raise ValueError(f"Not an Alteryx workflow: root element is <{tag}>")
+            self._root = elem
+        self._stack.append(elem)
+        if tag == "Node":
+            self.node_count += 1
+            if self.max_nodes is not None and self.node_count > self.max_nodes:
+                raise WorkflowTooLarge(f"Workflow has more than {self.max_nodes} tools")
+            # Reserve the slot now so nested container nodes keep document order
+            if self._open_nodes:
+                self._containers[len(self._pending)] = self._open_nodes[-1]
+            self._open_nodes.append(len(self._pending))
+            self._pending.append(None)
+        elif (tag == "Configuration" and len(self._stack) >= 3 and self._stack[-2].tag == "Properties"
+              and self._stack[-3].tag == "Node" and self._open_nodes
+              and self._open_nodes[-1] not in self._spans):
+            self._config_start = (self._parser.CurrentByteIndex, self._open_nodes[-1], len(self._stack))
+    
+    def _end(self, tag: str) -> None:
+        elem = self._tree.end(tag)
+        self._stack.pop()
+        parent = self._stack[-1] if self._stack else None
+        if tag == "Node":
+            self._pending[self._open_nodes.pop()] = self._node_record(elem)
+            if not self._open_nodes:
+                self._flush_nodes()
+                self._pending.clear()
+                self._spans.clear()
+                self._containers.clear()
+                self._release(elem, parent)
+        elif tag == "Configuration" and self._config_start is not None \
+                and self._config_start[2] == len(self._stack) + 1:
+            start, slot, _ = self._config_start
+            # Points at "</Configuration", or just past a self-closing tag
+            self._spans[slot] = (start, self._parser.CurrentByteIndex)
+            self._config_start = None
+        elif tag == "Connection":
+            self._add_connection(elem)
+            if parent is not None and parent.tag == "Connections":
+                self._release(elem, parent)
+        elif tag == "Properties" and parent is self._root and self._properties is None:
+            self._properties = elem
+    
+    def _node_record(self, elem: ET.Element):
+        """What a finished <Node> leaves in its slot until the outermost <Node> closes"""
+        fields = _node_fields(elem)
+        if fields[-1]:
+            self._custom_tools.append({"tool_id": fields[0], "macro": fields[-1]})
+        return fields[:-1]
+    
+    def _flush_nodes(self) -> None:
+        """Add the pending tools, in document order, once no <Node> is open"""
+        base = len(self._builder)
+        for i, tool in enumerate(self._pending):
+            container = self._containers.get(i)
+            self._builder.add_tool(*tool, config_span=self._spans.get(i),
+                                   container=NO_CONTAINER if container is None else base + container)
+    
+    def _add_connection(self, elem: ET.Element) -> None:
+        origin = elem.find("Origin")
+        destination = elem.find("Destination")
+        if origin is not None and destination is not None:
+            self._builder.add_connection(
+                origin.get("ToolID", ""),
+                origin.get("Connection", ""),
+                destination.get("ToolID", ""),
+                destination.get("Connection", "")
+            )
+    
+    @staticmethod
+    def _release(elem: ET.Element, parent: Optional[ET.Element]) -> None:
+        """Drop a finished subtree so it can be garbage collected"""
+        elem.clear()
+        if parent is not None:
+            parent.remove(elem)
+
 
 class AlteryxDocGenerator:
-    def __init__(self):
+    def __init__(self, fragment_cache: Optional[FragmentCache] = None):
         self.workflow_xml = None
         self.documentation = ""
         
-        # Pin: Comprehensive tool descriptions based on Alteryx Designer documentation
-        self.tool_descriptions = {
-            # In/Out Tools
-            "Input Data": {
-                "category": "In/Out",
-                "xml_name": "AlteryxBasePluginsGui.DbFileInput.DbFileInput",
-                "description": "Reads data from various sources like files, databases, or cloud storage",
-                "user_role": "Basic, Full",
-                "common_uses": ["Reading data files", "Database connections", "Cloud storage access"]
-            },
-            "Output Data": {
-                "category": "In/Out",
-                "xml_name": "AlteryxBasePluginsGui.DbFileOutput.DbFileOutput",
-                "description": "Writes data to files, databases, or other destinations",
-                "user_role": "Basic, Full",
-                "common_uses": ["Writing to databases", "Creating data files", "Data export"]
-            },
-            "Browse": {
-                "category": "In/Out",
-                "xml_name": "AlteryxBasePluginsGui.BrowseV2.BrowseV2",
-                "description": "Views data at any point in the workflow",
-                "user_role": "Basic, Full",
-                "common_uses": ["Data inspection", "Debugging", "Result verification"]
-            },
-            
-            # Preparation Tools
-                     {
-            "Auto Field": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.AutoField.AutoField",
-                "description": "Automatically detects and sets optimal field types and sizes",
-                "user_role": "Basic, Full",
-                "common_uses": ["Data type optimization", "Field size adjustment", "Schema cleanup"],
-                "input_output": {
-                    "inputs": ["Any data type"],
-                    "outputs": ["Optimized data types"]
-                }
-            },
-            "Create Samples": {
-                "category": "Preparation",
-                "xml_name": "Predictive Tools\\Create_Samples.yxmc",
-                "description": "Creates training and testing datasets for predictive analytics",
-                "user_role": "Full",
-                "common_uses": ["Model validation", "Cross-validation", "Holdout samples"],
-                "input_output": {
-                    "inputs": ["Raw dataset"],
-                    "outputs": ["Training data", "Testing data"]
-                }
-            },
-            "Data Cleanse Pro": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.DataCleansePro.DataCleansePro",
-                "description": "Advanced data cleaning with standardization and validation",
-                "user_role": "Basic, Full",
-                "common_uses": ["Data standardization", "Value correction", "Format consistency"],
-                "input_output": {
-                    "inputs": ["Raw data"],
-                    "outputs": ["Cleansed data"]
-                }
-            },
-            "Data Cleansing": {
-                "category": "Preparation",
-                "xml_name": "Cleanse.yxmc",
-                "description": "Basic data cleaning operations",
-                "user_role": "Full",
-                "common_uses": ["Remove special characters", "Standardize case", "Basic cleaning"],
-                "input_output": {
-                    "inputs": ["Text data"],
-                    "outputs": ["Cleaned text"]
-                }
-            },
-            "Filter": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.Filter.Filter",
-                "description": "Splits data stream based on conditions",
-                "user_role": "Basic, Full",
-                "common_uses": ["Data filtering", "Record selection", "Stream splitting"],
-                "input_output": {
-                    "inputs": ["Single input"],
-                    "outputs": ["True output", "False output"]
-                }
-            },
-            "Formula": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.Formula.Formula",
-                "description": "Creates or modifies fields using expressions",
-                "user_role": "Basic, Full",
-                "common_uses": ["Calculations", "Field creation", "Data transformation"],
-                "input_output": {
-                    "inputs": ["Any data type"],
-                    "outputs": ["Calculated fields"]
-                }
-            },
-            "Generate Rows": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.GenerateRows.GenerateRows",
-                "description": "Creates new records based on specified patterns",
-                "user_role": "Basic, Full",
-                "common_uses": ["Sequence generation", "Test data creation", "Date series"],
-                "input_output": {
-                    "inputs": ["Optional input"],
-                    "outputs": ["Generated rows"]
-                }
-            },
-            "Imputation": {
-                "category": "Preparation",
-                "xml_name": "Imputation_v3.yxmc",
-                "description": "Fills missing values using various methods",
-                "user_role": "Full",
-                "common_uses": ["Missing value handling", "Data completion", "Statistical imputation"],
-                "input_output": {
-                    "inputs": ["Data with missing values"],
-                    "outputs": ["Completed data"]
-                }
-            },
-            "Multi-Field Binning": {
-                "category": "Preparation",
-                "xml_name": "MultiFieldBinning_v2.yxmc",
-                "description": "Groups numeric values into bins across multiple fields",
-                "user_role": "Full",
-                "common_uses": ["Data categorization", "Range grouping", "Multiple field binning"],
-                "input_output": {
-                    "inputs": ["Numeric fields"],
-                    "outputs": ["Binned categories"]
-                }
-            },
-            "Multi-Field Formula": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.MultiFieldFormula.MultiFieldFormula",
-                "description": "Applies formula to multiple fields simultaneously",
-                "user_role": "Basic, Full",
-                "common_uses": ["Batch calculations", "Mass updates", "Field standardization"],
-                "input_output": {
-                    "inputs": ["Multiple fields"],
-                    "outputs": ["Transformed fields"]
-                }
-            },
-            "Multi-Row Formula": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.MultiRowFormula.MultiRowFormula",
-                "description": "Creates calculations using values from multiple rows",
-                "user_role": "Basic, Full",
-                "common_uses": ["Running totals", "Moving averages", "Row comparisons"],
-                "input_output": {
-                    "inputs": ["Sorted data"],
-                    "outputs": ["Calculated fields"]
-                }
-            },
-            "Oversample Field": {
-                "category": "Preparation",
-                "xml_name": "Predictive Tools\\Oversample_Field.yxmc",
-                "description": "Balances dataset by oversampling minority classes",
-                "user_role": "Full",
-                "common_uses": ["Class balancing", "Minority class handling", "Sample weighting"],
-                "input_output": {
-                    "inputs": ["Imbalanced data"],
-                    "outputs": ["Balanced data"]
-                }
-            },
-            "Random % Sample": {
-                "category": "Preparation",
-                "xml_name": "RandomRecords.yxmc",
-                "description": "Randomly samples a percentage of records",
-                "user_role": "Full",
-                "common_uses": ["Data sampling", "Record selection", "Dataset reduction"],
-                "input_output": {
-                    "inputs": ["Full dataset"],
-                    "outputs": ["Sampled data", "Remaining data"]
-                }
-            },
-            "Rank": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.Ranking.Ranking",
-                "description": "Assigns ranks to records based on field values",
-                "user_role": "Full",
-                "common_uses": ["Record ranking", "Position assignment", "Order statistics"],
-                "input_output": {
-                    "inputs": ["Sorted data"],
-                    "outputs": ["Ranked data"]
-                }
-            },
-            "Record ID": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.RecordID.RecordID",
-                "description": "Adds unique identifier to each record",
-                "user_role": "Basic, Full",
-                "common_uses": ["Row numbering", "Unique ID generation", "Record tracking"],
-                "input_output": {
-                    "inputs": ["Any data"],
-                    "outputs": ["Data with IDs"]
-                }
-            },
-            "Sample": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.Sample.Sample",
-                "description": "Selects records using various sampling methods",
-                "user_role": "Basic, Full",
-                "common_uses": ["First N records", "Every Nth record", "Random sampling"],
-                "input_output": {
-                    "inputs": ["Input data"],
-                    "outputs": ["Sampled records"]
-                }
-            },
-            "Select": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.AlteryxSelect.AlteryxSelect",
-                "description": "Selects, renames, and reorders fields",
-                "user_role": "Basic, Full",
-                "common_uses": ["Field selection", "Field renaming", "Type conversion"],
-                "input_output": {
-                    "inputs": ["Any data"],
-                    "outputs": ["Selected fields"]
-                }
-            },
-            "Select Records": {
-                "category": "Preparation",
-                "xml_name": "SelectRecords.yxmc",
-                "description": "Selects records based on position or condition",
-                "user_role": "Full",
-                "common_uses": ["Record filtering", "Data subsetting", "Position-based selection"],
-                "input_output": {
-                    "inputs": ["Input data"],
-                    "outputs": ["Selected records"]
-                }
-            },
-            "Sort": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.Sort.Sort",
-                "description": "Sorts records based on field values",
-                "user_role": "Basic, Full",
-                "common_uses": ["Data ordering", "Multi-field sort", "Custom sorting"],
-                "input_output": {
-                    "inputs": ["Unsorted data"],
-                    "outputs": ["Sorted data"]
-                }
-            },
-            "Tile": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.Tile.Tile",
-                "description": "Assigns tile numbers to grouped records",
-                "user_role": "Full",
-                "common_uses": ["Group numbering", "Data partitioning", "Equal-sized groups"],
-                "input_output": {
-                    "inputs": ["Grouped data"],
-                    "outputs": ["Tiled data"]
-                }
-            },
-            "Unique": {
-                "category": "Preparation",
-                "xml_name": "AlteryxBasePluginsGui.Unique.Unique",
-                "description": "Removes duplicate records",
-                "user_role": "Basic, Full",
-                "common_uses": ["Deduplication", "Distinct values", "Unique records"],
-                "input_output": {
-                    "inputs": ["Data with duplicates"],
-                    "outputs": ["Unique records", "Duplicate records"]
-                }
-            }
-        }
-            
-            # Join Tools
-            "Join": {
-                "category": "Join",
-                "xml_name": "AlteryxBasePluginsGui.Join.Join",
-                "description": "Combines records from two data streams based on common fields",
-                "user_role": "Basic, Full",
-                "common_uses": ["Data merging", "Lookup operations", "Relationship building"]
-            },
-            "Union": {
-                "category": "Join",
-                "xml_name": "AlteryxBasePluginsGui.Union.Union",
-                "description": "Combines records from multiple data streams",
-                "user_role": "Basic, Full",
-                "common_uses": ["Data combination", "Multiple source integration", "Vertical stacking"]
-            },
-            
-            # Parse Tools
-            "Text To Columns": {
-                "category": "Parse",
-                "xml_name": "AlteryxBasePluginsGui.TextToColumns.TextToColumns",
-                "description": "Splits text fields into multiple columns",
-                "user_role": "Basic, Full",
-                "common_uses": ["Text parsing", "Delimiter-based splitting", "Data extraction"]
-            },
-            
-            # Transform Tools
-            "Summarize": {
-                "category": "Transform",
-                "xml_name": "AlteryxBasePluginsGui.Summarize.Summarize",
-                "description": "Groups and aggregates data",
-                "user_role": "Basic, Full",
-                "common_uses": ["Data aggregation", "Statistical analysis", "Group operations"]
-            },
-            "Sort": {
-                "category": "Transform",
-                "xml_name": "AlteryxBasePluginsGui.Sort.Sort",
-                "description": "Sorts records based on field values",
-                "user_role": "Basic, Full",
-                "common_uses": ["Data ordering", "Sequence creation", "Priority sorting"]
-            },
-            
-            # Predictive Tools
-            "Logistic Regression": {
-                "category": "Predictive",
-                "xml_name": "AlteryxPredictive.Logistic_Regression",
-                "description": "Builds logistic regression models for classification",
-                "user_role": "Full",
-                "common_uses": ["Binary classification", "Probability prediction", "Category prediction"]
-            }
-        }
+        # Shared catalog, built once at import
+        self.tool_descriptions = TOOL_CATALOG
+        
+        # Rendered per-tool fragments, reused while a tool's fingerprint is unchanged
+        self.fragment_cache = fragment_cache or shared_fragment_cache
 
-    def generate_alteryx_xml(self, analysis: WorkflowAnalysis) -> str:
+    def parse_workflow(self, content) -> CompactWorkflow:
         """
-        Generate standard Alteryx workflow XML format
-        Returns formatted XML string matching Alteryx's structure
+        Parse raw .yxmd content into the compact internal workflow model
+        Raises ValueError if the document is not an Alteryx workflow
+        """
+        parser = IncrementalWorkflowParser()
+        parser.feed(content)
+        return parser.close()
+
+    def parse_workflow_xml(self, content) -> WorkflowAnalysis:
+        """
+        Parse raw .yxmd content into a WorkflowAnalysis
+        Raises ValueError if the document is not an Alteryx workflow
+        """
+        return self.parse_workflow(content).to_analysis()
+
+    def generate_markdown_doc(self, analysis: WorkflowAnalysis) -> str:
+        """Generate markdown documentation for a parsed workflow"""
+        return "\n".join(text for _, text in self.iter_markdown_sections(analysis))
+
+    def iter_markdown_sections(self, analysis: WorkflowAnalysis,
+                               sections: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Yield (section ID, markdown) pairs in document order; joining every
+        section with newlines gives generate_markdown_doc's output
+
+        Section IDs are "header", "constants", "categories" (heading of the
+        category group), "category:<name>", "tools" (heading of the details
+        group), "tool:<ToolID>" and "data_flow". When sections is given only
+        those are produced; a group ID selects the whole group, and selecting
+        a single member also emits its group heading.
+        """
+        wanted = None if sections is None else set(sections)
+        
+        def selected(section_id: str, group: Optional[str] = None) -> bool:
+            return wanted is None or section_id in wanted or (group is not None and group in wanted)
+        
+        # Header, description and summary
+        if selected("header"):
+            lines = [f"# {analysis.name}", ""]
+            if analysis.creator:
+                lines.append(f"**Creator:** {analysis.creator}  ")
+            if analysis.created_date:
+                lines.append(f"**Created:** {analysis.created_date}  ")
+            if analysis.yxmd_version:
+                lines.append(f"**Alteryx Version:** {analysis.yxmd_version}  ")
+            lines.append("")
+            if analysis.description:
+                lines += ["## Description", "", analysis.description, ""]
+            lines += [
+                "## Summary",
+                "",
+                f"- **Tools:** {len(analysis.tools)}",
+                f"- **Connections:** {len(analysis.data_flow)}",
+                f"- **Macros:** {len(analysis.custom_tools)}",
+                ""
+            ]
+            yield "header", "\n".join(lines)
+        
+        # Constants
+        if analysis.workflow_constants and selected("constants"):
+            lines = ["## Workflow Constants", "", "| Name | Value |", "| --- | --- |"]
+            for name, value in analysis.workflow_constants.items():
+                lines.append(f"| {name} | {value} |")
+            lines.append("")
+            yield "constants", "\n".join(lines)
+        
+        # Tools grouped by category
+        categories = {}
+        for tool in analysis.tools:
+            category = tool.custom_properties.get("category", "Other")
+            categories.setdefault(category, []).append(tool)
+        heading_done = False
+        if wanted is None or "categories" in wanted:
+            yield "categories", "## Tools by Category\n"
+            heading_done = True
+        for category, tools in categories.items():
+            if not selected(f"category:{category}", "categories"):
+                continue
+            if not heading_done:
+                yield "categories", "## Tools by Category\n"
+                heading_done = True
+            lines = [f"### {category}", ""]
+            for tool in tools:
+                tool_name = tool.custom_properties.get("tool_name") or resolve_tool(tool.plugin)[0]
+                lines.append(f"- **{tool_name}** (Tool {tool.tool_id})")
+            lines.append("")
+            yield f"category:{category}", "\n".join(lines)
+        
+        # Per-tool details
+        heading_done = False
+        if wanted is None or "tools" in wanted:
+            yield "tools", "## Tool Details\n"
+            heading_done = True
+        for tool in analysis.tools:
+            if not selected(f"tool:{tool.tool_id}", "tools"):
+                continue
+            if not heading_done:
+                yield "tools", "## Tool Details\n"
+                heading_done = True
+            yield f"tool:{tool.tool_id}", self._cached_fragment("markdown", tool, self._render_tool_markdown)
+        
+        # Data flow
+        if analysis.data_flow and selected("data_flow"):
+            lines = ["## Data Flow", "", "| From | Output | To | Input |", "| --- | --- | --- | --- |"]
+            for flow in analysis.data_flow:
+                lines.append(
+                    f"| {flow['origin_tool_id']} | {flow['origin_connection']} "
+                    f"| {flow['destination_tool_id']} | {flow['destination_connection']} |"
+                )
+            lines.append("")
+            yield "data_flow", "\n".join(lines)
+
+    def _cached_fragment(self, kind: str, tool: WorkflowTool, render) -> str:
+        """Return a tool's rendered fragment, rendering it only if its fingerprint is new"""
+        fingerprint = tool_fingerprint(tool)
+        fragment = self.fragment_cache.get(kind, tool.tool_id, fingerprint)
+        if fragment is None:
+            fragment = render(tool)
+            self.fragment_cache.put(kind, tool.tool_id, fingerprint, fragment)
+        return fragment
+
+    def _render_tool_markdown(self, tool: WorkflowTool) -> str:
+        """Markdown detail section for a single tool"""
+        tool_name = tool.custom_properties.get("tool_name") or resolve_tool(tool.plugin)[0]
+        lines = [f"### Tool {tool.tool_id}: {tool_name}", ""]
+        lines.append(f"- **Plugin:** `{tool.plugin or 'Unknown'}`")
+        lines.append(f"- **Description:** {tool.description}")
+        if tool.position:
+            lines.append(f"- **Position:** ({tool.position.get('x')}, {tool.position.get('y')})")
+        if tool.connections:
+            lines.append(f"- **Connects to:** {', '.join(tool.connections)}")
+        if tool.configuration:
+            lines.append("- **Configuration:**")
+            for key, value in tool.configuration.items():
+                lines.append(f"  - `{key}`: {value}")
+        lines.append("")
+        return "\n".join(lines)
+
+    def _tool_element(self, tool: WorkflowTool) -> ET.Element:
+        """Build the <Node> element for a tool"""
+        node = ET.Element("Node")
+        node.set("ToolID", tool.tool_id)
+        if tool.plugin:
+            node.set("Plugin", tool.plugin)
+        
+        # GUI Settings
+        gui = ET.SubElement(node, "GuiSettings")
+        if tool.position:
+            gui.set("Plugin", tool.plugin or "")
+            pos = ET.SubElement(gui, "Position")
+            pos.set("x", tool.position.get("x", "0"))
+            pos.set("y", tool.position.get("y", "0"))
+        
+        # Properties
+        props = ET.SubElement(node, "Properties")
+        
+        # Configuration
+        if tool.configuration:
+            config = ET.SubElement(props, "Configuration")
+            for key, value in tool.configuration.items():
+                prop = ET.SubElement(config, "Property")
+                prop.set("name", key)
+                if value is not None:
+                    prop.text = str(value)
+        
+        # Connections
+        if tool.connections:
+            for conn in tool.connections:
+                connection = ET.SubElement(node, "Connection")
+                connection.set("name", conn)
+        
+        return node
+
+    @staticmethod
+    def _serialize_child(elem: ET.Element) -> str:
+        """Serialize a direct child of the document root, indented as ET.indent would"""
+        ET.indent(elem, space="  ", level=1)
+        return ET.tostring(elem, encoding="unicode")
+
+    def _render_tool_xml(self, tool: WorkflowTool) -> str:
+        return self._serialize_child(self._tool_element(tool))
+
+    def iter_alteryx_xml(self, analysis: WorkflowAnalysis) -> Iterator[str]:
+        """
+        Yield the Alteryx workflow XML piece by piece, one tool at a time
+        Each top-level element is serialized on its own so unchanged tools
+        can be reused from the fragment cache, and only one is held at once
         """
         # Create root element
         root = ET.Element("AlteryxDocument")
         root.set("yxmdVer", analysis.yxmd_version or "2023.1")
+        root_tag = ET.tostring(root, encoding="unicode")[:-len(" />")]
         
         # Add Properties
-        props = ET.SubElement(root, "Properties")
+        props = ET.Element("Properties")
         ET.SubElement(props, "MetaInfo")
         ET.SubElement(props, "Name").text = analysis.name
         if analysis.creator:
             ET.SubElement(props, "Creator").text = analysis.creator
         if analysis.description:
             ET.SubElement(props, "Description").text = analysis.description
+        # Same layout ET.indent + ET.tostring produce for the whole tree
+        yield "<?xml version='1.0' encoding='utf-8'?>\n" + root_tag + ">\n  " + self._serialize_child(props)
         
         # Add Nodes (Tools)
         for tool in analysis.tools:
-            node = ET.SubElement(root, "Node")
-            node.set("ToolID", tool.tool_id)
-            if tool.plugin:
-                node.set("Plugin", tool.plugin)
-            
-            # GUI Settings
-            gui = ET.SubElement(node, "GuiSettings")
-            if tool.position:
-                gui.set("Plugin", tool.plugin or "")
-                pos = ET.SubElement(gui, "Position")
-                pos.set("x", tool.position.get("x", "0"))
-                pos.set("y", tool.position.get("y", "0"))
-            
-            # Properties
-            props = ET.SubElement(node, "Properties")
-            
-            # Configuration
-            if tool.configuration:
-                config = ET.SubElement(props, "Configuration")
-                for key, value in tool.configuration.items():
-                    prop = ET.SubElement(config, "Property")
-                    prop.set("name", key)
-                    if value is not None:
-                        prop.text = str(value)
-            
-            # Connections
-            if tool.connections:
-                for conn in tool.connections:
-                    connection = ET.SubElement(node, "Connection")
-                    connection.set("name", conn)
+            yield "\n  " + self._cached_fragment("xml", tool, self._render_tool_xml)
         
         # Add Constants if any
         if analysis.workflow_constants:
-            constants = ET.SubElement(root, "Constants")
+            constants = ET.Element("Constants")
             for name, value in analysis.workflow_constants.items():
                 constant = ET.SubElement(constants, "Constant")
                 constant.set("name", name)
                 constant.set("value", str(value))
-        
-        # Format the XML with proper indentation
-        ET.indent(root, space="  ")
-        return ET.tostring(root, encoding="unicode", xml_declaration=True)
+            yield "\n  " + self._serialize_child(constants)
+        yield "\n</AlteryxDocument>"
+
+    def write_alteryx_xml(self, analysis: WorkflowAnalysis, stream: IO[str]) -> None:
+        """Write the Alteryx workflow XML to a text stream as it is generated"""
+        for piece in self.iter_alteryx_xml(analysis):
+            stream.write(piece)
+
+    def generate_alteryx_xml(self, analysis: WorkflowAnalysis) -> str:
+        """
+        Generate standard Alteryx workflow XML format
+        Returns formatted XML string matching Alteryx's structure
+        """
+        return "".join(self.iter_alteryx_xml(analysis))
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from fingerprints import workflow_fingerprints
+from compact import CompactWorkflow
+from result_cache import CachedResult
+from search_index import SearchIndex
+from toolsmetadata import AlteryxDocGenerator
+from workflow_graph import WorkflowGraph
+
+
+# Stage functions executed inside worker processes. They live at module level
+# so they can be pickled by ProcessPoolExecutor.
+
+def _stage_clock(timings: Dict[str, float]):
+    """Return lap(stage), which records the seconds since the previous lap"""
+    clock = time.perf_counter()
+
+    def lap(stage: str) -> None:
+        nonlocal clock
+        now = time.perf_counter()
+        timings[stage] = now - clock
+        clock = now
+    return lap
+
+
+def render_workflow(workflow_analysis: CompactWorkflow,
+                    source: Optional[bytes] = None) -> Tuple[CachedResult, Dict[str, float]]:
+    """
+    Render markdown and Alteryx XML for an already parsed workflow
+    source is the uploaded bytes, indexed for search alongside the tools
+    Returns the result and the seconds spent in each stage
+    """
+    timings = {}
+    lap = _stage_clock(timings)
+    doc_generator = AlteryxDocGenerator()
+    markdown_doc = doc_generator.generate_markdown_doc(workflow_analysis)
+    lap("markdown")
+    alteryx_xml = doc_generator.generate_alteryx_xml(workflow_analysis)
+    lap("alteryx_xml")
+    fingerprints = workflow_fingerprints(workflow_analysis)
+    lap("fingerprints")
+    graph = WorkflowGraph.from_analysis(workflow_analysis)
+    lap("graph")
+    search_index = SearchIndex.from_source(source, workflow_analysis)
+    lap("search_index")
+    return CachedResult(workflow_analysis, markdown_doc, alteryx_xml, fingerprints, graph, search_index), timings
+
+
+def analyze_workflow(content: bytes) -> Tuple[CachedResult, Dict[str, float]]:
+    """
+    Parse a workflow and render its markdown and Alteryx XML
+    Returns the result and the seconds spent in each stage
+    """
+    start = time.perf_counter()
+    workflow_analysis = AlteryxDocGenerator().parse_workflow(content)
+    parse_seconds = time.perf_counter() - start
+    result, timings = render_workflow(workflow_analysis, content)
+    return result, {"parse": parse_seconds, **timings}
+
+
+def parse_macro(content: bytes) -> CompactWorkflow:
+    """Parse a macro (.yxmc) without rendering documentation for it"""
+    return AlteryxDocGenerator().parse_workflow(content)
+
+
+class PoolOverloaded(Exception):
+    """Raised when a job cannot be admitted because the wait queue is full"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    """
+    Process pool for CPU-bound stages with admission control.
+
+    At most max_in_flight jobs run at once, counting work admitted with
+    admit(). Up to max_queue further jobs may wait for a slot for at most
+    queue_timeout seconds; anything beyond that is rejected immediately
+    with PoolOverloaded so callers can shed load instead of letting latency
+    grow without bound.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_in_flight: Optional[int] = None,
+                 max_queue: int = 32, queue_timeout: float = 30.0):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "WorkerPool":
+        """Build a pool sized from ALTERYX_DOC_POOL_* environment variables"""
+        max_workers = int(os.environ.get("ALTERYX_DOC_POOL_WORKERS", 0)) or None
+        max_in_flight = int(os.environ.get("ALTERYX_DOC_POOL_MAX_IN_FLIGHT", 0)) or None
+        return cls(
+            max_workers=max_workers,
+            max_in_flight=max_in_flight,
+            max_queue=int(os.environ.get("ALTERYX_DOC_POOL_MAX_QUEUE", 32)),
+            queue_timeout=float(os.environ.get("ALTERYX_DOC_POOL_QUEUE_TIMEOUT", 30))
+        )
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # Created lazily so importing the backend does not fork workers
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Hold one of the pool's slots, with the same queueing and rejection
+        as run(); for CPU-bound work the API process does itself
+        """
+        # Checked and reserved before the first await, so it is atomic on the loop
+        if self.in_flight + self.waiting >= self.max_in_flight + self.max_queue:
+            self.rejected += 1
+            raise PoolOverloaded("Server is busy, too many workflows queued")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise PoolOverloaded("Timed out waiting for a free worker")
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in the process pool once a slot is available"""
+        async with self.admit():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+
+    def stats(self) -> dict:
+        """Current pool occupancy"""
+        return {
+            "workers": self.max_workers,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,280 @@
+import html
+import math
+from typing import Dict, List, Optional, Tuple
+
+from compact import CompactWorkflow, NO_CONTAINER
+from workflow_graph import WorkflowGraph
+
+DETAIL_LEVELS = ("auto", "tools", "chains", "containers", "categories")
+# Finest to coarsest; "auto" moves down this list until the scene fits the node budget,
+# which is NODE_BUDGET boxes at zoom 1 and grows with the area of the zoomed canvas
+MERGE_ORDER = ("tools", "chains", "containers", "categories")
+NODE_BUDGET = 1500
+
+# Zoom levels are snapped to powers of two in this range, which bounds the cached variants
+MIN_ZOOM = 1 / 16
+MAX_ZOOM = 4.0
+
+# Workflows this small are always drawn tool by tool
+SMALL_WORKFLOW_TOOLS = 300
+
+TOOL_WIDTH = 60
+TOOL_HEIGHT = 40
+# Spacing of the generated layout for tools without a saved position
+LAYER_SPACING = 120
+ROW_SPACING = 70
+MARGIN = 20
+
+CONTAINER_PLUGIN = "ToolContainer"
+
+CATEGORY_COLORS = {
+    "In/Out": ("#ecfdf5", "#10b981"),
+    "Preparation": ("#eff6ff", "#3b82f6"),
+    "Join": ("#f5f3ff", "#8b5cf6"),
+    "Parse": ("#fff7ed", "#f97316"),
+    "Transform": ("#fdf2f8", "#ec4899"),
+}
+DEFAULT_COLORS = ("#f9fafb", "#6b7280")
+CLUSTER_COLORS = ("#fefce8", "#ca8a04")
+
+
+def snap_zoom(zoom: float) -> float:
+    """Nearest power of two within [MIN_ZOOM, MAX_ZOOM]"""
+    if not zoom > 0 or math.isinf(zoom):
+        return 1.0
+    return min(max(2.0 ** round(math.log2(zoom)), MIN_ZOOM), MAX_ZOOM)
+
+
+def detail_for_zoom(tool_count: int, zoom: float) -> str:
+    """Level of detail "auto" resolves to: more tools are merged the further out the view is zoomed"""
+    if tool_count <= SMALL_WORKFLOW_TOOLS or zoom >= 1:
+        return "tools"
+    if zoom >= 0.5:
+        return "chains"
+    if zoom >= 0.25:
+        return "containers"
+    return "categories"
+
+
+def _is_container(workflow: CompactWorkflow, index: int) -> bool:
+    return workflow.tools[index].plugin.endswith(CONTAINER_PLUGIN)
+
+
+def _positions(workflow: CompactWorkflow, graph: WorkflowGraph) -> List[Tuple[float, float]]:
+    """Saved canvas positions, with tools that have none laid out by topological depth"""
+    count = len(workflow.tool_ids)
+    positions: List[Optional[Tuple[float, float]]] = [None] * count
+    for i, tool in enumerate(workflow.tools):
+        position = tool.position
+        try:
+            positions[i] = (float(position["x"]), float(position["y"]))
+        except (KeyError, ValueError):
+            pass
+    if all(position is not None for position in positions):
+        return positions
+
+    # Longest-path layering over the graph; tools on cycles keep depth 0
+    depth = [0] * len(graph)
+    for node in graph.topological_order:
+        for successor in graph.successors(node):
+            depth[successor] = max(depth[successor], depth[node] + 1)
+    right = max((x for x, _ in filter(None, positions)), default=-LAYER_SPACING)
+    rows: Dict[int, int] = {}
+    for i in range(count):
+        if positions[i] is None:
+            layer = depth[graph.index[workflow.tool_ids[i]]]
+            row = rows.get(layer, 0)
+            rows[layer] = row + 1
+            positions[i] = (right + LAYER_SPACING * (layer + 1), ROW_SPACING * row)
+    return positions
+
+
+def _top_container(workflow: CompactWorkflow, index: int) -> int:
+    container = workflow.container_index(index)
+    while container != NO_CONTAINER and workflow.container_index(container) != NO_CONTAINER:
+        container = workflow.container_index(container)
+    return container
+
+
+def _chains(workflow: CompactWorkflow, graph: WorkflowGraph) -> Dict[int, int]:
+    """Tool index -> first tool index of the linear chain (single in, single out) it belongs to"""
+    tool_of = {tool_id: i for i, tool_id in reversed(list(enumerate(workflow.tool_ids)))}
+    head: Dict[int, int] = {}
+    for node in range(len(graph)):
+        successors = graph.successors(node)
+        if len(successors) != 1:
+            continue
+        successor = successors[0]
+        if successor == node or len(graph.predecessors(successor)) != 1:
+            continue
+        head[successor] = node
+    # Follow each link back to the start of its chain, remembering every start found
+    start_of: Dict[int, int] = {}
+    for node in head:
+        path = []
+        current = node
+        while current in head and current not in start_of and len(path) <= len(head):
+            path.append(current)
+            current = head[current]
+        start = start_of.get(current, current)
+        for member in path:
+            start_of[member] = start
+    groups: Dict[int, int] = {}
+    for member, start in start_of.items():
+        first = tool_of.get(graph.tool_ids[start])
+        for node in (member, start):
+            tool = tool_of.get(graph.tool_ids[node])
+            if tool is not None and first is not None:
+                groups[tool] = first
+    return groups
+
+
+def _grouping(workflow: CompactWorkflow, graph: WorkflowGraph, detail: str) -> Dict[int, Tuple[str, str]]:
+    """Tool index -> (cluster ID, cluster label) for every tool merged at this level of detail"""
+    clusters: Dict[int, Tuple[str, str]] = {}
+    if detail == "chains":
+        for tool, start in _chains(workflow, graph).items():
+            clusters[tool] = (f"chain:{workflow.tool_ids[start]}", f"Chain from {workflow.tool_ids[start]}")
+    elif detail == "containers":
+        for i in range(len(workflow.tool_ids)):
+            container = i if _is_container(workflow, i) and workflow.container_index(i) == NO_CONTAINER \
+                else _top_container(workflow, i)
+            if container != NO_CONTAINER:
+                properties = workflow.tools[container].custom_properties
+                caption = properties.get("annotation") or f"Container {workflow.tool_ids[container]}"
+                clusters[i] = (f"container:{workflow.tool_ids[container]}", caption)
+    elif detail == "categories":
+        for i, tool in enumerate(workflow.tools):
+            category = tool.custom_properties.get("category", "Other")
+            clusters[i] = (f"category:{category}", category)
+    # A cluster of one tool is just that tool
+    sizes: Dict[str, int] = {}
+    for cluster_id, _ in clusters.values():
+        sizes[cluster_id] = sizes.get(cluster_id, 0) + 1
+    return {tool: cluster for tool, cluster in clusters.items() if sizes[cluster[0]] > 1}
+
+
+def build_scene(workflow: CompactWorkflow, graph: WorkflowGraph, detail: str = "auto", zoom: float = 1.0) -> dict:
+    """
+    Diagram of a workflow as a compact scene: positioned tool and cluster
+    boxes plus edges between them, in canvas coordinates scaled by zoom
+
+    Merged tools are replaced by one cluster box covering their positions;
+    connections inside a cluster are dropped and parallel ones are merged
+    into a single edge with a count.
+    """
+    zoom = snap_zoom(zoom)
+    if detail == "auto":
+        levels = MERGE_ORDER[MERGE_ORDER.index(detail_for_zoom(len(workflow.tool_ids), zoom)):]
+        budget = NODE_BUDGET * zoom * zoom
+        for detail in levels:
+            clusters = _grouping(workflow, graph, detail)
+            if len(workflow.tool_ids) - len(clusters) + len(set(clusters.values())) <= budget:
+                break
+    else:
+        clusters = _grouping(workflow, graph, detail)
+    positions = _positions(workflow, graph)
+
+    nodes = []
+    node_of: Dict[str, str] = {}
+    members: Dict[str, dict] = {}
+    for i, tool in enumerate(workflow.tools):
+        x, y = positions[i]
+        cluster = clusters.get(i)
+        if cluster is None:
+            node_of.setdefault(tool.tool_id, tool.tool_id)
+            nodes.append({
+                "id": tool.tool_id,
+                "kind": "tool",
+                "label": tool.custom_properties.get("tool_name") or tool.plugin.split(".")[-1] or "Unknown",
+                "category": tool.custom_properties.get("category"),
+                "x": x, "y": y, "width": TOOL_WIDTH, "height": TOOL_HEIGHT
+            })
+            continue
+        cluster_id, label = cluster
+        node_of.setdefault(tool.tool_id, cluster_id)
+        node = members.get(cluster_id)
+        if node is None:
+            node = members[cluster_id] = {
+                "id": cluster_id, "kind": "cluster", "label": label, "category": None,
+                "x": x, "y": y, "right": x + TOOL_WIDTH, "bottom": y + TOOL_HEIGHT, "tools": 0
+            }
+            nodes.append(node)
+        node["x"], node["y"] = min(node["x"], x), min(node["y"], y)
+        node["right"], node["bottom"] = max(node["right"], x + TOOL_WIDTH), max(node["bottom"], y + TOOL_HEIGHT)
+        node["tools"] += 1
+    for node in members.values():
+        node["width"] = node.pop("right") - node["x"]
+        node["height"] = node.pop("bottom") - node["y"]
+
+    edges: Dict[Tuple[str, str], int] = {}
+    for origin, destination in zip(workflow.flow_origins, workflow.flow_destinations):
+        source, target = node_of.get(origin), node_of.get(destination)
+        # Connections to unparsed tools, or inside one cluster, are not drawn
+        if source is None or target is None or (source == target and source in members):
+            continue
+        edges[(source, target)] = edges.get((source, target), 0) + 1
+
+    # Shift to a positive origin and apply the zoom
+    left = min((node["x"] for node in nodes), default=0)
+    top = min((node["y"] for node in nodes), default=0)
+    for node in nodes:
+        node["x"] = round((node["x"] - left) * zoom + MARGIN, 1)
+        node["y"] = round((node["y"] - top) * zoom + MARGIN, 1)
+        node["width"] = round(node["width"] * zoom, 1)
+        node["height"] = round(node["height"] * zoom, 1)
+    width = max((node["x"] + node["width"] for node in nodes), default=0) + MARGIN
+    height = max((node["y"] + node["height"] for node in nodes), default=0) + MARGIN
+    return {
+        "detail": detail,
+        "zoom": zoom,
+        "width": round(width, 1),
+        "height": round(height, 1),
+        "tools": len(workflow.tool_ids),
+        "nodes": nodes,
+        "edges": [{"source": source, "target": target, "count": count}
+                  for (source, target), count in edges.items()]
+    }
+
+
+def render_svg(scene: dict) -> str:
+    """SVG drawing of a scene; tool boxes carry data-tool-id for click handling"""
+    zoom = scene["zoom"]
+    show_labels = zoom >= 0.5
+    font_size = round(11 * min(zoom, 1.5), 1)
+    boxes = {node["id"]: node for node in scene["nodes"]}
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{scene["width"]}" height="{scene["height"]}" '
+        f'viewBox="0 0 {scene["width"]} {scene["height"]}" font-family="sans-serif" font-size="{font_size}">',
+        '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="6" markerHeight="6" '
+        'orient="auto-start-reverse"><path d="M0 0L10 5L0 10z" fill="#94a3b8"/></marker></defs>',
+        '<g class="edges" stroke="#94a3b8" fill="none">'
+    ]
+    for edge in scene["edges"]:
+        source, target = boxes[edge["source"]], boxes[edge["target"]]
+        x1, y1 = source["x"] + source["width"], source["y"] + source["height"] / 2
+        x2, y2 = target["x"], target["y"] + target["height"] / 2
+        bend = max(abs(x2 - x1) / 2, 20 * zoom)
+        stroke = round(min(1 + math.log2(edge["count"]), 6), 1)
+        parts.append(f'<path d="M{x1:g} {y1:g}C{x1 + bend:g} {y1:g} {x2 - bend:g} {y2:g} {x2:g} {y2:g}" '
+                     f'stroke-width="{stroke}" marker-end="url(#arrow)"/>')
+    parts.append('</g><g class="nodes">')
+    for node in scene["nodes"]:
+        if node["kind"] == "cluster":
+            fill, stroke = CLUSTER_COLORS
+            attribute = f'data-cluster-id="{html.escape(node["id"])}"'
+            text = f'{node["label"]} ({node["tools"]} tools)'
+        else:
+            fill, stroke = CATEGORY_COLORS.get(node["category"], DEFAULT_COLORS)
+            attribute = f'data-tool-id="{html.escape(node["id"])}"'
+            text = f'{node["label"]} #{node["id"]}'
+        parts.append(f'<g class="diagram-{node["kind"]}" {attribute}>'
+                     f'<title>{html.escape(text)}</title>'
+                     f'<rect x="{node["x"]:g}" y="{node["y"]:g}" width="{node["width"]:g}" height="{node["height"]:g}" '
+                     f'rx="{6 * zoom:g}" fill="{fill}" stroke="{stroke}"/>')
+        if show_labels or node["kind"] == "cluster":
+            parts.append(f'<text x="{node["x"] + node["width"] / 2:g}" y="{node["y"] + node["height"] / 2:g}" '
+                         f'text-anchor="middle" dominant-baseline="middle">{html.escape(text)}</text>')
+        parts.append('</g>')
+    parts.append('</g></svg>')
+    return "".join(parts)
@@ -0,0 +1,199 @@
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import WorkflowAnalysis
+
+
+def _csr(count: int, edges: List[Tuple[int, int]]) -> Tuple[array, array]:
+    """Compressed adjacency (offsets, targets) for edges grouped by source"""
+    offsets = array("i", [0]) * (count + 1)
+    for source, _ in edges:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    targets = array("i", [0]) * len(edges)
+    fill = array("i", offsets[:-1])
+    for source, target in edges:
+        targets[fill[source]] = target
+        fill[source] += 1
+    return offsets, targets
+
+
+class WorkflowGraph:
+    """
+    Integer-indexed connection graph of a workflow.
+
+    Tools are numbered 0..V-1 and both edge directions are stored as
+    compressed adjacency arrays, so upstream/downstream walks are O(V+E)
+    without rescanning the connection list. Topological order, weakly
+    connected components and cycles (strongly connected components with
+    more than one tool, or self loops) are computed once at build time.
+    """
+
+    def __init__(self, tool_ids: List[str], edges: List[Tuple[int, int]]):
+        self.tool_ids = tool_ids
+        self.index: Dict[str, int] = {tool_id: i for i, tool_id in enumerate(tool_ids)}
+        self.edge_count = len(edges)
+        self.out_offsets, self.out_targets = _csr(len(tool_ids), edges)
+        self.in_offsets, self.in_sources = _csr(len(tool_ids), [(t, s) for s, t in edges])
+        self.topological_order, self.has_cycles = self._topological_sort()
+        self.components = self._components()
+        self.cycles = self._cycles() if self.has_cycles else []
+
+    @classmethod
+    def from_connections(cls, tool_ids: Iterable[str], connections: Iterable[Tuple[str, str]]) -> "WorkflowGraph":
+        """Build from ToolIDs and (origin, destination) ToolID pairs"""
+        ids = list(dict.fromkeys(tool_ids))
+        index = {tool_id: i for i, tool_id in enumerate(ids)}
+        edges = []
+        for origin, destination in connections:
+            # Connections may reference tools that were not parsed (e.g. inside macros)
+            for tool_id in (origin, destination):
+                if tool_id not in index:
+                    index[tool_id] = len(ids)
+                    ids.append(tool_id)
+            edges.append((index[origin], index[destination]))
+        return cls(ids, edges)
+
+    @classmethod
+    def from_analysis(cls, analysis: WorkflowAnalysis) -> "WorkflowGraph":
+        return cls.from_connections(
+            (tool.tool_id for tool in analysis.tools),
+            ((flow["origin_tool_id"], flow["destination_tool_id"]) for flow in analysis.data_flow)
+        )
+
+    def __len__(self) -> int:
+        return len(self.tool_ids)
+
+    def successors(self, i: int) -> array:
+        return self.out_targets[self.out_offsets[i]:self.out_offsets[i + 1]]
+
+    def predecessors(self, i: int) -> array:
+        return self.in_sources[self.in_offsets[i]:self.in_offsets[i + 1]]
+
+    def _topological_sort(self) -> Tuple[List[int], bool]:
+        count = len(self.tool_ids)
+        in_degree = array("i", (self.in_offsets[i + 1] - self.in_offsets[i] for i in range(count)))
+        queue = deque(i for i in range(count) if in_degree[i] == 0)
+        order = []
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for j in self.successors(i):
+                in_degree[j] -= 1
+                if in_degree[j] == 0:
+                    queue.append(j)
+        return order, len(order) < count
+
+    def _components(self) -> array:
+        parent = array("i", range(len(self.tool_ids)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for source in range(len(self.tool_ids)):
+            for target in self.successors(source):
+                a, b = find(source), find(target)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+        # Renumber roots densely in order of first appearance
+        labels = {}
+        return array("i", (labels.setdefault(find(i), len(labels)) for i in range(len(self.tool_ids))))
+
+    def _cycles(self) -> List[List[int]]:
+        """Strongly connected components that contain a cycle (iterative Tarjan)"""
+        count = len(self.tool_ids)
+        index_of = array("i", [-1]) * count
+        low = array("i", [0]) * count
+        on_stack = bytearray(count)
+        stack, cycles = [], []
+        counter = 0
+        for root in range(count):
+            if index_of[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, edge = work.pop()
+                if edge == 0:
+                    index_of[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = 1
+                successors = self.successors(node)
+                if edge < len(successors):
+                    work.append((node, edge + 1))
+                    target = successors[edge]
+                    if index_of[target] == -1:
+                        work.append((target, 0))
+                    elif on_stack[target]:
+                        low[node] = min(low[node], index_of[target])
+                    continue
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in self.successors(node):
+                        cycles.append(component)
+        return cycles
+
+    def _walk(self, tool_id: str, offsets: array, targets: array, max_depth: Optional[int]) -> List[str]:
+        start = self.index[tool_id]
+        seen = bytearray(len(self.tool_ids))
+        seen[start] = 1
+        frontier, depth, found = [start], 0, []
+        while frontier and (max_depth is None or depth < max_depth):
+            next_frontier = []
+            for i in frontier:
+                for j in targets[offsets[i]:offsets[i + 1]]:
+                    if not seen[j]:
+                        seen[j] = 1
+                        found.append(j)
+                        next_frontier.append(j)
+            frontier = next_frontier
+            depth += 1
+        return [self.tool_ids[i] for i in found]
+
+    def upstream(self, tool_id: str, max_depth: Optional[int] = None) -> List[str]:
+        """Every tool that feeds tool_id, nearest first"""
+        return self._walk(tool_id, self.in_offsets, self.in_sources, max_depth)
+
+    def downstream(self, tool_id: str, max_depth: Optional[int] = None) -> List[str]:
+        """Every tool fed by tool_id, nearest first"""
+        return self._walk(tool_id, self.out_offsets, self.out_targets, max_depth)
+
+    def lineage(self, tool_id: str, max_depth: Optional[int] = None) -> dict:
+        """Upstream and downstream tools plus the connections among them"""
+        upstream = self.upstream(tool_id, max_depth)
+        downstream = self.downstream(tool_id, max_depth)
+        members = {self.index[t] for t in upstream + downstream}
+        members.add(self.index[tool_id])
+        edges = [
+            [self.tool_ids[i], self.tool_ids[j]]
+            for i in sorted(members) for j in self.successors(i) if j in members
+        ]
+        return {"tool_id": tool_id, "upstream": upstream, "downstream": downstream, "connections": edges}
+
+    def summary(self) -> dict:
+        sources = [self.tool_ids[i] for i in range(len(self.tool_ids)) if self.in_offsets[i] == self.in_offsets[i + 1]]
+        sinks = [self.tool_ids[i] for i in range(len(self.tool_ids)) if self.out_offsets[i] == self.out_offsets[i + 1]]
+        return {
+            "tools": len(self.tool_ids),
+            "connections": self.edge_count,
+            "components": max(self.components) + 1 if len(self.components) else 0,
+            "has_cycles": self.has_cycles,
+            "cycles": [[self.tool_ids[i] for i in cycle] for cycle in self.cycles],
+            "sources": sources,
+            "sinks": sinks,
+            "topological_order": [self.tool_ids[i] for i in self.topological_order]
+        }
@@ -0,0 +1,174 @@
+import xml.etree.ElementTree as ET
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+
+# Item levels a document can be walked at
+ITEM_LEVELS = ("node", "connection", "configuration")
+READ_CHUNK_BYTES = 64 * 1024
+
+# Per-element selection state while an item is being collected
+_FULL, _PARTIAL, _DROP = 0, 1, 2
+
+
+def element_to_dict(element: ET.Element) -> Any:
+    """
+    Convert an element the way xmltodict.parse does by default: attributes
+    become "@name", text becomes "#text" (or the whole value when the
+    element has neither attributes nor children), repeated children a list
+    """
+    item = {f"@{name}": value for name, value in element.attrib.items()}
+    text = [element.text or ""]
+    for child in element:
+        value = element_to_dict(child)
+        if child.tag in item:
+            existing = item[child.tag]
+            if isinstance(existing, list):
+                existing.append(value)
+            else:
+                item[child.tag] = [existing, value]
+        else:
+            item[child.tag] = value
+        text.append(child.tail or "")
+    data = "".join(text).strip() or None
+    if not item:
+        return data
+    if data is not None:
+        item["#text"] = data
+    return item
+
+
+def _is_item(level: str, tags: List[str]) -> bool:
+    """Whether the element whose ancestor-or-self tags are tags starts an item"""
+    if level == "node":
+        return len(tags) >= 2 and tags[-1] == "Node" and tags[-2] in ("Nodes", "ChildNodes")
+    if level == "connection":
+        return len(tags) >= 2 and tags[-1] == "Connection" and tags[-2] == "Connections"
+    return len(tags) >= 4 and tags[-2:-4:-1] == ["Configuration", "Properties"] and tags[-4] == "Node"
+
+
+def _selection(path: List[str], selectors: Sequence[List[str]]) -> int:
+    """_FULL when path is (inside) a selected path, _PARTIAL when it leads to one, else _DROP"""
+    state = _DROP
+    for selector in selectors:
+        length = min(len(path), len(selector))
+        if all(s == "*" or s == p for s, p in zip(selector[:length], path[:length])):
+            if len(path) >= len(selector):
+                return _FULL
+            state = _PARTIAL
+    return state
+
+
+def _chunks(source) -> Iterator[bytes]:
+    """The stored source (an artifact) in fixed-size chunks"""
+    if source.data is not None:
+        for start in range(0, len(source.data), READ_CHUNK_BYTES):
+            yield source.data[start:start + READ_CHUNK_BYTES]
+        return
+    with open(source.path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_items(chunks: Iterable[bytes], level: str, tool_ids: Optional[Iterable[str]] = None,
+               select: Optional[Iterable[str]] = None) -> Iterator[dict]:
+    """
+    Walk a workflow document and yield one JSON-ready record per item
+    (every Node, every Connection, or every child of a tool's
+    Configuration) as soon as the item's end tag has been parsed.
+
+    tool_ids keeps only items of those tools (connections from or to them).
+    select keeps only matching parts of each item: "/"-separated tag paths
+    starting at the item's own tag, with "*" matching any one tag, e.g.
+    "Node/Properties/Configuration" or "FormulaFields/*". Elements outside
+    items and parts that are not selected are released as soon as they
+    end, so memory is bounded by the largest selected item rather than
+    by the document.
+    """
+    if level not in ITEM_LEVELS:
+        raise ValueError(f"level must be one of {', '.join(ITEM_LEVELS)}")
+    tool_ids = set(tool_ids) if tool_ids else None
+    selectors = [path.strip("/").split("/") for path in select or () if path.strip("/")]
+
+    parser = ET.XMLPullParser(events=("start", "end"))
+    tags: List[str] = []
+    elements: List[ET.Element] = []
+    # Per open element: (item start index or None, selection state)
+    states: List[tuple] = []
+    # Ancestor Node IDs, for configuration items and nested container nodes
+    node_ids: List[Optional[str]] = []
+
+    def start(element: ET.Element) -> None:
+        parent_item, parent_state = states[-1] if states else (None, _DROP)
+        tags.append(element.tag)
+        elements.append(element)
+        if element.tag == "Node":
+            node_ids.append(element.get("ToolID"))
+        if _is_item(level, tags):
+            depth = len(tags) - 1
+            state = _selection([element.tag], selectors) if selectors else _FULL
+            states.append((depth, state))
+        elif parent_item is None:
+            states.append((None, _DROP))
+        elif parent_state == _PARTIAL:
+            states.append((parent_item, _selection(tags[parent_item:], selectors)))
+        else:
+            states.append((parent_item, parent_state))
+
+    def end(element: ET.Element) -> Optional[dict]:
+        item, state = states.pop()
+        tags.pop()
+        elements.pop()
+        record = None
+        if item is not None and item == len(tags) and state != _DROP:
+            record = _record(element, tags)
+        if element.tag == "Node":
+            node_ids.pop()
+        # Kept parts of an unfinished item stay attached; everything else is released
+        if item is None or item == len(tags) or state == _DROP:
+            if elements:
+                elements[-1].remove(element)
+            element.clear()
+        return record
+
+    def _record(element: ET.Element, ancestors: List[str]) -> Optional[dict]:
+        if level == "connection":
+            ends = [element.find("Origin"), element.find("Destination")]
+            tool_id = None
+            if tool_ids is not None and not any(e is not None and e.get("ToolID") in tool_ids for e in ends):
+                return None
+        else:
+            # For nodes, the node itself is the last ancestor Node; configurations sit under theirs
+            tool_id = element.get("ToolID") if level == "node" else node_ids[-1]
+            if tool_ids is not None and tool_id not in tool_ids:
+                return None
+        record = {"path": "/".join(ancestors + [element.tag]), "tool_id": tool_id}
+        if level == "node":
+            record["container_tool_id"] = node_ids[-2] if len(node_ids) > 1 else None
+        elif level == "configuration":
+            record["key"] = element.tag
+        record["value"] = element_to_dict(element)
+        return record
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == "start":
+                start(element)
+            else:
+                record = end(element)
+                if record is not None:
+                    yield record
+    parser.close()
+    for event, element in parser.read_events():
+        if event == "end":
+            record = end(element)
+            if record is not None:
+                yield record
+
+
+def iter_source_items(source, level: str, tool_ids: Optional[Iterable[str]] = None,
+                      select: Optional[Iterable[str]] = None) -> Iterator[dict]:
+    """iter_items over a stored source artifact, read chunk by chunk"""
+    return iter_items(_chunks(source), level, tool_ids, select)
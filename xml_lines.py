@@ -0,0 +1,151 @@
+import html
+import mmap
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List
+
+from artifact_store import Artifact
+
+# Name of the artifact holding a source's line start offsets
+LINES_ARTIFACT = "source.lines"
+
+TOKEN_PATTERN = re.compile(
+    r"(?P<comment><!--.*?(?:-->|$))"
+    r"|(?P<declaration><\?.*?(?:\?>|$))"
+    r"|(?P<open></?)(?P<tag>[\w:.-]+)"
+    r"|(?P<attribute>[\w:.-]+)(?P<equals>\s*=\s*)(?P<value>\"[^\"]*\"|'[^']*')"
+)
+
+
+def _escape(text: str) -> str:
+    return html.escape(text, quote=False)
+
+
+def highlight_line(line: str) -> str:
+    """One line of XML, HTML-escaped and wrapped in the viewer's syntax highlighting spans"""
+    parts = []
+    position = 0
+    for match in TOKEN_PATTERN.finditer(line):
+        parts.append(_escape(line[position:match.start()]))
+        if match.group("comment") or match.group("declaration"):
+            parts.append(f'<span class="xml-comment">{_escape(match.group(0))}</span>')
+        elif match.group("tag"):
+            parts.append(f'{_escape(match.group("open"))}<span class="xml-tag">{match.group("tag")}</span>')
+        else:
+            parts.append(f'<span class="xml-attribute">{match.group("attribute")}</span>{match.group("equals")}'
+                         f'<span class="xml-value">{_escape(match.group("value"))}</span>')
+        position = match.end()
+    parts.append(_escape(line[position:]))
+    return "".join(parts)
+
+
+@contextmanager
+def _source_bytes(source: Artifact):
+    """The stored source as a bytes-like object, memory-mapped when on disk"""
+    if source.data is not None:
+        yield source.data
+        return
+    with open(source.path, "rb") as f:
+        if source.size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+class LineIndex:
+    """Byte offset of the start of every line in a stored source, plus its end"""
+    __slots__ = ("offsets",)
+
+    def __init__(self, offsets: array):
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, source: Artifact) -> "LineIndex":
+        offsets = array("q", [0])
+        with _source_bytes(source) as data:
+            position = data.find(b"\n")
+            while position != -1:
+                offsets.append(position + 1)
+                position = data.find(b"\n", position + 1)
+            # One past the end, as if the last line ended with a newline
+            offsets.append(len(data) + 1)
+        return cls(offsets)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LineIndex":
+        offsets = array("q")
+        offsets.frombytes(data)
+        return cls(offsets)
+
+    def to_bytes(self) -> bytes:
+        return self.offsets.tobytes()
+
+    @property
+    def total(self) -> int:
+        return len(self.offsets) - 1
+
+    def read(self, source: Artifact, start: int, count: int, encoding: str = "utf-8") -> List[str]:
+        """Decoded lines start..start + count - 1 (1-based), without their line endings"""
+        first = max(start, 1) - 1
+        last = min(first + count, self.total)
+        if first >= last:
+            return []
+        with _source_bytes(source) as data:
+            chunk = bytes(data[self.offsets[first]:self.offsets[last] - 1])
+        if encoding.lower() == "utf-8":
+            # Dropped by the browser's FileReader too
+            encoding = "utf-8-sig" if first == 0 else "utf-8"
+        return [line.rstrip("\r") for line in chunk.decode(encoding, errors="replace").split("\n")]
+
+    def read_numbered(self, source: Artifact, numbers: List[int], encoding: str = "utf-8") -> List[str]:
+        """Decoded lines for scattered 1-based line numbers, reading the source once"""
+        sig = "utf-8-sig" if encoding.lower() == "utf-8" else encoding
+        lines = []
+        with _source_bytes(source) as data:
+            for number in numbers:
+                if not 1 <= number <= self.total:
+                    lines.append("")
+                    continue
+                raw = bytes(data[self.offsets[number - 1]:self.offsets[number] - 1])
+                lines.append(raw.decode(sig if number == 1 else encoding, errors="replace").rstrip("\r"))
+        return lines
+
+
+class LineIndexCache:
+    """
+    Line indexes of stored sources, kept in a small LRU keyed by document ID
+
+    Each index is also persisted next to its source, so other workers and
+    later requests only need to read the offsets back instead of scanning
+    the source again.
+    """
+
+    def __init__(self, artifact_store, max_entries: int = 64):
+        self.artifact_store = artifact_store
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, doc_id: str, source: Artifact) -> LineIndex:
+        with self._lock:
+            index = self._entries.get(doc_id)
+            if index is not None:
+                self._entries.move_to_end(doc_id)
+                return index
+
+        stored = self.artifact_store.get(doc_id, LINES_ARTIFACT)
+        if stored is not None:
+            index = LineIndex.from_bytes(stored.read())
+        else:
+            index = LineIndex.build(source)
+            self.artifact_store.put(doc_id, LINES_ARTIFACT, index.to_bytes())
+
+        with self._lock:
+            self._entries[doc_id] = index
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
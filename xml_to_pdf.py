@@ -4,7 +4,9 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from xml.dom import minidom
+from typing import IO, BinaryIO, Iterable, Iterator, Union
 import io
+import zlib
 
 def generate_xml_pdf(xml_content: str) -> bytes:
     """
@@ -68,4 +70,134 @@ def generate_xml_pdf(xml_content: str) -> bytes:
     pdf_value = buffer.getvalue()
     buffer.close()
     
-    return pdf_value 
\ No newline at end of file
+    return pdf_value 
+
+# Page geometry for the streaming renderer (letter, 1 inch margins like generate_xml_pdf)
+PAGE_WIDTH, PAGE_HEIGHT = letter
+MARGIN = 72
+CODE_FONT_SIZE = 8
+CODE_LEADING = 10
+TITLE_FONT_SIZE = 18
+# Courier glyphs are 0.6em wide
+CHARS_PER_LINE = int((PAGE_WIDTH - 2 * MARGIN) // (CODE_FONT_SIZE * 0.6))
+LINES_PER_PAGE = int((PAGE_HEIGHT - 2 * MARGIN) // CODE_LEADING)
+
+
+def _pdf_text(text: str) -> bytes:
+    """Encode a line as a PDF literal string in WinAnsi (Latin-1) encoding"""
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").replace("\r", "")
+    return text.encode("latin-1", errors="replace")
+
+
+def _wrap_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Expand tabs, drop blank lines and hard-wrap to the page width"""
+    for line in lines:
+        line = line.rstrip("\r\n").expandtabs(4)
+        if not line.strip():
+            continue
+        while len(line) > CHARS_PER_LINE:
+            yield line[:CHARS_PER_LINE]
+            line = "    " + line[CHARS_PER_LINE:]
+        yield line
+
+
+def iter_xml_pdf(source: Union[str, Iterable[str]], title: str = "Alteryx Workflow XML Documentation",
+                 pages_per_chunk: int = 8) -> Iterator[bytes]:
+    """
+    Render XML as fixed-width text and yield the PDF in chunks as pages complete
+    
+    Lines are written straight onto pages with Courier, without re-parsing or
+    pretty-printing the XML, so memory use is independent of document size.
+    
+    Args:
+        source: XML text, or a text file object (or any iterable of lines) to read line by line
+        title (str): Heading drawn on the first page
+        pages_per_chunk (int): Number of finished pages batched into each yielded chunk
+    
+    Yields:
+        bytes: Consecutive pieces of the PDF file
+    """
+    lines = io.StringIO(source) if isinstance(source, str) else source
+    
+    offsets = {}        # Object number -> byte offset, for the xref table
+    page_objects = []   # Object numbers of finished pages
+    position = 0
+    buffer = []
+    
+    def emit(obj_num: int, body: bytes) -> None:
+        nonlocal position
+        offsets[obj_num] = position
+        data = b"%d 0 obj\n" % obj_num + body + b"\nendobj\n"
+        buffer.append(data)
+        position += len(data)
+    
+    def flush() -> bytes:
+        chunk = b"".join(buffer)
+        buffer.clear()
+        return chunk
+    
+    header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    buffer.append(header)
+    position += len(header)
+    
+    # Object 2 (the page tree) is written last, once every page is known
+    emit(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    emit(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+    emit(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+    next_obj = 5
+    
+    def emit_page(page_lines: list, with_title: bool) -> None:
+        nonlocal next_obj
+        top = PAGE_HEIGHT - MARGIN
+        ops = []
+        if with_title:
+            title_width = len(title) * TITLE_FONT_SIZE * 0.55
+            ops.append(b"BT /F2 %d Tf %.2f %.2f Td (%s) Tj ET" % (
+                TITLE_FONT_SIZE, max(MARGIN, (PAGE_WIDTH - title_width) / 2), top - TITLE_FONT_SIZE, _pdf_text(title)))
+            top -= TITLE_FONT_SIZE + 24
+        ops.append(b"BT /F1 %d Tf %d TL %d %.2f Td" % (CODE_FONT_SIZE, CODE_LEADING, MARGIN, top - CODE_FONT_SIZE))
+        for line in page_lines:
+            ops.append(b"(%s) '" % _pdf_text(line))
+        ops.append(b"ET")
+        content = zlib.compress(b"\n".join(ops), 6)
+        
+        content_obj, page_obj = next_obj, next_obj + 1
+        next_obj += 2
+        emit(content_obj, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream")
+        emit(page_obj, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>" % (PAGE_WIDTH, PAGE_HEIGHT, content_obj))
+        page_objects.append(page_obj)
+    
+    # The first page gives up room to the title
+    title_lines = (TITLE_FONT_SIZE + 24) // CODE_LEADING + 1
+    capacity = LINES_PER_PAGE - title_lines
+    page_lines = []
+    for line in _wrap_lines(lines):
+        page_lines.append(line)
+        if len(page_lines) >= capacity:
+            emit_page(page_lines, with_title=not page_objects)
+            page_lines = []
+            capacity = LINES_PER_PAGE
+            if len(page_objects) % pages_per_chunk == 0:
+                yield flush()
+    if page_lines or not page_objects:
+        emit_page(page_lines, with_title=not page_objects)
+    
+    kids = b" ".join(b"%d 0 R" % num for num in page_objects)
+    emit(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_objects))
+    
+    xref_position = position
+    xref = [b"xref\n0 %d\n" % next_obj, b"0000000000 65535 f \n"]
+    xref.extend(b"%010d 00000 n \n" % offsets[num] for num in range(1, next_obj))
+    buffer.extend(xref)
+    buffer.append(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_obj, xref_position))
+    yield flush()
+
+
+def write_xml_pdf(source: Union[str, IO[str]], output: BinaryIO, **kwargs) -> int:
+    """Stream a rendered PDF into a binary file object; returns bytes written"""
+    written = 0
+    for chunk in iter_xml_pdf(source, **kwargs):
+        output.write(chunk)
+        written += len(chunk)
+    return written